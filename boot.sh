@@ -21,9 +21,11 @@ python3 ./python/boot.py \
     --keosd=keosd \
     --user-limit=15 \
     --producer-limit=1 \
-    --producer-sync-delay=5 \
     --contracts-dir=./system-contracts-3.1 \
-    -w -a -k
+    --snapshot-dir=./run/snapshots/ \
+    --metrics-path=./run/metrics.json \
+    -w -a -k \
+    "$@"
 
 if [ $? -eq 0 ]; then
     echo "Logs successfully generated in ./run directory"
@@ -0,0 +1,526 @@
+import struct
+from datetime import datetime, timezone
+from fractions import Fraction
+
+from keys import KEY_TYPES, publicKeyToString, signatureToString, stringToKey
+
+NAME_CHARMAP = '.12345abcdefghijklmnopqrstuvwxyz'
+BLOCK_TIMESTAMP_EPOCH_MS = 946684800000
+MISSING = object()
+
+
+def name_to_string(value):
+    chars = []
+    for i in range(13):
+        if i == 0:
+            chars.append(NAME_CHARMAP[value & 0x0f])
+            value >>= 4
+        else:
+            chars.append(NAME_CHARMAP[value & 0x1f])
+            value >>= 5
+    return ''.join(reversed(chars)).rstrip('.')
+
+def name_from_string(text):
+    value = 0
+    for i in range(min(len(text), 13)):
+        c = NAME_CHARMAP.index(text[i])
+        if i < 12:
+            value |= (c & 0x1f) << (64 - 5 * (i + 1))
+        else:
+            value |= c & 0x0f
+    return value
+
+def symbol_code_to_string(value):
+    code = ''
+    while value:
+        code += chr(value & 0xff)
+        value >>= 8
+    return code
+
+def format_symbol(symbol):
+    return '%d,%s' % (symbol & 0xff, symbol_code_to_string(symbol >> 8))
+
+def format_asset(amount, symbol):
+    precision = symbol & 0xff
+    sign = '-' if amount < 0 else ''
+    amount = abs(amount)
+    if precision:
+        whole = '%d.%0*d' % (amount // 10 ** precision, precision, amount % 10 ** precision)
+    else:
+        whole = '%d' % amount
+    return '%s%s %s' % (sign, whole, symbol_code_to_string(symbol >> 8))
+
+def format_time_ms(ms):
+    # Same layout as the firehose decoder: milliseconds are only shown when non-zero.
+    formatted = datetime.fromtimestamp(ms // 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+    if ms % 1000:
+        formatted += ('.%03d' % (ms % 1000)).rstrip('0')
+    return formatted
+
+def symbol_code_from_string(code):
+    return int.from_bytes(code.encode(), 'little')
+
+def symbol_from_string(text):
+    precision, _, code = text.partition(',')
+    return int(precision) | symbol_code_from_string(code) << 8
+
+def asset_from_string(text):
+    # "1.0000 EOS" -> (amount, symbol)
+    amount, _, code = text.strip().partition(' ')
+    whole, _, fraction = amount.partition('.')
+    sign = -1 if whole.startswith('-') else 1
+    value = int(whole.lstrip('-') or '0') * 10 ** len(fraction) + int(fraction or '0')
+    return sign * value, len(fraction) | symbol_code_from_string(code) << 8
+
+def parse_time_ms(text):
+    whole, _, fraction = text.rstrip('Z').partition('.')
+    seconds = int(datetime.strptime(whole, '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc).timestamp())
+    return seconds * 1000 + int((fraction + '000')[:3])
+
+def format_int64(value):
+    # 64-bit integers outside of the 32-bit range are quoted, as JavaScript can't hold them.
+    if value > 0xffffffff or value < -0xffffffff:
+        return str(value)
+    return value
+
+def format_float128(value):
+    # IEEE binary128 of an exact value (int, float or Fraction), rounded to nearest
+    # even, printed the way fc prints float128: 0x and the little-endian bytes.
+    value = Fraction(value)
+    sign = 0
+    if value < 0:
+        sign, value = 1, -value
+    bits = 0
+    if value:
+        exponent = value.numerator.bit_length() - value.denominator.bit_length()
+        if value < Fraction(2) ** exponent:
+            exponent -= 1
+        mantissa = round(value / Fraction(2) ** exponent * 2 ** 112)
+        if mantissa == 2 ** 113:
+            mantissa, exponent = mantissa >> 1, exponent + 1
+        bits = (exponent + 16383) << 112 | mantissa - 2 ** 112
+    return '0x' + (sign << 127 | bits).to_bytes(16, 'little').hex()
+
+
+class BinaryReader:
+    """Cursor over Antelope (fc::raw) packed binary data."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def remaining(self):
+        return len(self.data) - self.pos
+
+    def read(self, size):
+        if self.pos + size > len(self.data):
+            raise ValueError('read past end of data (%d + %d > %d)' % (self.pos, size, len(self.data)))
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+    def unpack(self, fmt, size):
+        return struct.unpack(fmt, self.read(size))[0]
+
+    def uint8(self):
+        return self.unpack('<B', 1)
+
+    def uint16(self):
+        return self.unpack('<H', 2)
+
+    def uint32(self):
+        return self.unpack('<I', 4)
+
+    def uint64(self):
+        return self.unpack('<Q', 8)
+
+    def int8(self):
+        return self.unpack('<b', 1)
+
+    def int16(self):
+        return self.unpack('<h', 2)
+
+    def int32(self):
+        return self.unpack('<i', 4)
+
+    def int64(self):
+        return self.unpack('<q', 8)
+
+    def float32(self):
+        return self.unpack('<f', 4)
+
+    def float64(self):
+        return self.unpack('<d', 8)
+
+    def bool(self):
+        return self.uint8() != 0
+
+    def varuint32(self):
+        value = 0
+        shift = 0
+        while True:
+            byte = self.uint8()
+            value |= (byte & 0x7f) << shift
+            shift += 7
+            if not byte & 0x80:
+                return value
+
+    def varint32(self):
+        value = self.varuint32()
+        return (value >> 1) ^ -(value & 1)
+
+    def bytes(self):
+        return self.read(self.varuint32())
+
+    def string(self):
+        return bytes(self.bytes()).decode('utf-8', errors='replace')
+
+    def name(self):
+        return name_to_string(self.uint64())
+
+    def checksum(self, size):
+        return bytes(self.read(size)).hex()
+
+    def optional(self, read):
+        return read() if self.bool() else None
+
+    def array(self, read):
+        return [read() for _ in range(self.varuint32())]
+
+    def public_key(self):
+        key_type = self.varuint32()
+        data = bytes(self.read(33))
+        if key_type == 2:
+            self.uint8()
+            self.string()
+        return publicKeyToString(KEY_TYPES[key_type], data)
+
+    def signature(self):
+        key_type = self.varuint32()
+        data = bytes(self.read(65))
+        if key_type == 2:
+            self.bytes()
+            self.string()
+        return signatureToString(KEY_TYPES[key_type], data)
+
+
+class BinaryWriter:
+    """Builds Antelope (fc::raw) packed binary data."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def getvalue(self):
+        return b''.join(self.chunks)
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+
+    def pack(self, fmt, value):
+        self.chunks.append(struct.pack(fmt, value))
+
+    def uint8(self, value):
+        self.pack('<B', int(value))
+
+    def uint16(self, value):
+        self.pack('<H', int(value))
+
+    def uint32(self, value):
+        self.pack('<I', int(value))
+
+    def uint64(self, value):
+        self.pack('<Q', int(value))
+
+    def int8(self, value):
+        self.pack('<b', int(value))
+
+    def int16(self, value):
+        self.pack('<h', int(value))
+
+    def int32(self, value):
+        self.pack('<i', int(value))
+
+    def int64(self, value):
+        self.pack('<q', int(value))
+
+    def float32(self, value):
+        self.pack('<f', float(value))
+
+    def float64(self, value):
+        self.pack('<d', float(value))
+
+    def bool(self, value):
+        if isinstance(value, str):
+            value = value.lower() in ('true', '1')
+        self.uint8(1 if value else 0)
+
+    def varuint32(self, value):
+        value = int(value)
+        while True:
+            byte = value & 0x7f
+            value >>= 7
+            if value:
+                self.uint8(byte | 0x80)
+            else:
+                self.uint8(byte)
+                return
+
+    def varint32(self, value):
+        value = int(value)
+        self.varuint32((value << 1) ^ (value >> 31))
+
+    def bytes(self, data):
+        self.varuint32(len(data))
+        self.write(data)
+
+    def string(self, value):
+        self.bytes(value.encode('utf-8'))
+
+    def name(self, value):
+        self.uint64(name_from_string(value))
+
+    def checksum(self, value, size):
+        data = bytes.fromhex(value)
+        if len(data) != size:
+            raise ValueError('expected a %d byte checksum: %s' % (size, value))
+        self.write(data)
+
+    def array(self, values, write):
+        self.varuint32(len(values))
+        for value in values:
+            write(value)
+
+    def key(self, text, prefix, size):
+        key_type, data = stringToKey(text, prefix)
+        if key_type == 'WA':
+            raise ValueError('WebAuthn keys are not supported: %s' % text)
+        if len(data) != size:
+            raise ValueError('invalid key size: %s' % text)
+        self.varuint32(KEY_TYPES.index(key_type))
+        self.write(data)
+
+    def asset(self, text):
+        amount, symbol = asset_from_string(text)
+        self.int64(amount)
+        self.uint64(symbol)
+
+
+BUILTIN_ENCODERS = {
+    'bool': lambda w, v: w.bool(v),
+    'int8': lambda w, v: w.int8(v),
+    'uint8': lambda w, v: w.uint8(v),
+    'int16': lambda w, v: w.int16(v),
+    'uint16': lambda w, v: w.uint16(v),
+    'int32': lambda w, v: w.int32(v),
+    'uint32': lambda w, v: w.uint32(v),
+    'int64': lambda w, v: w.int64(v),
+    'uint64': lambda w, v: w.uint64(v),
+    'int128': lambda w, v: w.write(int(v).to_bytes(16, 'little', signed=True)),
+    'uint128': lambda w, v: w.write(int(v).to_bytes(16, 'little')),
+    'varint32': lambda w, v: w.varint32(v),
+    'varuint32': lambda w, v: w.varuint32(v),
+    'float32': lambda w, v: w.float32(v),
+    'float64': lambda w, v: w.float64(v),
+    'float128': lambda w, v: w.checksum(v[2:] if v.startswith('0x') else v, 16),
+    'time_point': lambda w, v: w.int64(parse_time_ms(v) * 1000),
+    'time_point_sec': lambda w, v: w.uint32(parse_time_ms(v) // 1000),
+    'block_timestamp_type': lambda w, v: w.uint32((parse_time_ms(v) - BLOCK_TIMESTAMP_EPOCH_MS) // 500),
+    'name': lambda w, v: w.name(v),
+    'bytes': lambda w, v: w.bytes(bytes.fromhex(v)),
+    'string': lambda w, v: w.string(v),
+    'checksum160': lambda w, v: w.checksum(v, 20),
+    'checksum256': lambda w, v: w.checksum(v, 32),
+    'checksum512': lambda w, v: w.checksum(v, 64),
+    'public_key': lambda w, v: w.key(v, 'PUB', 33),
+    'signature': lambda w, v: w.key(v, 'SIG', 65),
+    'symbol': lambda w, v: w.uint64(symbol_from_string(v)),
+    'symbol_code': lambda w, v: w.uint64(symbol_code_from_string(v)),
+    'asset': lambda w, v: w.asset(v),
+    'extended_asset': lambda w, v: (w.asset(v['quantity']), w.name(v['contract'])),
+}
+
+BUILTIN_DECODERS = {
+    'bool': lambda r: r.bool(),
+    'int8': lambda r: r.int8(),
+    'uint8': lambda r: r.uint8(),
+    'int16': lambda r: r.int16(),
+    'uint16': lambda r: r.uint16(),
+    'int32': lambda r: r.int32(),
+    'uint32': lambda r: r.uint32(),
+    'int64': lambda r: format_int64(r.int64()),
+    'uint64': lambda r: format_int64(r.uint64()),
+    'int128': lambda r: str(int.from_bytes(r.read(16), 'little', signed=True)),
+    'uint128': lambda r: str(int.from_bytes(r.read(16), 'little')),
+    'varint32': lambda r: r.varint32(),
+    'varuint32': lambda r: r.varuint32(),
+    'float32': lambda r: '%.17f' % r.float32(),
+    'float64': lambda r: '%.17f' % r.float64(),
+    'float128': lambda r: '0x' + bytes(r.read(16)).hex(),
+    'time_point': lambda r: format_time_ms(r.int64() // 1000),
+    'time_point_sec': lambda r: format_time_ms(r.uint32() * 1000),
+    'block_timestamp_type': lambda r: format_time_ms(r.uint32() * 500 + BLOCK_TIMESTAMP_EPOCH_MS),
+    'name': lambda r: r.name(),
+    'bytes': lambda r: bytes(r.bytes()).hex(),
+    'string': lambda r: r.string(),
+    'checksum160': lambda r: r.checksum(20),
+    'checksum256': lambda r: r.checksum(32),
+    'checksum512': lambda r: r.checksum(64),
+    'public_key': lambda r: r.public_key(),
+    'signature': lambda r: r.signature(),
+    'symbol': lambda r: format_symbol(r.uint64()),
+    'symbol_code': lambda r: symbol_code_to_string(r.uint64()),
+    'asset': lambda r: format_asset(r.int64(), r.uint64()),
+    'extended_asset': lambda r: {'quantity': format_asset(r.int64(), r.uint64()), 'contract': r.name()},
+}
+
+
+class Abi:
+    """Contract ABI able to decode action data, action results and table rows.
+
+    `abi_def` has the same shape as the JSON returned by `get_abi`.
+    """
+
+    def __init__(self, abi_def):
+        self.abi_def = abi_def
+        self.types = {t['new_type_name']: t['type'] for t in abi_def.get('types', [])}
+        self.structs = {s['name']: s for s in abi_def.get('structs', [])}
+        self.variants = {v['name']: v['types'] for v in abi_def.get('variants', [])}
+        self.actions = {a['name']: a['type'] for a in abi_def.get('actions', [])}
+        self.tables = {t['name']: t['type'] for t in abi_def.get('tables', [])}
+        self.action_results = {r['name']: r['result_type'] for r in abi_def.get('action_results', [])}
+
+    @classmethod
+    def from_binary(cls, data):
+        r = BinaryReader(data)
+        abi_def = {
+            'version': r.string(),
+            'types': r.array(lambda: {'new_type_name': r.string(), 'type': r.string()}),
+            'structs': r.array(lambda: {
+                'name': r.string(),
+                'base': r.string(),
+                'fields': r.array(lambda: {'name': r.string(), 'type': r.string()}),
+            }),
+            'actions': r.array(lambda: {'name': r.name(), 'type': r.string(), 'ricardian_contract': r.string()}),
+            'tables': r.array(lambda: {
+                'name': r.name(),
+                'index_type': r.string(),
+                'key_names': r.array(r.string),
+                'key_types': r.array(r.string),
+                'type': r.string(),
+            }),
+            'ricardian_clauses': r.array(lambda: {'id': r.string(), 'body': r.string()}),
+            'error_messages': r.array(lambda: {'error_code': r.uint64(), 'error_msg': r.string()}),
+            'abi_extensions': r.array(lambda: {'tag': r.uint16(), 'value': bytes(r.bytes()).hex()}),
+        }
+        # variants and action_results are binary extensions of abi_def
+        abi_def['variants'] = r.array(lambda: {'name': r.string(), 'types': r.array(r.string)}) if r.remaining() else []
+        abi_def['action_results'] = r.array(lambda: {'name': r.name(), 'result_type': r.string()}) if r.remaining() else []
+        return cls(abi_def)
+
+    def resolve(self, type_name):
+        seen = 0
+        while type_name in self.types and seen < 32:
+            type_name = self.types[type_name]
+            seen += 1
+        return type_name
+
+    def decode(self, type_name, reader):
+        if type_name.endswith('$'):
+            if not reader.remaining():
+                return MISSING
+            type_name = type_name[:-1]
+        if type_name.endswith('?'):
+            return self.decode(type_name[:-1], reader) if reader.bool() else None
+        if type_name.endswith('[]'):
+            return [self.decode(type_name[:-2], reader) for _ in range(reader.varuint32())]
+
+        resolved = self.resolve(type_name)
+        if resolved != type_name:
+            return self.decode(resolved, reader)
+
+        decoder = BUILTIN_DECODERS.get(type_name)
+        if decoder:
+            return decoder(reader)
+        if type_name in self.variants:
+            variant_type = self.variants[type_name][reader.varuint32()]
+            return [variant_type, self.decode(variant_type, reader)]
+        if type_name in self.structs:
+            return self.decode_struct(type_name, reader)
+        raise ValueError('unknown ABI type: %s' % type_name)
+
+    def decode_struct(self, struct_name, reader):
+        struct_def = self.structs[struct_name]
+        value = self.decode_struct(self.resolve(struct_def['base']), reader) if struct_def.get('base') else {}
+        for field in struct_def['fields']:
+            field_value = self.decode(field['type'], reader)
+            if field_value is not MISSING:
+                value[field['name']] = field_value
+        return value
+
+    def encode(self, type_name, value, writer):
+        if type_name.endswith('$'):
+            if value is MISSING:
+                return
+            type_name = type_name[:-1]
+        if type_name.endswith('?'):
+            writer.bool(value != None)
+            if value != None:
+                self.encode(type_name[:-1], value, writer)
+            return
+        if type_name.endswith('[]'):
+            writer.array(value, lambda item: self.encode(type_name[:-2], item, writer))
+            return
+
+        resolved = self.resolve(type_name)
+        if resolved != type_name:
+            return self.encode(resolved, value, writer)
+
+        encoder = BUILTIN_ENCODERS.get(type_name)
+        if encoder:
+            encoder(writer, value)
+        elif type_name in self.variants:
+            variant_type, variant_value = value
+            writer.varuint32(self.variants[type_name].index(variant_type))
+            self.encode(variant_type, variant_value, writer)
+        elif type_name in self.structs:
+            self.encode_struct(type_name, value, writer)
+        else:
+            raise ValueError('unknown ABI type: %s' % type_name)
+
+    def struct_fields(self, struct_name):
+        struct_def = self.structs[struct_name]
+        fields = self.struct_fields(self.resolve(struct_def['base'])) if struct_def.get('base') else []
+        return fields + struct_def['fields']
+
+    def encode_struct(self, struct_name, value, writer):
+        # Structs are accepted as objects or, like cleos does, as positional arrays
+        fields = self.struct_fields(struct_name)
+        if isinstance(value, (list, tuple)):
+            value = dict(zip((field['name'] for field in fields), value))
+        for field in fields:
+            field_value = value.get(field['name'], MISSING)
+            if field_value is MISSING and not field['type'].endswith('$'):
+                raise ValueError('missing field %s.%s' % (struct_name, field['name']))
+            self.encode(field['type'], field_value, writer)
+
+    def encode_action(self, action_name, data):
+        if action_name not in self.actions:
+            raise ValueError('unknown action: %s' % action_name)
+        writer = BinaryWriter()
+        self.encode(self.actions[action_name], data, writer)
+        return writer.getvalue()
+
+    def decode_action(self, action_name, data):
+        if action_name not in self.actions:
+            return None
+        return self.decode(self.actions[action_name], BinaryReader(data))
+
+    def decode_action_result(self, action_name, data):
+        if action_name not in self.action_results:
+            return None
+        return self.decode(self.action_results[action_name], BinaryReader(data))
+
+    def decode_table_row(self, table_name, data):
+        if table_name not in self.tables:
+            return None
+        return self.decode(self.tables[table_name], BinaryReader(data))
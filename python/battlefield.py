@@ -0,0 +1,264 @@
+import json
+from fractions import Fraction
+
+from abi import format_float128, format_int64, name_to_string
+from client import action
+
+# The battlefield test suite, as data for boot.py's scenario runner.
+#
+# A scenario is a list of phases, run one after the other. A phase maps lane
+# names to lists of transactions. Lanes of a phase run side by side, the
+# transactions of a lane are pushed back to back in order. So transactions
+# that touch the same rows or permissions belong to the same lane. Each one is
+# pushed as soon as the previous one is accepted, which is enough for it to
+# see its effects. Only a transaction scheduling a deferred one has the lane
+# wait (deferred=delaySec) until the deferred transaction ran. Expected
+# records get their trx id once the transaction is pushed and are logged in
+# chain order at the end.
+
+def cleos(command, *expected, deferred=None):
+    # A transaction only cleos can build: contracts, permission helpers, --force-unique
+    return {'cleos': command, 'expected': expected, 'deferred': deferred}
+
+def push(account, name, data, actor, *expected, deferred=None):
+    return {'actions': [action(account, name, data, actor)], 'expected': expected, 'deferred': deferred}
+
+def expectAction(account, receiver, name, params, retvalue=''):
+    return ('action', account, receiver, name, params, retvalue)
+
+def expectDbop(code, scope, table, pkey, op, fields):
+    return ('dbop', code, scope, table, pkey, op, fields)
+
+def bf(name, data, *expected, params=None, deferred=None):
+    # battlefield1 calling itself. The action is expected with `params`, which
+    # default to the data when the trace shows it unchanged.
+    return push('battlefield1', name, data, 'battlefield1', expectAction('battlefield1', 'battlefield1', name, data if params == None else params), *expected, deferred=deferred)
+
+def bfDbop(table, pkey, op, fields):
+    return expectDbop('battlefield1', 'battlefield1', table, pkey, op, fields)
+
+
+def variantRows(firstId, rowCount):
+    # producerows emplaces rows firstId... with a variant picked from the row's creation number
+    rows = []
+    for i in range(rowCount):
+        if i % 5 == 0:
+            field = ['int32', i]
+        elif i % 4 == 0:
+            field = ['uint32', i]
+        elif i % 3 == 0:
+            field = ['uint16', i & 0xffff]
+        elif i % 2 == 0:
+            field = ['int8', (i + 128) % 256 - 128]
+        else:
+            field = ['int8', 0]
+        rows.append(bfDbop('variant', name_to_string(firstId + i), 'INS', { 'creation_number': format_int64(i), 'id': format_int64(firstId + i), 'variant_field': field }))
+    return rows
+
+skTables = ('sk.i', 'sk.ii', 'sk.d', 'sk.dd', 'sk.c', 'sk.multi')
+skC256End = 'ffaabb00ddee11220033445500ffaa22'
+
+def skRow(table, id, step):
+    # Row `id` of a sktest table after insert (step 0), update.sk (1) and update.ot (2)
+    updated = step > 0
+    row = { 'c256': '0' * 64, 'd128': format_float128(0), 'd64': '%.17f' % 0, 'i128': '0', 'i64': 0, 'id': format_int64(id), 'unrelated': 0 }
+    if table in ('sk.i', 'sk.multi'):
+        row['i64'] = format_int64(id + 1 + updated)
+    if table in ('sk.ii', 'sk.multi'):
+        row['i128'] = str(id + 2 + 2 * updated)
+    if table in ('sk.d', 'sk.multi'):
+        row['d64'] = '%.17f' % (float(id) + 3.1 + 3.2 if updated else float(id) + 3.1)
+    if table in ('sk.dd', 'sk.multi'):
+        row['d128'] = format_float128(Fraction(id) + Fraction(4.6) + (Fraction(4.7) if updated else 0))
+    if table == 'sk.c':
+        row['c256'] = '%032x' % (id + (10 if updated else 5)) + skC256End
+    if step == 2:
+        row['unrelated'] = format_int64(id + skTables.index(table) + 1)
+    return row
+
+def skCycle(id):
+    # sktest inserts row `id` in every table, updates it through the secondary
+    # index, then through the primary key, and removes it again. Returns the
+    # (action, expected records) of each step.
+    steps = []
+    for step, name in enumerate(('insert', 'update.sk', 'update.ot')):
+        steps.append((name, [bfDbop(table, name_to_string(id), 'UPD' if step else 'INS', skRow(table, id, step)) for table in skTables]))
+    steps.append(('remove', [bfDbop(table, name_to_string(id), 'REM', {}) for table in skTables]))
+    return steps
+
+def sktest(name, *expected):
+    return bf('sktest', { 'action': name }, *expected)
+
+def skCycles(id, cycles):
+    # One transaction of `cycles` sktest cycles over row `id`
+    transactions = [sktest(name, *expected) for name, expected in skCycle(id) * cycles]
+    return {'actions': [a for t in transactions for a in t['actions']], 'expected': [r for t in transactions for r in t['expected']], 'deferred': None}
+
+
+def member(id, account, memo, op='INS'):
+    return bfDbop('member', name_to_string(id), op, { 'account': account, 'amount': '0 ', 'created_at': '*', 'expires_at': '1970-01-01T00:00:00', 'id': id, 'memo': memo })
+
+def dtrx(account, nonce, failLater=False, failLaterNested=False, deferred=None):
+    data = { 'account': account, 'fail_now': False, 'fail_later': failLater, 'fail_later_nested': failLaterNested, 'delay_sec': 1, 'nonce': nonce }
+    params = { 'account': account, 'delay_sec': 1, 'fail_later': int(failLater), 'fail_later_nested': int(failLaterNested), 'fail_now': 0, 'nonce': nonce }
+    return push(account, 'dtrx', data, account, expectAction(account, account, 'dtrx', params), deferred=deferred)
+
+def setContract(account):
+    return cleos('set contract %s ./battlefield battlefield.wasm battlefield.abi' % account,
+        expectAction('eosio', 'eosio', 'setcode', { 'account': account, 'code': '*', 'vmtype': 0, 'vmversion': 0 }))
+
+def updateauth(account, parent, permission):
+    return expectAction('eosio', 'eosio', 'updateauth', { 'account': account, 'auth': '*', 'parent': parent, 'permission': permission })
+
+def prims(boolvar):
+    data = { 'boolvar': boolvar, 'namevar': 'battlefield1', 'stringvar': 'some string', 'int8var': -1, 'uint8var': 2, 'int16var': -3, 'uint16var': 4, 'int32var': -5, 'uint32var': 6, 'int64var': -7, 'uint64var': 8, 'doublevar': 9.12345678900000046, 'floatvar': 10.12345027923583984 }
+    params = dict(data, boolvar=int(boolvar), doublevar='9.12345678900000046', floatvar='10.12345027923583984')
+    return data, params
+
+bltinsData = { 'symcodevar': 'EOS', 'assetvar': '1.0000 EOS', 'symbolvar': '4,EOS', 'extsymvar': { 'contract': 'eosio.token', 'sym': '4,EOS' }, 'extassetvar': { 'contract': 'eosio.token', 'quantity': '1.0000 EOS' }, 'vecvar': ['battlefield1', 'battlefield2'], 'mapvar': [{ 'first': 'k1', 'second': 'v1' }, { 'first': 'k2', 'second': 'v2' }], 'timevar': '2023-01-02T03:04:05', 'vari1': ['uint16', 20], 'vari2': ['string', 'vari string'] }
+complexData = { 'nested': { 'nested_id': 123, 'nested_vari': [['uint16', 20], ['string', 'vari string']] }, 'vari': [['uint16', 20], ['string', 'vari string']] }
+creaorderData = { 'n1': 'notified1', 'n2': 'notified2', 'n3': 'notified3', 'n4': 'notified4', 'n5': 'notified5' }
+inlinedeepData = { 'n4': 'notified4', 'n5': 'notified5', 'nestedCfaInlineTag': 'c3', 'nestedInlineFail': 0, 'nestedInlineTag': 'i3', 'tag': 'i2' }
+zeroSkRow = skRow('', 0, 0)
+
+
+def scenario():
+    prims0, primsParams0 = prims(True)
+    prims1, primsParams1 = prims(False)
+    return [
+        {
+            'permissions': [
+                cleos('set account permission battlefield1 active --add-code', updateauth('battlefield1', 'owner', 'active')),
+                cleos('set account permission battlefield2 active --add-code'),
+                cleos('set account permission battlefield3 active --add-code'),
+                cleos('set account permission battlefield4 active --add-code'),
+                cleos('set account permission notified2 active --add-code'),
+                cleos('set account permission battlefield5 active \'{ \
+                    "threshold": 5, \
+                    "keys": [], \
+                    "waits": [{"wait_sec": 10800, "weight": 1}], \
+                    "accounts": [ \
+                        {"permission":{"actor":"battlefield1","permission":"active"},"weight":2},\
+                        {"permission":{"actor":"battlefield3","permission":"active"},"weight":2},\
+                        {"permission":{"actor":"battlefield4","permission":"active"},"weight":2},\
+                        {"permission":{"actor":"zzzzzzzzzzzz","permission":"active"},"weight":1}\
+                    ]}\''),
+                cleos('set account permission battlefield5 day2day \'{ \
+                    "threshold": 1, \
+                    "keys": [], \
+                    "accounts": [ \
+                        {"permission":{"actor":"battlefield1","permission":"active"},"weight":1},\
+                        {"permission":{"actor":"battlefield3","permission":"active"},"weight":1},\
+                        {"permission":{"actor":"battlefield4","permission":"active"},"weight":1}\
+                    ]}\''),
+            ],
+            'ram': [
+                cleos('system buyram eosio battlefield1 --kbytes 20000',
+                    expectAction('eosio', 'eosio', 'buyrambytes', { 'bytes': 20480000, 'payer': 'eosio', 'receiver': 'battlefield1' }),
+                    expectDbop('eosio', 'eosio', 'rammarket', 'cpd4ykuhc5d.4', 'UPD', { 'base': '*', 'quote': '*', 'supply': '10000000000.0000 RAMCORE' }),
+                    expectDbop('eosio', 'battlefield1', 'userres', 'battlefield1', 'UPD', { 'cpu_weight': '*', 'net_weight': '*', 'owner': 'battlefield1', 'ram_bytes': '*' })),
+                cleos('system buyram eosio battlefield3 --kbytes 10000',
+                    expectAction('eosio', 'eosio', 'buyrambytes', { 'bytes': 10240000, 'payer': 'eosio', 'receiver': 'battlefield3' })),
+                cleos('system buyram eosio notified2 --kbytes 10000',
+                    expectAction('eosio', 'eosio', 'buyrambytes', { 'bytes': 10240000, 'payer': 'eosio', 'receiver': 'notified2' })),
+            ],
+        },
+        # The contracts need the RAM bought above
+        {
+            'battlefield1': [setContract('battlefield1')],
+            'battlefield3': [setContract('battlefield3')],
+            'notified2': [setContract('notified2')],
+        },
+        {
+            'primitives': [
+                bf('prims', prims0, bfDbop('primitives', '', 'INS', dict(primsParams0, id=0)), params=primsParams0),
+                bf('prims', prims1, bfDbop('primitives', '............1', 'INS', dict(primsParams1, id=1)), params=primsParams1),
+                bf('setprim', { 'id': 0, 'boolvar': False }, bfDbop('primitives', '', 'UPD', { 'id': 0, 'boolvar': 0 }), params={ 'boolvar': 0 }),
+                bf('setprim', { 'id': 1, 'boolvar': True }, bfDbop('primitives', '............1', 'UPD', { 'id': 1, 'boolvar': 1 }), params={ 'boolvar': 1 }),
+                bf('bltins', bltinsData, bfDbop('builtins', '', 'INS', dict(bltinsData, id=0))),
+                bf('complex', complexData, bfDbop('complex', '', 'INS', dict(complexData, id=0))),
+            ],
+            # battlefield1's member table, and its deferred transactions
+            'members': [
+                bf('dbins', { 'account': 'battlefield1' },
+                    member(1, 'dbops1', 'inserted billed to calling account'),
+                    member(2, 'dbops2', 'inserted billed to self')),
+                push('battlefield1', 'dbupd', { 'account': 'battlefield2' }, 'battlefield2',
+                    expectAction('battlefield1', 'battlefield1', 'dbupd', { 'account': 'battlefield2' }),
+                    member(1, 'dbops1', 'updated row 1', 'UPD'),
+                    member(2, 'dbupd', 'updated row 2', 'UPD')),
+                bf('dbrem', { 'account': 'battlefield1' }, bfDbop('member', '............1', 'REM', {}), bfDbop('member', '............2', 'REM', {})),
+                dtrx('battlefield1', '1'),
+                bf('dtrxcancel', { 'account': 'battlefield1' }),
+                # `send_deferred` with `replace_existing` enabled, to test `MODIFY` clauses.
+                dtrx('battlefield1', '1'),
+                dtrx('battlefield1', '2', deferred=1),
+                # fails without an onerror handler
+                dtrx('battlefield1', '1', failLater=True, deferred=1),
+                dtrx('battlefield1', '2', failLaterNested=True, deferred=1),
+                # This TX will do one DB_OPERATION for writing, and the second will fail. We want our instrumentation NOT to keep that DB_OPERATION.
+                bf('dbinstwo', { 'account': 'battlefield1', 'first': 100, 'second': 101 },
+                    member(100, '...........a4', 'inserted billed to calling account'),
+                    member(101, '...........a5', 'inserted billed to self')),
+            ],
+            # battlefield3's onerror handler succeeds, fails, and fails inside a nested action.
+            # Its onerror records are soft errors and not expected.
+            'battlefield3': [
+                dtrx('battlefield3', '1', failLater=True, deferred=1),
+                dtrx('battlefield3', 'f', failLater=True, deferred=1),
+                dtrx('battlefield3', 'nf', failLater=True, deferred=1),
+            ],
+            # Create auth structs, updateauth to create, updateauth to modify, deleteauth to test AUTH_OPs
+            'auth': [
+                # random key, then back to a safe key
+                cleos('set account permission battlefield2 ops EOS7f5watu1cLgth3ub1uAnsGkHq1F6PhauScBg6rJGUfe79MgG9Y active', updateauth('battlefield2', 'active', 'ops')),
+                cleos('set account permission battlefield2 ops EOS5MHPYyhjBjnQZejzZHqHewPWhGTfQWSVTWYEhDmJu4SXkzgweP', updateauth('battlefield2', 'active', 'ops')),
+                cleos('set action permission battlefield2 eosio.token transfer ops',
+                    expectAction('eosio', 'eosio', 'linkauth', { 'account': 'battlefield2', 'code': 'eosio.token', 'requirement': 'ops', 'type': 'transfer' })),
+                cleos('set action permission battlefield2 eosio.token transfer NULL',
+                    expectAction('eosio', 'eosio', 'unlinkauth', { 'account': 'battlefield2', 'code': 'eosio.token', 'type': 'transfer' })),
+                cleos('set account permission battlefield2 ops NULL',
+                    expectAction('eosio', 'eosio', 'deleteauth', { 'account': 'battlefield2', 'permission': 'ops' })),
+            ],
+            # A creational order different than the execution order. --force-unique puts a
+            # context-free action in the transaction before ours, making a multi-root
+            # execution traces tree.
+            'inline': [
+                cleos('push action --force-unique battlefield1 creaorder \'%s\' -p battlefield1' % json.dumps(creaorderData),
+                    expectAction('battlefield1', 'battlefield1', 'creaorder', creaorderData),
+                    expectAction('battlefield1', 'notified1', 'creaorder', creaorderData),
+                    expectAction('battlefield1', 'notified2', 'creaorder', creaorderData),
+                    expectAction('battlefield1', 'notified3', 'creaorder', creaorderData),
+                    expectAction('eosio.null', 'eosio.null', 'nonce', {}),
+                    expectAction('eosio.null', 'eosio.null', 'nonce', {}),
+                    expectAction('battlefield1', 'battlefield1', 'inlinedeep', inlinedeepData),
+                    expectAction('battlefield1', 'notified4', 'inlinedeep', inlinedeepData),
+                    expectAction('battlefield1', 'notified5', 'inlinedeep', inlinedeepData),
+                    expectAction('eosio.null', 'eosio.null', 'nonce', {}),
+                    expectAction('battlefield1', 'battlefield1', 'inlineempty', { 'fail': 0, 'tag': 'i3' }),
+                    expectAction('battlefield1', 'battlefield1', 'inlineempty', { 'fail': 0, 'tag': 'i1' })),
+            ],
+            # battlefield1's variant, secondary key and binary extension tables
+            'tables': [
+                bf('varianttest', { 'value': ['uint16', 12] },
+                    bfDbop('variant', '', 'INS', { 'creation_number': '*', 'id': 0, 'variant_field': ['uint16', 12] })),
+                bf('varianttest', { 'value': ['string', 'this is a long value'] },
+                    bfDbop('variant', '............1', 'INS', { 'creation_number': '1099511627520', 'id': 1, 'variant_field': ['int32', 20] })),
+            ] + [sktest(name, *expected) for name, expected in skCycle(0)] + [
+                sktest('insert.big',
+                    bfDbop('sk.i', '', 'INS', dict(zeroSkRow, i64='9223372036854775807')),
+                    bfDbop('sk.ii', '', 'INS', dict(zeroSkRow, i128='340282366920938463463374607431768211455')),
+                    bfDbop('sk.d', '', 'INS', dict(zeroSkRow, d64='%.17f' % 1.7976931348623157e308)),
+                    bfDbop('sk.dd', '', 'INS', dict(zeroSkRow, d128='0xfffffffffffffffffffffffffffffe7f')),
+                    bfDbop('sk.c', '', 'INS', dict(zeroSkRow, c256='f' * 64)),
+                    bfDbop('sk.multi', '', 'INS', skRow('sk.multi', 0, 0))),
+                push('battlefield1', 'retvalue', { 'n': 100 }, 'battlefield1', expectAction('battlefield1', 'battlefield1', 'retvalue', { 'n': 100 }, '101')),
+                bf('binexttest', { 'data': 'bintest' }, bfDbop('binaryext', '', 'INS', { 'binext_field': 'bintest', 'id': 0 })),
+                bf('binexttest', {}, bfDbop('binaryext', '............1', 'INS', { 'binext_field': '', 'id': 1 })),
+                bf('optiontest', { 'opt_param': 'opti' }),
+                bf('optiontest', { 'opt_param': None }, params={ 'opt_param': 'null' }),
+                # create a bunch of rows, after the two of varianttest
+                bf('producerows', { 'row_count': 100 }, *variantRows(2, 100)),
+            ],
+        },
+    ]
@@ -0,0 +1,155 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import tempfile
+import time
+
+import synthetic
+import validate
+
+# Benchmarks validate.py on a synthetic dataset (see synthetic.py) or on given
+# files. Every run happens in a fresh process, so its peak RSS is not inflated
+# by earlier runs. Misses are counted but their messages are not printed.
+
+MODES = ('indexed', 'stream', 'parallel', 'cached')
+
+
+def peak_rss_mb(who):
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+def run_mode(mode, expected_file, dmlog_file, jobs, cache_dir):
+    kwargs = {
+        'indexed': {},
+        'stream': {'stream': True},
+        'parallel': {'jobs': jobs},
+        'cached': {'cache_dir': cache_dir},
+    }[mode]
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        failed_actions, actions, failed_dbops, db_ops = validate.validate(expected_file, dmlog_file, **kwargs)
+        seconds = time.perf_counter() - start
+    return {
+        'seconds': seconds,
+        'matched': actions + db_ops,
+        'failed': failed_actions + failed_dbops,
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF),
+        'workers_peak_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+def call_and_send(connection, function, args):
+    connection.send(function(*args))
+    connection.close()
+
+def run_in_process(function, *args):
+    # Not a multiprocessing.Pool: its daemonic workers could not start the
+    # parallel mode's own worker processes
+    context = multiprocessing.get_context('fork')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=call_and_send, args=(sender, function, args))
+    process.start()
+    sender.close()
+    try:
+        result = receiver.recv()
+    except EOFError:
+        raise RuntimeError('%s%r failed, see above' % (function.__name__, args))
+    finally:
+        process.join()
+    return result
+
+def count_dmlog_records(dmlog_file):
+    actions, dbops = validate.extract_dmlog_records(dmlog_file)
+    return len(actions), len(dbops)
+
+def benchmark(expected_file, dmlog_file, modes, jobs, repeat):
+    dmlog_actions, dmlog_dbops = run_in_process(count_dmlog_records, dmlog_file)
+    expected = sum(1 for _ in validate.iter_expected_records(expected_file))
+    cache_dir = tempfile.mkdtemp(prefix='bench-validate-cache-')
+    try:
+        if 'cached' in modes:
+            # Fill the cache first, so 'cached' measures a warm run
+            run_in_process(run_mode, 'cached', expected_file, dmlog_file, jobs, cache_dir)
+        results = []
+        for mode in modes:
+            runs = [run_in_process(run_mode, mode, expected_file, dmlog_file, jobs, cache_dir) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run['seconds'])
+            results.append(dict(best, mode=mode,
+                expected_per_sec=expected / best['seconds'],
+                dmlog_records_per_sec=(dmlog_actions + dmlog_dbops) / best['seconds']))
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return {
+        'expected_file': expected_file,
+        'dmlog_file': dmlog_file,
+        'expected_records': expected,
+        'dmlog_actions': dmlog_actions,
+        'dmlog_dbops': dmlog_dbops,
+        'jobs': jobs,
+        'repeat': repeat,
+        'results': results,
+    }
+
+def print_report(report):
+    print('%d expected records, %d action traces and %d dbops in the dmlog' % (report['expected_records'], report['dmlog_actions'], report['dmlog_dbops']))
+    print('%-9s %9s %14s %14s %10s %12s %8s' % ('mode', 'seconds', 'expected/s', 'dmlog rec/s', 'peak MB', 'workers MB', 'misses'))
+    for result in report['results']:
+        print('%-9s %9.2f %14.0f %14.0f %10.1f %12.1f %8d' % (
+            result['mode'], result['seconds'], result['expected_per_sec'], result['dmlog_records_per_sec'],
+            result['peak_rss_mb'], result['workers_peak_rss_mb'], result['failed']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark validate.py throughput and peak memory')
+    parser.add_argument('expected_file', type=str, nargs='?', help='Expected records to validate (generated when omitted)')
+    parser.add_argument('dmlog_file', type=str, nargs='?', help='dmlog JSON or raw .dmlog to validate against (generated when omitted)')
+    parser.add_argument('--modes', type=str, default=','.join(MODES), help='Comma separated validate.py modes to run: ' + ', '.join(MODES))
+    parser.add_argument('-j', '--jobs', type=int, default=0, help='Worker processes for the parallel mode (0 = one per CPU, at least 2)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per mode, the fastest one is reported')
+    parser.add_argument('--json', type=str, help='Also write the report as JSON to this file, for tracking regressions')
+    parser.add_argument('--keep', type=str, help='Generate the dataset into this directory and keep it')
+    synthetic.add_arguments(parser)
+    args = parser.parse_args()
+
+    modes = [mode for mode in args.modes.split(',') if mode]
+    for mode in modes:
+        if mode not in MODES:
+            parser.error('unknown mode %s' % mode)
+    if 'parallel' in modes and args.jobs == 1:
+        parser.error('the parallel mode needs --jobs of at least 2')
+    if bool(args.expected_file) != bool(args.dmlog_file):
+        parser.error('give both expected_file and dmlog_file, or neither')
+
+    data_dir = None
+    if args.expected_file:
+        expected_file, dmlog_file = args.expected_file, args.dmlog_file
+    else:
+        data_dir = args.keep or tempfile.mkdtemp(prefix='bench-validate-')
+        os.makedirs(data_dir, exist_ok=True)
+        dmlog_file = os.path.join(data_dir, 'synthetic.dmlog.json')
+        expected_file = os.path.join(data_dir, 'synthetic.expected.' + ('bin' if args.binary else 'jsonl'))
+        start = time.perf_counter()
+        actions, dbops, expected = synthetic.write_dataset(dmlog_file, expected_file, synthetic.generator_from_args(args), args.binary)
+        print('Generated %d action traces, %d dbops and %d expected records in %.1fs' % (actions, dbops, expected, time.perf_counter() - start))
+
+    try:
+        # With one worker validate.py falls back to the indexed mode, which the parallel mode must not measure
+        report = benchmark(expected_file, dmlog_file, modes, args.jobs or max(2, os.cpu_count()), args.repeat)
+    finally:
+        if data_dir and not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if len({(result['matched'], result['failed']) for result in report['results']}) > 1:
+        print("🛑 The modes disagree on what matched, run check_validate.py on the same files")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,37 @@
 #!/usr/bin/env python3
 
 import argparse
+import asyncio
+import hashlib
 import json
 import os
 import re
+import shutil
 import subprocess
 import sys
 import time
 import inspect
+import threading
+import multiprocessing
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 
-from log import initLogging, logAction, logDbop
+import battlefield
+from client import ChainClient, ChainError, HttpEndpoint, action
+from keys import generateK1Key, generateK1Keys
+from log import closeLogging, initLogging, logAction, logDbop
+from metrics import metrics, summarize
 
 
 args = None
 logFile = None
+client = None
+restoredSnapshot = None
+
+walletPort = 6666
+blockIntervalMs = 500
+waitPollInterval = 0.1
 
 unlockTimeout = 999999999
 fastUnstakeSystem = './fast.refund/eosio.system/eosio.system.wasm'
@@ -61,42 +79,171 @@ def getCleos(is_random = False):
 def jsonArg(a):
     return " '" + json.dumps(a) + "' "
 
+def callLabel(command):
+    # 'push action', 'system newaccount', 'rm', ... for the latency report
+    words = command.split()
+    if words and words[0] == args.cleos.split()[0]:
+        words = [w for w in words[1:] if not w.startswith('-') and not w.startswith('http://')]
+        return 'cleos ' + ' '.join(words[:2])
+    return os.path.basename(words[0]) if words else ''
+
 def run(args):
     print('boot.py run:', args)
     logFile.write(args + '\n')
-    if subprocess.call(args, shell=True):
+    with metrics.timed('run.' + callLabel(args)):
+        failed = subprocess.call(args, shell=True)
+    if failed:
         print('boot.py: exiting because of error')
         sys.exit(1)
 
+def trxIdFromOutput(output):
+    match = re.search(r'transaction: (\w{64})', output)
+    return match.group(1) if match else None
+
 def retry_with_id(args):
     while True:
         print('boot.py retry: ', args)
         
         # Run the subprocess and capture both stdout and stderr
-        result = subprocess.run(args, shell=True, universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with metrics.timed('retry.' + callLabel(args)):
+            result = subprocess.run(args, shell=True, universal_newlines=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         combined_output = result.stdout + result.stderr
         
         
-        pattern = r'transaction: (\w{64})'
-        match = re.search(pattern, combined_output)
-        if match:
-            transaction_id = match.group(1)
+        transaction_id = trxIdFromOutput(combined_output)
+        if transaction_id:
             return transaction_id
         else:
             print('Error: ', result.stderr)
             print('*** Retry')
+            metrics.count('retries.' + callLabel(args))
             sleep(1)
             
 def retry(args):
     while True:
         print('boot.py retry: ', args)
         logFile.write(args + '\n')
-        if subprocess.call(args, shell=True):
+        with metrics.timed('retry.' + callLabel(args)):
+            failed = subprocess.call(args, shell=True)
+        if failed:
             print('*** Retry')
+            metrics.count('retries.' + callLabel(args))
             sleep(1)
         else:
             break
 
+def pushActions(actions):
+    while True:
+        if args.http:
+            print('boot.py push:', json.dumps(actions))
+            try:
+                with metrics.timed('push.http'):
+                    return client.pushActions(actions)['transaction_id']
+            except (ChainError, OSError) as e:
+                print('Error: ', e)
+                print('*** Retry')
+                metrics.count('retries.push.http')
+                sleep(1)
+        else:
+            return retry_with_id(pushCommand(actions))
+
+def pushCommand(actions):
+    # --force-unique adds the eosio.null::nonce action the HTTP client adds, so
+    # pushing the same actions twice in a row makes two transactions here too
+    if len(actions) == 1:
+        a = actions[0]
+        return (getCleos() + 'push action --force-unique ' + a['account'] + ' ' + a['name'] + jsonArg(a['data']) +
+            ' '.join('-p %s@%s' % (p['actor'], p['permission']) for p in a['authorization']))
+    return getCleos() + 'push transaction --force-unique' + jsonArg({'actions': actions})
+
+def pushAction(account, name, data, actor, permission='active'):
+    return pushActions([action(account, name, data, actor, permission)])
+
+async def pushOnceAsync(actions, executor, verbose=True):
+    # One attempt at pushing the actions without blocking the event loop while
+    # cleos or nodeos work. Returns the trx id, or None after printing the error.
+    if args.http:
+        if verbose:
+            print('boot.py push:', json.dumps(actions))
+        try:
+            with metrics.timed('push.http'):
+                return (await asyncio.get_running_loop().run_in_executor(executor, client.pushActions, actions))['transaction_id']
+        except (ChainError, OSError) as e:
+            print('Error: ', e)
+            return None
+    command = pushCommand(actions)
+    if verbose:
+        print('boot.py retry: ', command)
+    with metrics.timed('retry.' + callLabel(command)):
+        proc = await asyncio.create_subprocess_shell(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = await proc.communicate()
+    transaction_id = trxIdFromOutput(stdout.decode() + stderr.decode())
+    if not transaction_id:
+        print('Error: ', stderr.decode())
+    return transaction_id
+
+async def pushActionsAsync(actions, executor):
+    # Same as pushActions, retrying until the push succeeds
+    while True:
+        transaction_id = await pushOnceAsync(actions, executor)
+        if transaction_id:
+            return transaction_id
+        print('*** Retry')
+        metrics.count('retries.' + ('push.http' if args.http else callLabel(pushCommand(actions))))
+        with metrics.timed('sleep'):
+            await asyncio.sleep(1)
+
+async def pushAllAsync(transactions):
+    window = asyncio.Semaphore(args.max_inflight)
+    with ThreadPoolExecutor(args.max_inflight) as executor:
+        async def push(actions):
+            async with window:
+                return await pushActionsAsync(actions, executor)
+        return await asyncio.gather(*map(push, transactions))
+
+class ActionBatcher:
+    """Packs groups of actions into transactions of up to `size` actions.
+
+    A group always lands in a single transaction, together with other groups
+    that have exactly the same authorizations. `logExpected(trx_id)` callbacks
+    passed to add() run once the transaction holding their group is pushed, so
+    expected records get the real trx id.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.batches = []
+        self.open = {}
+
+    def add(self, actions, logExpected=None):
+        authorizations = tuple(sorted(set((p['actor'], p['permission']) for a in actions for p in a['authorization'])))
+        batch = self.open.get(authorizations)
+        if batch == None or len(batch['actions']) + len(actions) > self.size:
+            batch = {'actions': [], 'logs': []}
+            self.batches.append(batch)
+            self.open[authorizations] = batch
+        batch['actions'] += actions
+        if logExpected:
+            batch['logs'].append(logExpected)
+
+    def flush(self):
+        batches, self.batches, self.open = self.batches, [], {}
+        if any(batch['logs'] for batch in batches):
+            # Expected records have to follow chain order, so keep these sequential
+            trx_ids = [pushActions(batch['actions']) for batch in batches]
+        else:
+            trx_ids = pushAll([batch['actions'] for batch in batches])
+        for batch, trx_id in zip(batches, trx_ids):
+            for logExpected in batch['logs']:
+                logExpected(trx_id)
+        return trx_ids
+
+def pushAll(transactions):
+    # Pushes each list of actions as its own transaction, keeping up to
+    # --max-inflight of them in flight. Failed transactions are retried on
+    # their own; returns the trx ids in the same order.
+    return asyncio.run(pushAllAsync(transactions))
+
 def background(args):
     print('boot.py background:', args)
     logFile.write(args + '\n')
@@ -113,18 +260,93 @@ def getJsonOutput(args):
 
 def sleep(t):
     print('sleep', t, '...')
-    time.sleep(t)
+    with metrics.timed('sleep'):
+        time.sleep(t)
     print('resume')
 
+def waitFor(description, condition, timeout=None):
+    # Polls condition() until it returns something truthy. Errors from a node
+    # that is not serving yet count as "not yet".
+    if timeout == None:
+        timeout = args.wait_timeout
+    print('boot.py wait:', description)
+    with metrics.timed('wait.' + description.split()[0]):
+        return pollUntil(description, condition, timeout)
+
+def pollUntil(description, condition, timeout):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            result = condition()
+        except (ChainError, OSError):
+            result = None
+        if result:
+            return result
+        if time.time() >= deadline:
+            print('boot.py: exiting because of timeout (%gs) waiting for %s' % (timeout, description))
+            sys.exit(1)
+        time.sleep(waitPollInterval)
+
+def headBlockNum():
+    return client.getInfo()['head_block_num']
+
+def waitForBlock(blockNum):
+    return waitFor('block %d' % blockNum, lambda: headBlockNum() >= blockNum)
+
+def waitForBlocks(count=1):
+    # Everything the node accepted so far is in its pending block, which is
+    # head + 1 once produced
+    return waitForBlock(waitFor('head block', headBlockNum) + count)
+
+def trxBlockNum(trx_id):
+    return client.post('/v1/trace_api/get_transaction_trace', {'id': trx_id})['block_num']
+
+def waitForTrx(trx_id):
+    # trace_api_plugin on the boot node knows the transaction once its block is produced
+    return waitFor('transaction %s' % trx_id, lambda: trxBlockNum(trx_id))
+
+def waitForDeferred(trx_id, delaySec):
+    # A deferred transaction runs in the first block at least delaySec after
+    # the block that scheduled it
+    blockNum = waitForTrx(trx_id)
+    return waitForBlock(blockNum + delaySec * 1000 // blockIntervalMs + 1)
+
+def waitForAll(probes):
+    # Runs the probes side by side, each with its own timeout
+    with ThreadPoolExecutor(max(len(probes), 1)) as executor:
+        for future in [executor.submit(probe) for probe in probes]:
+            future.result()
+
+def waitForNode(nodeIndex, syncedBlock=0):
+    # Ready once get_info answers and the head moved past both the first head
+    # seen and syncedBlock, i.e. the node produces or syncs blocks
+    port = args.http_port + nodeIndex
+    node = HttpEndpoint('http://127.0.0.1:%d' % port)
+    heads = []
+    def ready():
+        head = node.post('/v1/chain/get_info')['head_block_num']
+        heads.append(head)
+        return head > max(heads[0], syncedBlock)
+    waitFor('node %d on port %d to reach block %d' % (nodeIndex, port, syncedBlock), ready, args.node_timeout)
+
+def waitForWallet():
+    waitFor('keosd on port %d' % walletPort, lambda: client.wallet.post('/v1/wallet/list_wallets') != None, args.node_timeout)
+
+def waitForDmNode():
+    # The deep-mind node has no HTTP API; it is up once it writes to the dmlog
+    waitFor('deep-mind node to write to ' + args.dmlog_path, lambda: os.path.getsize(args.dmlog_path) > 0, args.node_timeout)
+
 def startWallet():
     run('rm -rf ' + os.path.abspath(args.wallet_dir))
     run('mkdir -p ' + os.path.abspath(args.wallet_dir))
-    background(args.keosd + ' --unlock-timeout %d --http-server-address 127.0.0.1:6666 --http-max-response-time-ms 99999 --wallet-dir %s' % (unlockTimeout, os.path.abspath(args.wallet_dir)))
-    sleep(.4)
-    run(getCleos() + 'wallet create --to-console')
+    background(args.keosd + ' --unlock-timeout %d --http-server-address 127.0.0.1:%d --http-max-response-time-ms 99999 --wallet-dir %s' % (unlockTimeout, walletPort, os.path.abspath(args.wallet_dir)))
+    waitForWallet()
+    # the wallet never locks (see --unlock-timeout), so the password is only printed
+    print('boot.py: created wallet, password:', client.createWallet())
 
 def importKeys():
-    run(getCleos() + 'wallet import --private-key ' + args.private_key)
+    # All keys go to keosd over the client's keep-alive connection instead of
+    # one cleos process per key
     keys = {}
     for a in accounts:
         key = a['pvt']
@@ -132,13 +354,65 @@ def importKeys():
             if len(keys) >= args.max_user_keys:
                 break
             keys[key] = True
-            run(getCleos() + 'wallet import --private-key ' + key)
     for i in range(firstProducer, firstProducer + numProducers):
-        a = accounts[i]
-        key = a['pvt']
-        if not key in keys:
-            keys[key] = True
-            run(getCleos() + 'wallet import --private-key ' + key)
+        keys[accounts[i]['pvt']] = True
+    keys.pop(args.private_key, None)
+    keys = [args.private_key] + list(keys)
+    print('boot.py: importing %d keys into the wallet' % len(keys))
+    logFile.write('import %d keys into keosd\n' % len(keys))
+    for key in keys:
+        client.importKey(key)
+
+# The bootstrap steps are made of these sources, changing any of them invalidates cached snapshots
+SNAPSHOT_SOURCES = ('boot.py', 'client.py', 'abi.py', 'keys.py')
+
+def snapshotKey():
+    # Everything the chain state at the end of stepInitSystemContract depends on,
+    # including the nodeos version: boot.sh runs several against the same --snapshot-dir
+    h = hashlib.sha256()
+    sourceDir = os.path.dirname(os.path.abspath(__file__))
+    for name in SNAPSHOT_SOURCES:
+        with open(os.path.join(sourceDir, name), 'rb') as f:
+            h.update(f.read())
+    for path in (args.genesis_path, args.accounts_path):
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    for root, dirs, files in os.walk(args.contracts_dir):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            h.update(os.path.relpath(path, args.contracts_dir).encode())
+            with open(path, 'rb') as f:
+                h.update(f.read())
+    h.update(json.dumps([getOutput(args.nodeos + ' --version').strip(), args.symbol, args.user_limit, args.producer_limit, args.public_key]).encode())
+    return h.hexdigest()[:32]
+
+def snapshotPath():
+    return os.path.abspath(os.path.join(args.snapshot_dir, snapshotKey() + '.bin'))
+
+def findSnapshot():
+    path = snapshotPath()
+    return path if os.path.exists(path) else None
+
+def saveSnapshot():
+    # create_snapshot answers once the snapshot block is irreversible
+    result = client.post('/v1/producer/create_snapshot')
+    path = snapshotPath()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    shutil.copyfile(result['snapshot_name'], path + '.tmp')
+    os.replace(path + '.tmp', path)
+    print('boot.py: saved snapshot of block %d to %s' % (result['head_block_num'], path))
+
+def skipRestored():
+    # Steps whose effects are already part of the restored snapshot
+    if restoredSnapshot:
+        print('boot.py: skipping, state restored from', restoredSnapshot)
+    return restoredSnapshot != None
+
+def chainStateOpts():
+    if restoredSnapshot:
+        return '    --snapshot ' + restoredSnapshot
+    return '    --genesis-json ' + os.path.abspath(args.genesis_path)
 
 def startNode(nodeIndex, account):
     dir = args.nodes_dir + ('%02d-' % nodeIndex) + account['name'] + '/'
@@ -155,8 +429,8 @@ def startNode(nodeIndex, account):
         # (which is defined in .../chain/include/eosio/chain/config.hpp
         # as block_interval_ms = 500)
         '    --max-transaction-time=200'
-        '    --contracts-console'
-        '    --genesis-json ' + os.path.abspath(args.genesis_path) +
+        '    --contracts-console' +
+        chainStateOpts() +
         '    --blocks-dir ' + os.path.abspath(dir) + '/blocks'
         '    --config-dir ' + os.path.abspath(dir) +
         '    --data-dir ' + os.path.abspath(dir) +
@@ -186,7 +460,7 @@ def startDmNode():
     otherOpts = ''
     cmd = (
         args.nodeos +
-        '    --genesis-json ' + os.path.abspath(args.genesis_path) +
+        chainStateOpts() +
         '    --blocks-dir ' + os.path.abspath(dir) + '/blocks'
         '    --config-dir ' + os.path.abspath(dir) +
         '    --data-dir ' + os.path.abspath(dir) +
@@ -202,10 +476,12 @@ def startDmNode():
     background(cmd + '  1> '+os.path.abspath(args.dmlog_path) + ' 2>>' + dir + 'stderr')
 
 def startProducers(b, e):
-    for i in range(b, e):
-        startNode(i - b + 1, accounts[i])
+    with ThreadPoolExecutor(max(e - b, 1)) as executor:
+        list(executor.map(lambda i: startNode(i - b + 1, accounts[i]), range(b, e)))
 
 def createSystemAccounts():
+    if skipRestored():
+        return
     for a in systemAccounts:
         run(getCleos() + 'create account eosio ' + a + ' ' + args.public_key)
 
@@ -233,6 +509,7 @@ def createStakedAccounts(b, e):
     ramFunds = round(args.ram_funds * 10000)
     configuredMinStake = round(args.min_stake * 10000)
     maxUnstaked = round(args.max_unstaked * 10000)
+    batcher = ActionBatcher(args.batch_size)
     for i in range(b, e):
         a = accounts[i]
         funds = a['funds']
@@ -249,28 +526,40 @@ def createStakedAccounts(b, e):
         stakeCpu = stake - stakeNet
         print('%s: total funds=%s, ram=%s, net=%s, cpu=%s, unstaked=%s' % (a['name'], intToCurrency(a['funds']), intToCurrency(ramFunds), intToCurrency(stakeNet), intToCurrency(stakeCpu), intToCurrency(unstaked)))
         assert(funds == ramFunds + stakeNet + stakeCpu + unstaked)
-        retry(getCleos() + 'system newaccount --transfer eosio %s %s --stake-net "%s" --stake-cpu "%s" --buy-ram "%s"   ' % 
-            (a['name'], a['pub'], intToCurrency(stakeNet), intToCurrency(stakeCpu), intToCurrency(ramFunds)))
+        auth = {'threshold': 1, 'keys': [{'key': a['pub'], 'weight': 1}], 'accounts': [], 'waits': []}
+        actions = [
+            action('eosio', 'newaccount', {'creator': 'eosio', 'name': a['name'], 'owner': auth, 'active': auth}, 'eosio'),
+            action('eosio', 'buyram', {'payer': 'eosio', 'receiver': a['name'], 'quant': intToCurrency(ramFunds)}, 'eosio'),
+            action('eosio', 'delegatebw', {'from': 'eosio', 'receiver': a['name'], 'stake_net_quantity': intToCurrency(stakeNet), 'stake_cpu_quantity': intToCurrency(stakeCpu), 'transfer': True}, 'eosio'),
+        ]
         if unstaked:
-            retry(getCleos() + 'transfer eosio %s "%s"' % (a['name'], intToCurrency(unstaked)))
+            actions.append(action('eosio.token', 'transfer', {'from': 'eosio', 'to': a['name'], 'quantity': intToCurrency(unstaked), 'memo': ''}, 'eosio'))
+        batcher.add(actions)
+    batcher.flush()
 
 def regProducers(b, e):
-    for i in range(b, e):
-        a = accounts[i]
-        retry(getCleos() + 'system regproducer ' + a['name'] + ' ' + a['pub'] + ' https://' + a['name'] + '.com' + '/' + a['pub'])
+    pushAll([[action('eosio', 'regproducer', {
+        'producer': a['name'],
+        'producer_key': a['pub'],
+        'url': 'https://' + a['name'] + '.com' + '/' + a['pub'],
+        'location': 0,
+    }, a['name'])] for a in accounts[b:e]])
 
 def listProducers():
     run(getCleos() + 'system listproducers')
 
 def vote(b, e):
+    transactions = []
     for i in range(b, e):
         voter = accounts[i]['name']
         k = args.num_producers_vote
         if k > numProducers:
             k = numProducers
         prods = [(3*i + 2*j) % numProducers + firstProducer for j in range(k)]
-        prods = ' '.join(map(lambda x: accounts[x]['name'], prods))
-        retry(getCleos(True) + 'system voteproducer prods ' + voter + ' ' + prods)
+        # voteproducer wants the producer list sorted and unique
+        prods = sorted(set(map(lambda x: accounts[x]['name'], prods)))
+        transactions.append([action('eosio', 'voteproducer', {'voter': voter, 'proxy': '', 'producers': prods}, voter)])
+    pushAll(transactions)
 
 def claimRewards():
     table = getJsonOutput(getCleos(True) + 'get table eosio eosio producers -l 100')
@@ -283,14 +572,12 @@ def claimRewards():
 def proxyVotes(b, e):
     vote(firstProducer, firstProducer + 1)
     proxy = accounts[firstProducer]['name']
-    retry(getCleos(True) + 'system regproxy ' + proxy)
-    sleep(1.0)
-    for i in range(b, e):
-        voter = accounts[i]['name']
-        retry(getCleos(True) + 'system voteproducer proxy ' + voter + ' ' + proxy)
+    pushAction('eosio', 'regproxy', {'proxy': proxy, 'isproxy': True}, proxy)
+    waitForBlocks()
+    pushAll([[action('eosio', 'voteproducer', {'voter': a['name'], 'proxy': proxy, 'producers': []}, a['name'])] for a in accounts[b:e]])
 
 def updateAuth(account, permission, parent, controller):
-    run(getCleos(True) + 'push action eosio updateauth' + jsonArg({
+    return pushAction('eosio', 'updateauth', {
         'account': account,
         'permission': permission,
         'parent': parent,
@@ -301,23 +588,265 @@ def updateAuth(account, permission, parent, controller):
                 'permission': {'actor': controller, 'permission': 'active'}
             }]
         }
-    }) + '-p ' + account + '@' + permission)
+    }, account, permission)
 
 def resign(account, controller):
     updateAuth(account, 'owner', '', controller)
-    updateAuth(account, 'active', 'owner', controller)
-    sleep(1)
+    waitForTrx(updateAuth(account, 'active', 'owner', controller))
     run(getCleos(True) + 'get account ' + account)
 
+def logTransfer(data):
+    def log(trx_id):
+        logAction(trx_id, 'eosio.token', data['from'], 'transfer', data)
+        logAction(trx_id, 'eosio.token', data['to'], 'transfer', data)
+    return log
+
 def randomTransfer(b, e, num):
     senders = e - b - 1
+    batcher = ActionBatcher(args.batch_size)
     for j in range(num):
         src = accounts[b + j % senders]['name']
         dest = accounts[b + (j + 1) % senders]['name']
-        trx_id = retry_with_id(getCleos(True) + 'transfer -f ' + src + ' ' + dest + ' "0.0001 ' + args.symbol + '" "transfer from ' + src + ' to ' + dest + '" || true')
-        logAction(trx_id, 'eosio.token', src, 'transfer', { 'from': src, 'to': dest, 'quantity': '0.0001 ' + args.symbol, 'memo': 'transfer from ' + src + ' to ' + dest })
-        logAction(trx_id, 'eosio.token', dest, 'transfer', { 'from': src, 'to': dest, 'quantity': '0.0001 ' + args.symbol, 'memo': 'transfer from ' + src + ' to ' + dest })
-        sleep(0.6)
+        # Transfer j + senders repeats the accounts of transfer j, the memo keeps them
+        # from being duplicate transactions (the batch may hold a single transfer)
+        data = { 'from': src, 'to': dest, 'quantity': '0.0001 ' + args.symbol, 'memo': 'transfer %d from %s to %s' % (j, src, dest) }
+        batcher.add([action('eosio.token', 'transfer', data, src)], logTransfer(data))
+    for trx_id in batcher.flush():
+        waitForTrx(trx_id)
+
+def loadAction(i, users):
+    # Transaction number i of the load: a transfer between two of the users or,
+    # for --load-battlefield of them, a battlefield1::retvalue. Returns its
+    # actions and the callback logging its expected records.
+    if int((i + 1) * args.load_battlefield) > int(i * args.load_battlefield):
+        def logRetvalue(trx_id):
+            logAction(trx_id, 'battlefield1', 'battlefield1', 'retvalue', { 'n': i }, str(i + 1))
+        return [action('battlefield1', 'retvalue', { 'n': i }, 'battlefield1')], logRetvalue
+    src = users[i % len(users)]
+    dest = users[(i + 1 + i // len(users) % (len(users) - 1)) % len(users)]
+    data = { 'from': src, 'to': dest, 'quantity': '0.0001 ' + args.symbol, 'memo': 'load %d' % i }
+    return [action('eosio.token', 'transfer', data, src)], logTransfer(data)
+
+async def sendLoadAsync(count, users):
+    # Open loop: transaction i is sent at i / --load-tps seconds, or as soon as
+    # one of the --max-inflight slots frees up. Returns (submit time, trx id or
+    # None, expected records callback) for every transaction.
+    window = asyncio.Semaphore(args.max_inflight)
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(args.max_inflight) as executor:
+        async def send(actions, logExpected):
+            async with window:
+                submitted = time.time()
+                trx_id = await pushOnceAsync(actions, executor, False)
+                metrics.record('load.push', time.time() - submitted)
+                return submitted, trx_id, logExpected
+        begin = loop.time()
+        tasks = []
+        for i in range(count):
+            delay = begin + i / args.load_tps - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send(*loadAction(i, users))))
+        return await asyncio.gather(*tasks)
+
+def blockTransactions(blockNum):
+    # Ids of the transactions in a block in chain order, and the block time
+    block = client.post('/v1/chain/get_block', {'block_num_or_id': blockNum})
+    timestamp = datetime.strptime(block['timestamp'], '%Y-%m-%dT%H:%M:%S.%f').replace(tzinfo=timezone.utc).timestamp()
+    return [r['trx']['id'] if isinstance(r['trx'], dict) else r['trx'] for r in block['transactions']], timestamp
+
+def generateLoad():
+    users = [a['name'] for a in accounts[:max(2, min(args.load_senders, firstProducer))]]
+    count = int(args.load_tps * args.load_duration)
+    print('boot.py load: %d transactions at %g/s from %d senders' % (count, args.load_tps, len(users)))
+    firstBlock = headBlockNum()
+    start = time.time()
+    results = asyncio.run(sendLoadAsync(count, users))
+    sendTime = time.time() - start
+    accepted = {trx_id: (submitted, logExpected) for submitted, trx_id, logExpected in results if trx_id}
+    failed = len(results) - len(accepted)
+
+    # Everything accepted is in the pending block or older. Walking the blocks
+    # gives the inclusion times, and logs the expected records in chain order
+    # no matter in which order the pushes completed.
+    waitForBlocks()
+    lastBlock = headBlockNum()
+    latencies = []
+    lastTimestamp = start
+    for blockNum in range(firstBlock, lastBlock + 1):
+        trx_ids, timestamp = blockTransactions(blockNum)
+        for trx_id in trx_ids:
+            if trx_id in accepted:
+                submitted, logExpected = accepted.pop(trx_id)
+                logExpected(trx_id)
+                metrics.record('load.inclusion', timestamp - submitted)
+                latencies.append(timestamp - submitted)
+                lastTimestamp = timestamp
+    lost = len(accepted)
+
+    metrics.count('load.submitted', len(results))
+    metrics.count('load.failed', failed)
+    metrics.count('load.lost', lost)
+    print('boot.py load: sent %d transactions in %.1fs (%.1f/s), %d failed (%.2f%%), %d accepted but not in a block' % (
+        len(results), sendTime, len(results) / sendTime, failed, 100 * failed / max(len(results), 1), lost))
+    if latencies:
+        latency = summarize(latencies)
+        print('boot.py load: %d included in blocks %d-%d, %.1f TPS, submit to inclusion p50 %.3fs p90 %.3fs p99 %.3fs max %.3fs' % (
+            len(latencies), firstBlock, lastBlock, len(latencies) / max(lastTimestamp - start, 1e-3),
+            latency['p50'], latency['p90'], latency['p99'], latency['max']))
+
+def pushScenarioTransaction(transaction):
+    if 'cleos' in transaction:
+        return retry_with_id(getCleos() + transaction['cleos'])
+    return pushActions(transaction['actions'])
+
+def logExpected(trx_id, expected):
+    for record in expected:
+        if record[0] == 'action':
+            logAction(trx_id, *record[1:])
+        else:
+            logDbop(trx_id, *record[1:])
+
+def runLane(transactions, pushed):
+    for transaction in transactions:
+        trx_id = pushScenarioTransaction(transaction)
+        pushed[trx_id] = transaction['expected']
+        if transaction['deferred'] != None:
+            waitForDeferred(trx_id, transaction['deferred'])
+
+def runScenario(phases):
+    # Runs a scenario declared in battlefield.py: the lanes of each phase side
+    # by side, the transactions of a lane back to back. The pushes of different
+    # lanes interleave, so the expected records are logged at the end, walking
+    # the blocks to get chain order.
+    firstBlock = headBlockNum()
+    pushed = {}
+    for lanes in phases:
+        with ThreadPoolExecutor(len(lanes)) as executor:
+            for future in [executor.submit(runLane, transactions, pushed) for transactions in lanes.values()]:
+                future.result()
+    waitForBlocks()
+    lastBlock = headBlockNum()
+    for blockNum in range(firstBlock, lastBlock + 1):
+        for trx_id in blockTransactions(blockNum)[0]:
+            if trx_id in pushed:
+                logExpected(trx_id, pushed.pop(trx_id))
+    if pushed:
+        print('boot.py: %d transactions were accepted but never made it into blocks %d-%d: %s' % (len(pushed), firstBlock, lastBlock, ', '.join(pushed)))
+        sys.exit(1)
+    print('boot.py: scenario ran in blocks %d-%d' % (firstBlock, lastBlock))
+
+def nextPrimaryKey(table):
+    # available_primary_key() of a battlefield1 table: one past its last row
+    rows = client.post('/v1/chain/get_table_rows', {'json': True, 'code': 'battlefield1', 'scope': 'battlefield1', 'table': table, 'reverse': True, 'limit': 1})['rows']
+    return int(rows[0]['id']) + 1 if rows else 0
+
+def dmHeadBlock():
+    # Last block the deep-mind node wrote, from the tail of its log
+    with open(args.dmlog_path, 'rb') as f:
+        f.seek(max(0, os.path.getsize(args.dmlog_path) - (1 << 20)))
+        blocks = re.findall(rb'DMLOG ACCEPTED_BLOCK (\d+)', f.read())
+    return int(blocks[-1]) if blocks else 0
+
+class StressSampler(threading.Thread):
+    """Samples the deep-mind log size and the boot and deep-mind node heads.
+
+    `reached` keeps, for each block, when the boot node and the deep-mind
+    node were first seen at or past it.
+    """
+
+    def __init__(self, interval=0.25):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.samples = []
+        self.reached = ({}, {})
+
+    def sample(self):
+        now = time.time()
+        heads = (headBlockNum(), dmHeadBlock())
+        for reached, head in zip(self.reached, heads):
+            for blockNum in range(max(reached, default=head - 1) + 1, head + 1):
+                reached[blockNum] = now
+        self.samples.append((now, os.path.getsize(args.dmlog_path)) + heads)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                self.sample()
+            except (ChainError, OSError):
+                pass
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self.sample()
+
+    def blockLags(self):
+        # Seconds between the boot node and the deep-mind node reaching each block
+        booted, written = self.reached
+        return [written[blockNum] - booted[blockNum] for blockNum in sorted(written) if blockNum in booted]
+
+def generateStress():
+    # Transactions alternate between one producerows of --stress-rows rows and
+    # --stress-sk-cycles sktest cycles. Their row ids depend on what came before,
+    # so they are pushed one at a time and logged in that order.
+    if not os.path.exists(args.dmlog_path):
+        print('boot.py stress: no deep-mind log at %s, start the dm node first' % args.dmlog_path)
+        sys.exit(1)
+    variantId = nextPrimaryKey('variant')
+    skId = nextPrimaryKey('sk.i')
+    print('boot.py stress: %d transactions of %d variant rows or %d sktest cycles' % (args.stress_trxs, args.stress_rows, args.stress_sk_cycles))
+
+    firstBlock = headBlockNum()
+    sampler = StressSampler()
+    sampler.sample()
+    sampler.start()
+    submitted = {}
+    expectedDbops = 0
+    for i in range(args.stress_trxs):
+        if i % 2 == 0:
+            transaction = battlefield.bf('producerows', { 'row_count': args.stress_rows }, *battlefield.variantRows(variantId, args.stress_rows))
+            variantId += args.stress_rows
+        else:
+            transaction = battlefield.skCycles(skId, args.stress_sk_cycles)
+        expectedDbops += sum(1 for record in transaction['expected'] if record[0] == 'dbop')
+        start = time.time()
+        trx_id = pushScenarioTransaction(transaction)
+        metrics.record('stress.push', time.time() - start)
+        logExpected(trx_id, transaction['expected'])
+        submitted[trx_id] = start
+    sendTime = time.time() - sampler.samples[0][0]
+
+    waitForBlocks()
+    lastBlock = headBlockNum()
+    waitFor('deep-mind node to write block %d' % lastBlock, lambda: sampler.reached[1].get(lastBlock), args.node_timeout)
+    sampler.stop()
+
+    latencies = []
+    for blockNum in range(firstBlock, lastBlock + 1):
+        trx_ids, timestamp = blockTransactions(blockNum)
+        for trx_id in trx_ids:
+            if trx_id in submitted:
+                latencies.append(timestamp - submitted.pop(trx_id))
+                metrics.record('stress.inclusion', latencies[-1])
+    blockLags = sampler.blockLags()
+    for lag in blockLags:
+        metrics.record('stress.dm_block_lag', lag)
+
+    (startTime, startSize, _, _), (endTime, endSize, _, _) = sampler.samples[0], sampler.samples[-1]
+    dmlogBytes = endSize - startSize
+    metrics.count('stress.transactions', args.stress_trxs)
+    metrics.count('stress.expected_dbops', expectedDbops)
+    metrics.count('stress.dmlog_bytes', dmlogBytes)
+    print('boot.py stress: pushed %d transactions with %d dbops in %.1fs, %d not found in blocks %d-%d' % (
+        args.stress_trxs, expectedDbops, sendTime, len(submitted), firstBlock, lastBlock))
+    print('boot.py stress: deep-mind log grew %.1f MB in %.1fs, %.2f MB/s' % (
+        dmlogBytes / 1e6, endTime - startTime, dmlogBytes / 1e6 / max(endTime - startTime, 1e-3)))
+    for name, samples in (('submit to inclusion', latencies), ('deep-mind node behind boot node', blockLags)):
+        if samples:
+            summary = summarize(samples)
+            print('boot.py stress: %s p50 %.3fs p90 %.3fs p99 %.3fs max %.3fs' % (name, summary['p50'], summary['p90'], summary['p99'], summary['max']))
 
 def msigProposeReplaceSystem(proposer, proposalName):
     requestedPermissions = []
@@ -339,23 +868,30 @@ def msigExecReplaceSystem(proposer, proposalName):
     retry(getCleos() + 'multisig exec ' + proposer + ' ' + proposalName + ' -p ' + proposer)
 
 def msigReplaceSystem():
-    run(getCleos() + 'push action eosio buyrambytes' + jsonArg(['eosio', accounts[0]['name'], 200000]) + '-p eosio')
-    sleep(1)
+    waitForTrx(pushAction('eosio', 'buyrambytes', ['eosio', accounts[0]['name'], 200000], 'eosio'))
     msigProposeReplaceSystem(accounts[0]['name'], 'fast.unstake')
-    sleep(1)
+    waitForBlocks()
     msigApproveReplaceSystem(accounts[0]['name'], 'fast.unstake')
     msigExecReplaceSystem(accounts[0]['name'], 'fast.unstake')
 
 def produceNewAccounts():
-    with open('newusers', 'w') as f:
-        for i in range(120_000, 200_000):
-            x = getOutput(getCleos() + 'create key --to-console')
-            r = re.match('Private key: *([^ \n]*)\nPublic key: *([^ \n]*)', x, re.DOTALL | re.MULTILINE)
-            name = 'user'
-            for j in range(7, -1, -1):
-                name += chr(ord('a') + ((i >> (j * 4)) & 15))
+    # Keys are generated in-process on every core. The pool forks so workers
+    # don't re-run this script, and after one key was generated here so they
+    # inherit the precomputed curve tables.
+    first, last, chunk = 120_000, 200_000, 1000
+    generateK1Key()
+    with open(args.new_accounts_path, 'w') as f, multiprocessing.get_context('fork').Pool() as pool:
+        f.write('{\n    "producers": [],\n    "users": [\n')
+        i = first
+        for keys in pool.imap(generateK1Keys, [min(chunk, last - b) for b in range(first, last, chunk)]):
+            for pvt, pub in keys:
+                name = 'user'
+                for j in range(7, -1, -1):
+                    name += chr(ord('a') + ((i >> (j * 4)) & 15))
+                f.write('%s        {"name":"%s", "pvt":"%s", "pub":"%s"}' % (',\n' if i > first else '', name, pvt, pub))
+                i += 1
             print(i, name)
-            f.write('        {"name":"%s", "pvt":"%s", "pub":"%s"},\n' % (name, r[1], r[2]))
+        f.write('\n    ]\n}\n')
 
 def stepStartWallet():
     stepTitle()
@@ -364,23 +900,28 @@ def stepStartWallet():
 def stepStartBoot():
     stepTitle()
     startNode(0, {'name': 'eosio', 'pvt': args.private_key, 'pub': args.public_key})
-    sleep(10.0)
+    waitForNode(0)
 def stepStartDM():
     stepTitle()
     startDmNode()
-    sleep(1)
+    waitForDmNode()
 def stepInstallSystemContracts():
     stepTitle()
+    if skipRestored():
+        return
     run(getCleos() + 'set contract eosio.token ' + args.contracts_dir + '/eosio.token/')
     run(getCleos() + 'set contract eosio.msig ' + args.contracts_dir + '/eosio.msig/')
 def stepCreateTokens():
     stepTitle()
-    run(getCleos() + 'push action eosio.token create \'["eosio", "10000000000.0000 %s"]\' -p eosio.token' % (args.symbol))
     totalAllocation = allocateFunds(0, len(accounts))
-    run(getCleos() + 'push action eosio.token issue \'["eosio", "10000000000.0000 %s", "memo"]\' -p eosio' % (args.symbol))
-    sleep(1)
+    if skipRestored():
+        return
+    pushAction('eosio.token', 'create', ['eosio', '10000000000.0000 %s' % (args.symbol)], 'eosio.token')
+    waitForTrx(pushAction('eosio.token', 'issue', ['eosio', '10000000000.0000 %s' % (args.symbol), 'memo'], 'eosio'))
 def stepSetSystemContract():
     stepTitle()
+    if skipRestored():
+        return
     # All of the protocol upgrade features introduced in v1.8 first require a special protocol 
     # feature (codename PREACTIVATE_FEATURE) to be activated and for an updated version of the system 
     # contract that makes use of the functionality introduced by that feature to be deployed. 
@@ -389,412 +930,89 @@ def stepSetSystemContract():
     retry('curl -X POST http://127.0.0.1:%d' % args.http_port + 
         '/v1/producer/schedule_protocol_feature_activations ' +
         '-d \'{"protocol_features_to_activate": ["0ec7e080177b2c02b278d5088611686b49d739925a92d9bfcacd7fc6b74053bd"]}\'')
-    sleep(3)
+    # scheduled features are activated when the block after the current pending one starts
+    waitForBlocks(2)
 
     # install eosio.boot which supports the native actions and activate 
     # action that allows activating desired protocol features prior to 
     # deploying a system contract with more features such as eosio.bios 
     # or eosio.system
-    retry(getCleos() + 'set contract eosio ' + args.contracts_dir + '/eosio.boot/')
-    sleep(3)
+    waitForTrx(retry_with_id(getCleos() + 'set contract eosio ' + args.contracts_dir + '/eosio.boot/'))
 
     # activate remaining features
     # ACTION_RETURN_VALUE
-    retry(getCleos() + 'push action eosio activate \'["c3a6138c5061cf291310887c0b5c71fcaffeab90d5deb50d3b9e687cead45071"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['c3a6138c5061cf291310887c0b5c71fcaffeab90d5deb50d3b9e687cead45071'], 'eosio')
     # CONFIGURABLE_WASM_LIMITS2
-    retry(getCleos() + 'push action eosio activate \'["d528b9f6e9693f45ed277af93474fd473ce7d831dae2180cca35d907bd10cb40"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['d528b9f6e9693f45ed277af93474fd473ce7d831dae2180cca35d907bd10cb40'], 'eosio')
     # BLOCKCHAIN_PARAMETERS
-    retry(getCleos() + 'push action eosio activate \'["5443fcf88330c586bc0e5f3dee10e7f63c76c00249c87fe4fbf7f38c082006b4"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['5443fcf88330c586bc0e5f3dee10e7f63c76c00249c87fe4fbf7f38c082006b4'], 'eosio')
     # GET_SENDER
-    retry(getCleos() + 'push action eosio activate \'["f0af56d2c5a48d60a4a5b5c903edfb7db3a736a94ed589d0b797df33ff9d3e1d"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['f0af56d2c5a48d60a4a5b5c903edfb7db3a736a94ed589d0b797df33ff9d3e1d'], 'eosio')
     # FORWARD_SETCODE
-    retry(getCleos() + 'push action eosio activate \'["2652f5f96006294109b3dd0bbde63693f55324af452b799ee137a81a905eed25"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['2652f5f96006294109b3dd0bbde63693f55324af452b799ee137a81a905eed25'], 'eosio')
     # ONLY_BILL_FIRST_AUTHORIZER
-    retry(getCleos() + 'push action eosio activate \'["8ba52fe7a3956c5cd3a656a3174b931d3bb2abb45578befc59f283ecd816a405"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['8ba52fe7a3956c5cd3a656a3174b931d3bb2abb45578befc59f283ecd816a405'], 'eosio')
     # RESTRICT_ACTION_TO_SELF
-    retry(getCleos() + 'push action eosio activate \'["ad9e3d8f650687709fd68f4b90b41f7d825a365b02c23a636cef88ac2ac00c43"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['ad9e3d8f650687709fd68f4b90b41f7d825a365b02c23a636cef88ac2ac00c43'], 'eosio')
     # DISALLOW_EMPTY_PRODUCER_SCHEDULE
-    retry(getCleos() + 'push action eosio activate \'["68dcaa34c0517d19666e6b33add67351d8c5f69e999ca1e37931bc410a297428"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['68dcaa34c0517d19666e6b33add67351d8c5f69e999ca1e37931bc410a297428'], 'eosio')
     # FIX_LINKAUTH_RESTRICTION
-    retry(getCleos() + 'push action eosio activate \'["e0fb64b1085cc5538970158d05a009c24e276fb94e1a0bf6a528b48fbc4ff526"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['e0fb64b1085cc5538970158d05a009c24e276fb94e1a0bf6a528b48fbc4ff526'], 'eosio')
     # REPLACE_DEFERRED
-    retry(getCleos() + 'push action eosio activate \'["ef43112c6543b88db2283a2e077278c315ae2c84719a8b25f25cc88565fbea99"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['ef43112c6543b88db2283a2e077278c315ae2c84719a8b25f25cc88565fbea99'], 'eosio')
     # NO_DUPLICATE_DEFERRED_ID
-    retry(getCleos() + 'push action eosio activate \'["4a90c00d55454dc5b059055ca213579c6ea856967712a56017487886a4d4cc0f"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['4a90c00d55454dc5b059055ca213579c6ea856967712a56017487886a4d4cc0f'], 'eosio')
     # ONLY_LINK_TO_EXISTING_PERMISSION
-    retry(getCleos() + 'push action eosio activate \'["1a99a59d87e06e09ec5b028a9cbb7749b4a5ad8819004365d02dc4379a8b7241"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['1a99a59d87e06e09ec5b028a9cbb7749b4a5ad8819004365d02dc4379a8b7241'], 'eosio')
     # RAM_RESTRICTIONS
-    retry(getCleos() + 'push action eosio activate \'["4e7bf348da00a945489b2a681749eb56f5de00b900014e137ddae39f48f69d67"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['4e7bf348da00a945489b2a681749eb56f5de00b900014e137ddae39f48f69d67'], 'eosio')
     # WEBAUTHN_KEY
-    retry(getCleos() + 'push action eosio activate \'["4fca8bd82bbd181e714e283f83e1b45d95ca5af40fb89ad3977b653c448f78c2"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['4fca8bd82bbd181e714e283f83e1b45d95ca5af40fb89ad3977b653c448f78c2'], 'eosio')
     # WTMSIG_BLOCK_SIGNATURES
-    retry(getCleos() + 'push action eosio activate \'["299dcb6af692324b899b39f16d5a530a33062804e41f09dc97e9f156b4476707"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['299dcb6af692324b899b39f16d5a530a33062804e41f09dc97e9f156b4476707'], 'eosio')
     # GET_CODE_HASH
-    retry(getCleos() + 'push action eosio activate \'["bcd2a26394b36614fd4894241d3c451ab0f6fd110958c3423073621a70826e99"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['bcd2a26394b36614fd4894241d3c451ab0f6fd110958c3423073621a70826e99'], 'eosio')
     # GET_BLOCK_NUM
-    retry(getCleos() + 'push action eosio activate \'["35c2186cc36f7bb4aeaf4487b36e57039ccf45a9136aa856a5d569ecca55ef2b"]\' -p eosio@active')
+    pushAction('eosio', 'activate', ['35c2186cc36f7bb4aeaf4487b36e57039ccf45a9136aa856a5d569ecca55ef2b'], 'eosio')
     # CRYPTO_PRIMITIVES
-    retry(getCleos() + 'push action eosio activate \'["6bcb40a24e49c26d0a60513b6aeb8551d264e4717f306b81a37a5afb3b47cedc"]\' -p eosio@active')
-    sleep(1)
+    trx_id = pushAction('eosio', 'activate', ['6bcb40a24e49c26d0a60513b6aeb8551d264e4717f306b81a37a5afb3b47cedc'], 'eosio')
+    # preactivated features take effect in the next block
+    waitForBlock(waitForTrx(trx_id) + 1)
 
     # install eosio.system latest version
     retry(getCleos() + 'set contract eosio ' + args.contracts_dir + '/eosio.system/')
     # setpriv is only available after eosio.system is installed
-    run(getCleos() + 'push action eosio setpriv' + jsonArg(['eosio.msig', 1]) + '-p eosio@active')
-    sleep(3)
+    waitForTrx(pushAction('eosio', 'setpriv', ['eosio.msig', 1], 'eosio'))
 # "EOS5MHPYyhjBjnQZejzZHqHewPWhGTfQWSVTWYEhDmJu4SXkzgweP"
 def stepBattlefield():
     stepTitle()
-
-    trx_id = retry_with_id(getCleos() + 'set account permission battlefield1 active --add-code')
-    logAction(trx_id, 'eosio', 'eosio', 'updateauth', { 'account': 'battlefield1', 'auth': '*', 'parent': 'owner', 'permission': 'active' })
-    retry(getCleos() + 'set account permission battlefield2 active --add-code')
-    retry(getCleos() + 'set account permission battlefield3 active --add-code')
-    retry(getCleos() + 'set account permission battlefield4 active --add-code')
-    retry(getCleos() + 'set account permission notified2 active --add-code')
-    retry(getCleos() + 'set account permission battlefield5 active \'{ \
-        "threshold": 5, \
-        "keys": [], \
-        "waits": [{"wait_sec": 10800, "weight": 1}], \
-        "accounts": [ \
-            {"permission":{"actor":"battlefield1","permission":"active"},"weight":2},\
-            {"permission":{"actor":"battlefield3","permission":"active"},"weight":2},\
-            {"permission":{"actor":"battlefield4","permission":"active"},"weight":2},\
-            {"permission":{"actor":"zzzzzzzzzzzz","permission":"active"},"weight":1}\
-        ]}\' \
-    ')
-    retry(getCleos() + 'set account permission battlefield5 day2day \'{ \
-        "threshold": 1, \
-        "keys": [], \
-        "accounts": [ \
-            {"permission":{"actor":"battlefield1","permission":"active"},"weight":1},\
-            {"permission":{"actor":"battlefield3","permission":"active"},"weight":1},\
-            {"permission":{"actor":"battlefield4","permission":"active"},"weight":1}\
-        ]}\' \
-    ')
-    
-    print('\nSetting contracts')
-    trx_id = retry_with_id(getCleos() + 'system buyram eosio battlefield1 --kbytes 20000')
-    logAction(trx_id, 'eosio', 'eosio', 'buyrambytes', { 'bytes': 20480000, 'payer': 'eosio', 'receiver': 'battlefield1' })
-    logDbop(trx_id, 'eosio', 'eosio', 'rammarket', 'cpd4ykuhc5d.4', 'UPD', {"base":"*","quote":"*","supply":"10000000000.0000 RAMCORE"})
-    logDbop(trx_id, 'eosio', 'battlefield1', 'userres', 'battlefield1', 'UPD', {"cpu_weight":"*","net_weight":"*","owner":"battlefield1","ram_bytes":"*"})
-    trx_id = retry_with_id(getCleos() + 'system buyram eosio battlefield3 --kbytes 10000')
-    logAction(trx_id, 'eosio', 'eosio', 'buyrambytes', { 'bytes': 10240000, 'payer': 'eosio', 'receiver': 'battlefield3' })
-    trx_id = retry_with_id(getCleos() + 'system buyram eosio notified2 --kbytes 10000')
-    logAction(trx_id, 'eosio', 'eosio', 'buyrambytes', { 'bytes': 10240000, 'payer': 'eosio', 'receiver': 'notified2' })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'set contract battlefield1 ./battlefield battlefield.wasm battlefield.abi')
-    logAction(trx_id, 'eosio', 'eosio', 'setcode', { 'account': 'battlefield1', 'code': '*', 'vmtype': 0, 'vmversion': 0 })
-    sleep(0.6)
-    trx_id = retry_with_id(getCleos() + 'set contract battlefield3 ./battlefield battlefield.wasm battlefield.abi')
-    logAction(trx_id, 'eosio', 'eosio', 'setcode', { 'account': 'battlefield3', 'code': '*', 'vmtype': 0, 'vmversion': 0 })
-    sleep(0.6)
-    trx_id = retry_with_id(getCleos() + 'set contract notified2 ./battlefield battlefield.wasm battlefield.abi')
-    logAction(trx_id, 'eosio', 'eosio', 'setcode', { 'account': 'notified2', 'code': '*', 'vmtype': 0, 'vmversion': 0 })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 prims \'{"boolvar": true, "namevar": "battlefield1", "stringvar": "some string", "int8var": -1, "uint8var": 2, "int16var": -3, "uint16var": 4, "int32var": -5, "uint32var": 6, "int64var": -7, "uint64var": 8, "doublevar": 9.12345678900000046, "floatvar": 10.12345027923583984}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'prims', { 'boolvar': 1, 'namevar': 'battlefield1', 'stringvar': 'some string', 'int8var': -1, 'uint8var': 2, 'int16var': -3, 'uint16var': 4, 'int32var': -5, 'uint32var': 6, 'int64var': -7, 'uint64var': 8, 'doublevar': '9.12345678900000046', 'floatvar': '10.12345027923583984' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'primitives', '', 'INS', { 'id': 0, 'boolvar': 1, 'namevar': 'battlefield1', 'stringvar': 'some string', 'int8var': -1, 'uint8var': 2, 'int16var': -3, 'uint16var': 4, 'int32var': -5, 'uint32var': 6, 'int64var': -7, 'uint64var': 8, 'doublevar': "9.12345678900000046", 'floatvar': "10.12345027923583984" })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 prims \'{"boolvar": false, "namevar": "battlefield1", "stringvar": "some string", "int8var": -1, "uint8var": 2, "int16var": -3, "uint16var": 4, "int32var": -5, "uint32var": 6, "int64var": -7, "uint64var": 8, "doublevar": 9.12345678900000046, "floatvar": 10.12345027923583984}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'prims', { 'boolvar': 0, 'namevar': 'battlefield1', 'stringvar': 'some string', 'int8var': -1, 'uint8var': 2, 'int16var': -3, 'uint16var': 4, 'int32var': -5, 'uint32var': 6, 'int64var': -7, 'uint64var': 8, 'doublevar': '9.12345678900000046', 'floatvar': '10.12345027923583984' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'primitives', '............1', 'INS', { 'id': 1, 'boolvar': 0, 'namevar': 'battlefield1', 'stringvar': 'some string', 'int8var': -1, 'uint8var': 2, 'int16var': -3, 'uint16var': 4, 'int32var': -5, 'uint32var': 6, 'int64var': -7, 'uint64var': 8, 'doublevar': "9.12345678900000046", 'floatvar': "10.12345027923583984" })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 setprim \'{"id": 0, "boolvar": false}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'setprim', { 'boolvar': 0 })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'primitives', '', 'UPD', { 'id': 0, 'boolvar': 0})
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 setprim \'{"id": 1, "boolvar": true}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'setprim', { 'boolvar': 1 })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'primitives', '............1', 'UPD', { 'id': 1, 'boolvar': 1})
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 bltins \'{"symcodevar": "EOS", "assetvar": "1.0000 EOS", "symbolvar": "4,EOS", "extsymvar": {"contract": "eosio.token", "sym": "4,EOS"}, "extassetvar": {"contract": "eosio.token", "quantity": "1.0000 EOS"}, "vecvar": ["battlefield1", "battlefield2"], "mapvar": [{"first": "k1", "second": "v1"}, {"first": "k2", "second": "v2"}], "timevar": "2023-01-02T03:04:05", "vari1": ["uint16", 20], "vari2": ["string", "vari string"]}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'bltins', { 'symcodevar': 'EOS', 'assetvar': '1.0000 EOS', 'symbolvar': '4,EOS', 'extsymvar': {"contract": "eosio.token", "sym": "4,EOS"}, "extassetvar": {"contract": "eosio.token", "quantity": "1.0000 EOS"}, "vecvar": ["battlefield1", "battlefield2"], "mapvar": [{"first": "k1", "second": "v1"}, {"first": "k2", "second": "v2"}], "timevar": "2023-01-02T03:04:05", "vari1": ["uint16", 20], "vari2": ["string", "vari string"]})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'builtins', '', 'INS', { 'id': 0, 'symcodevar': 'EOS', 'assetvar': '1.0000 EOS', 'symbolvar': '4,EOS', 'extsymvar': {"contract": "eosio.token", "sym": "4,EOS"}, "extassetvar": {"contract": "eosio.token", "quantity": "1.0000 EOS"}, "vecvar": ["battlefield1", "battlefield2"], "mapvar": [{"first": "k1", "second": "v1"}, {"first": "k2", "second": "v2"}], "timevar": "2023-01-02T03:04:05", "vari1": ["uint16", 20], "vari2": ["string", "vari string"] })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 complex \'{"nested": {"nested_id": 123, "nested_vari": [["uint16", 20],["string", "vari string"]]}, "vari": [["uint16", 20],["string", "vari string"]]}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'complex', {"nested": {"nested_id": 123, "nested_vari": [["uint16", 20],["string", "vari string"]]}, "vari": [["uint16", 20],["string", "vari string"]]})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'complex', '', 'INS', { 'id': 0, 'nested': {"nested_id": 123, "nested_vari": [["uint16", 20],["string", "vari string"]]}, "vari": [["uint16", 20],["string", "vari string"]] })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dbins \'{"account": "battlefield1"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dbins', { 'account': 'battlefield1' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '............1', 'INS', { "account": "dbops1", "amount": "0 ", "created_at": "*", "expires_at": "1970-01-01T00:00:00", "id": 1, "memo": "inserted billed to calling account"})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '............2', 'INS', { "account": "dbops2", "amount": "0 ", "created_at": "*", "expires_at": "1970-01-01T00:00:00", "id": 2, "memo": "inserted billed to self"})
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dbupd \'{"account": "battlefield2"}\' -p battlefield2')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dbupd', { 'account': 'battlefield2' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '............1', 'UPD', { "account": "dbops1", "amount": "0 ", "created_at": "*", "expires_at": "1970-01-01T00:00:00", "id": 1, "memo": "updated row 1"})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '............2', 'UPD', { "account": "dbupd", "amount": "0 ", "created_at": "*", "expires_at": "1970-01-01T00:00:00", "id": 2, "memo": "updated row 2"})
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dbrem \'{"account": "battlefield1"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dbrem', { 'account': 'battlefield1' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '............1', 'REM', {})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '............2', 'REM', {})
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dtrx \'{"account": "battlefield1", "fail_now": false, "fail_later": false, "fail_later_nested": false, "delay_sec": 1, "nonce": "1"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dtrx', { "account": "battlefield1", "delay_sec": 1, "fail_later": 0, "fail_later_nested": 0, "fail_now": 0, "nonce": "1" })
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dtrxcancel \'{"account": "battlefield1"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dtrxcancel', { 'account': 'battlefield1' })
-    sleep(1)
-
-    # background(getCleos() + 'push action battlefield1 dtrx \'{"account": "battlefield1", "fail_now": true, "fail_later": false, "fail_later_nested": false, "delay_sec": 1, "nonce": "1"}\' -p battlefield1')
-    # print("\nThe error message you see above ^^^ is OK, we were expecting the transaction to fail, continuing....")
-    # sleep(0.6)
-
-    # `send_deferred` with `replace_existing` enabled, to test `MODIFY` clauses.
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dtrx \'{"account": "battlefield1", "fail_now": false, "fail_later": false, "fail_later_nested": false, "delay_sec": 1, "nonce": "1"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dtrx', { "account": "battlefield1", "delay_sec": 1, "fail_later": 0, "fail_later_nested": 0, "fail_now": 0, "nonce": "1" })
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dtrx \'{"account": "battlefield1", "fail_now": false, "fail_later": false, "fail_later_nested": false, "delay_sec": 1, "nonce": "2"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dtrx', { "account": "battlefield1", "delay_sec": 1, "fail_later": 0, "fail_later_nested": 0, "fail_now": 0, "nonce": "2" })
-    sleep (0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dtrx \'{"account": "battlefield1", "fail_now": false, "fail_later": true, "fail_later_nested": false, "delay_sec": 1, "nonce": "1"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dtrx', { "account": "battlefield1", "delay_sec": 1, "fail_later": 1, "fail_later_nested": 0, "fail_now": 0, "nonce": "1" })
-    print('\nWaiting for the transaction to fail (no onerror handler)...')
-    sleep(1.1)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dtrx \'{"account": "battlefield1", "fail_now": false, "fail_later": false, "fail_later_nested": true, "delay_sec": 1, "nonce": "2"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dtrx', { "account": "battlefield1", "delay_sec": 1, "fail_later": 0, "fail_later_nested": 1, "fail_now": 0, "nonce": "2" })
-    print('\nWaiting for the transaction to fail (no onerror handler)...')
-    sleep(1.1)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield3 dtrx \'{"account": "battlefield3", "fail_now": false, "fail_later": true, "fail_later_nested": false, "delay_sec": 1, "nonce": "1"}\' -p battlefield3')
-    logAction(trx_id, 'battlefield3', 'battlefield3', 'dtrx', { "account": "battlefield3", "delay_sec": 1, "fail_later": 1, "fail_later_nested": 0, "fail_now": 0, "nonce": "1" })
-    # soft error
-    # logAction(trx_id, 'eosio', 'battlefield3', 'onerror', { 'sender_id': '*', 'sent_trx': '*' })
-    print('\nWaiting for the transaction to fail (with onerror handler that succeed)...')
-    sleep(1.1)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield3 dtrx \'{"account": "battlefield3", "fail_now": false, "fail_later": true, "fail_later_nested": false, "delay_sec": 1, "nonce": "f"}\' -p battlefield3')
-    logAction(trx_id, 'battlefield3', 'battlefield3', 'dtrx', { "account": "battlefield3", "delay_sec": 1, "fail_later": 1, "fail_later_nested": 0, "fail_now": 0, "nonce": "f" })
-    # soft error
-    # logAction(trx_id, 'eosio', 'battlefield3', 'onerror', { 'sender_id': '*', 'sent_trx': '*' })
-    print('\nWaiting for the transaction to fail (with onerror handler that failed)...')
-    sleep(1.1)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield3 dtrx \'{"account": "battlefield3", "fail_now": false, "fail_later": true, "fail_later_nested": false, "delay_sec": 1, "nonce": "nf"}\' -p battlefield3')
-    logAction(trx_id, 'battlefield3', 'battlefield3', 'dtrx', { "account": "battlefield3", "delay_sec": 1, "fail_later": 1, "fail_later_nested": 0, "fail_now": 0, "nonce": "nf" })
-    print('\nWaiting for the transaction to fail (with onerror handler that failed inside a nested action)...')
-    sleep(1.1)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 dbinstwo \'{"account": "battlefield1", "first": 100, "second": 101}\' -p battlefield1')
-    # ?????
-    # This TX will do one DB_OPERATION for writing, and the second will fail. We want our instrumentation NOT to keep that DB_OPERATION.
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'dbinstwo', { 'account': 'battlefield1', 'first': 100, 'second': 101 })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '...........a4', 'INS', { "account": "...........a4", "amount": "0 ", "created_at": "*", "expires_at": "1970-01-01T00:00:00", "id": 100, "memo": "inserted billed to calling account"})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '...........a5', 'INS', { "account": "...........a5", "amount": "0 ", "created_at": "*", "expires_at": "1970-01-01T00:00:00", "id": 101, "memo": "inserted billed to self"})
-    
-    # Defered transactions deprecated
-
-    # trx_id = retry_with_id(getCleos() + 'push action --delay-sec=1 battlefield1 dbinstwo \'{"account": "battlefield1", "first": 102, "second": 100}\' -p battlefield1')
-    # # this one fails, nothing on chain
-    # print('\nWaiting for the transaction to fail, yet attempt to write to storage')
-    # sleep(1.1)
-
-    # trx_id = retry_with_id(getCleos() + 'push action battlefield1 dbremtwo \'{"account": "battlefield1", "first": 100, "second": 101}\' -p battlefield1')
-    # # This TX will show a delay transaction (deferred) that succeeds
-    # retry(getCleos() + 'push action --delay-sec=1 eosio.token transfer \'{"from": "eosio", "to": "battlefield1", "quantity": "1.0000 SYS", "memo":"push delayed trx"}\' -p eosio')
-    # logAction(trx_id, 'battlefield1', 'battlefield1', 'dbremtwo', { 'account': 'battlefield1', 'first': 100, 'second': 101 })
-    # logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '...........a4', 'REM', {})
-    # logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '...........a5', 'REM', {})
-    # sleep(1.1)
-
-    # # This is to see how the RAM_USAGE behaves, when a deferred hard_fails. Does it refund the deferred_trx_remove ? What about the other RAM tweaks? Any one them saved?
-    # trx_id = retry_with_id(getCleos() + 'push action battlefield1 dbinstwo \'{"account": "battlefield1", "first": 200, "second": 201}\' -p battlefield1')
-    # logAction(trx_id, 'battlefield1', 'battlefield1', 'dbinstwo', { 'account': 'battlefield1', 'first': 200, 'second': 201 })
-    # logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '...........gc', 'INS', { "account": "...........gc", "amount": "0 ", "created_at": "*", "expires_at": "1970-01-01T00:00:00", "id": 100, "memo": "inserted billed to calling account"})
-    # logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '...........gd', 'INS', { "account": "...........gd", "amount": "0 ", "created_at": "*", "expires_at": "1970-01-01T00:00:00", "id": 101, "memo": "inserted billed to self"})
-    # print('\n')
-
-    # sleep(0.6)
-    # trx_id = retry_with_id(getCleos() + 'push action battlefield1 dbremtwo \'{"account": "battlefield1", "first": 200, "second": 201}\' -p battlefield1')
-    # logAction(trx_id, 'battlefield1', 'battlefield1', 'dbremtwo', { 'account': 'battlefield1', 'first': 200, 'second': 201 })
-    # logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '...........gc', 'REM', {})
-    # logDbop(trx_id, 'battlefield1', 'battlefield1', 'member', '...........gd', 'REM', {})
-
-    # # Create a delayed and cancel it (in same block) with \'eosio:canceldelay\''
-    # trx_id = retry_with_id(getCleos() + 'push action --delay-sec=3600 battlefield1 dbins \'{"account": "battlefield1"}\' -p battlefield1 --json-file /tmp/delayed.json')
-    # with open('/tmp/delayed.json', 'r') as file:
-    #     data = json.load(file)
-    # retry(getCleos() + 'system canceldelay battlefield1 active ' + data["transaction_id"])
-    # retry('rm /tmp/delayed.json || true')
-    # sleep(0.6)
-
-    # # Create a delayed and cancel it (in the next block) with \'eosio:canceldelay\''
-    # trx_id = retry_with_id(getCleos() + 'push action --delay-sec=3600 battlefield1 dbins \'{"account": "battlefield1"}\' -p battlefield1 --json-file /tmp/delayed.json')
-    # with open('/tmp/delayed.json', 'r') as file:
-    #     data = json.load(file)
-    # sleep(1.1)
-    # retry(getCleos() + 'system canceldelay battlefield1 active ' + data["transaction_id"])
-    # retry('rm /tmp/delayed.json || true')
-    # sleep(0.6)
-
-    print('\nCreate auth structs, updateauth to create, updateauth to modify, deleteauth to test AUTH_OPs')
-    # random key
-    trx_id = retry_with_id(getCleos() + 'set account permission battlefield2 ops EOS7f5watu1cLgth3ub1uAnsGkHq1F6PhauScBg6rJGUfe79MgG9Y active')
-    logAction(trx_id, 'eosio', 'eosio', 'updateauth', { 'account': 'battlefield2', 'auth': '*', 'parent': 'active', 'permission': 'ops' })
-    sleep(1.2)
-    # back to safe key
-    trx_id = retry_with_id(getCleos() + 'set account permission battlefield2 ops EOS5MHPYyhjBjnQZejzZHqHewPWhGTfQWSVTWYEhDmJu4SXkzgweP')
-    logAction(trx_id, 'eosio', 'eosio', 'updateauth', { 'account': 'battlefield2', 'auth': '*', 'parent': 'active', 'permission': 'ops' })
-    sleep(1.2)
-
-    trx_id = retry_with_id(getCleos() + 'set action permission battlefield2 eosio.token transfer ops')
-    logAction(trx_id, 'eosio', 'eosio', 'linkauth', { 'account': 'battlefield2', 'code': 'eosio.token', 'requirement': 'ops', 'type': 'transfer' })
-    sleep(1.2)
-
-    trx_id = retry_with_id(getCleos() + 'set action permission battlefield2 eosio.token transfer NULL')
-    logAction(trx_id, 'eosio', 'eosio', 'unlinkauth', { 'account': 'battlefield2', 'code': 'eosio.token', 'type': 'transfer' })
-    sleep(1.2)
-
-    trx_id = retry_with_id(getCleos() + 'set account permission battlefield2 ops NULL')
-    logAction(trx_id, 'eosio', 'eosio', 'deleteauth', { 'account': 'battlefield2', 'permission': 'ops' })
-    sleep(1.2)
-
-    print("\nCreate a creational order different than the execution order")
-    ## We use the --force-unique flag so a context-free action exist in the transactions traces tree prior our own,
-    ## creating a multi-root execution traces tree.
-    trx_id = retry_with_id(getCleos() + 'push action --force-unique battlefield1 creaorder \'{"n1": "notified1", "n2": "notified2", "n3": "notified3", "n4": "notified4", "n5": "notified5"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'creaorder', { 'n1': 'notified1', 'n2': 'notified2', 'n3': 'notified3', 'n4': 'notified4', 'n5': 'notified5' })
-    logAction(trx_id, 'battlefield1', 'notified1', 'creaorder', { 'n1': 'notified1', 'n2': 'notified2', 'n3': 'notified3', 'n4': 'notified4', 'n5': 'notified5' })
-    logAction(trx_id, 'battlefield1', 'notified2', 'creaorder', { 'n1': 'notified1', 'n2': 'notified2', 'n3': 'notified3', 'n4': 'notified4', 'n5': 'notified5' })
-    logAction(trx_id, 'battlefield1', 'notified3', 'creaorder', { 'n1': 'notified1', 'n2': 'notified2', 'n3': 'notified3', 'n4': 'notified4', 'n5': 'notified5' })
-    logAction(trx_id, 'eosio.null', 'eosio.null', 'nonce', {})
-    logAction(trx_id, 'eosio.null', 'eosio.null', 'nonce', {})
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'inlinedeep', { 'n4': 'notified4', 'n5': 'notified5', 'nestedCfaInlineTag': 'c3', 'nestedInlineFail': 0, 'nestedInlineTag': 'i3', 'tag': 'i2' })
-    logAction(trx_id, 'battlefield1', 'notified4', 'inlinedeep', { 'n4': 'notified4', 'n5': 'notified5', 'nestedCfaInlineTag': 'c3', 'nestedInlineFail': 0, 'nestedInlineTag': 'i3', 'tag': 'i2' })
-    logAction(trx_id, 'battlefield1', 'notified5', 'inlinedeep', { 'n4': 'notified4', 'n5': 'notified5', 'nestedCfaInlineTag': 'c3', 'nestedInlineFail': 0, 'nestedInlineTag': 'i3', 'tag': 'i2' })
-    logAction(trx_id, 'eosio.null', 'eosio.null', 'nonce', {})
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'inlineempty', { 'fail': 0, 'tag': 'i3' })
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'inlineempty', { 'fail': 0, 'tag': 'i1' })
-    
-    # TODO
-    sleep(0.6)
-
-    ## Series of test for variant support
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 varianttest \'{"value":["uint16",12]}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'varianttest', { 'value': ['uint16', 12] })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'variant', '', 'INS', { 'creation_number': '*', 'id': 0, 'variant_field': ['uint16', 12] })
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 varianttest \'{"value":["string","this is a long value"]}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'varianttest', { 'value': ['string', 'this is a long value'] })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'variant', '............1', 'INS', { 'creation_number': '1099511627520', 'id': 1, 'variant_field': ['int32', 20] })
-    sleep(0.6)
-
-    ## Series of test for secondary keys
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 sktest \'{"action":"insert"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'sktest', { 'action': 'insert' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.i', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"0","i64":1,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.ii', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"2","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.d', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"3.10000000000000009","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.dd', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000606666666666260140', "d64":"0.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.c', '', 'INS', { 'c256': '00000000000000000000000000000005ffaabb00ddee11220033445500ffaa22', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.multi', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000606666666666260140', "d64":"3.10000000000000009","i128":"2","i64":1,"id":0,"unrelated":0})
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 sktest \'{"action":"update.sk"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'sktest', { 'action': 'update.sk' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.i', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"0","i64":2,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.ii', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"4","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.d', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"6.30000000000000071","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.dd', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000989999999999290240', "d64":"0.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.c', '', 'UPD', { 'c256': '0000000000000000000000000000000affaabb00ddee11220033445500ffaa22', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.multi', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000989999999999290240', "d64":"6.30000000000000071","i128":"4","i64":2,"id":0,"unrelated":0})
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 sktest \'{"action":"update.ot"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'sktest', { 'action': 'update.ot' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.i', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"0","i64":2,"id":0,"unrelated":1})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.ii', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"4","i64":0,"id":0,"unrelated":2})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.d', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"6.30000000000000071","i128":"0","i64":0,"id":0,"unrelated":3})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.dd', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000989999999999290240', "d64":"0.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":4})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.c', '', 'UPD', { 'c256': '0000000000000000000000000000000affaabb00ddee11220033445500ffaa22', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":5})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.multi', '', 'UPD', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000989999999999290240', "d64":"6.30000000000000071","i128":"4","i64":2,"id":0,"unrelated":6})
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 sktest \'{"action":"remove"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'sktest', { 'action': 'remove' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.i', '', 'UPD', { })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.ii', '', 'UPD', { })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.d', '', 'UPD', { })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.dd', '', 'UPD', { })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.c', '', 'UPD', { })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.multi', '', 'UPD', { })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 sktest \'{"action":"insert.big"}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'sktest', { 'action': 'insert.big' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.i', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"0","i64":"9223372036854775807","id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.ii', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"340282366920938463463374607431768211455","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.d', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000000000000000000000', "d64":"179769313486231570814527423731704356798070567525844996598917476803157260780028538760589558632766878171540458953514382464234321326889464182768467546703537516986049910576551282076245490090389328944075868508455133942304583236903222948165808559332123348274797826204144723168738177180919299881250404026184124858368.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.dd', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0xfffffffffffffffffffffffffffffe7f', "d64":"0.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.c', '', 'INS', { 'c256': 'ffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffffff', 'd128': '0x00000000000000000000000000000000', "d64":"0.00000000000000000","i128":"0","i64":0,"id":0,"unrelated":0})
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'sk.multi', '', 'INS', { 'c256': '0000000000000000000000000000000000000000000000000000000000000000', 'd128': '0x00000000000000606666666666260140', "d64":"3.10000000000000009","i128":"2","i64":1,"id":0,"unrelated":0})
-    sleep(0.6)
-
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 retvalue \'{"n":100}\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'retvalue', { 'n': 100 }, "101")
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 binexttest \'[bintest]\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'binexttest', { 'data': 'bintest' })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'binaryext', '', 'INS', { 'binext_field': 'bintest', 'id': 0 })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 binexttest \'[]\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'binexttest', { })
-    logDbop(trx_id, 'battlefield1', 'battlefield1', 'binaryext', '............1', 'INS', { 'binext_field': '', 'id': 1 })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 optiontest \'[opti]\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'optiontest', { 'opt_param': 'opti' })
-    sleep(0.6)
-
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 optiontest \'[null]\' -p battlefield1')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'optiontest', { 'opt_param': 'null' })
-    sleep(0.6)
-
-    # create a bunch of rows
-    trx_id = retry_with_id(getCleos() + 'push action battlefield1 producerows \'{"row_count": 100}\' -p battlefield1 > /dev/null')
-    logAction(trx_id, 'battlefield1', 'battlefield1', 'producerows', { 'row_count': 100 })
-
-    
-    sleep(3)
-
+    runScenario(battlefield.scenario())
 
 def stepInitSystemContract():
     stepTitle()
-    run(getCleos() + 'push action eosio init' + jsonArg(['0', '4,' + args.symbol]) + '-p eosio@active')
-    sleep(1)
+    if skipRestored():
+        return
+    waitForTrx(pushAction('eosio', 'init', [0, '4,' + args.symbol], 'eosio'))
+    if args.fast_boot:
+        saveSnapshot()
 def stepCreateStakedAccounts():
     stepTitle()
     createStakedAccounts(0, len(accounts))
 def stepRegProducers():
     stepTitle()
     regProducers(firstProducer, firstProducer + numProducers)
-    sleep(1)
+    waitForBlocks()
     listProducers()
 def stepStartProducers():
     stepTitle()
+    syncedBlock = headBlockNum()
     startProducers(firstProducer, firstProducer + numProducers)
-    sleep(args.producer_sync_delay)
+    waitForAll([lambda i=i: waitForNode(i, syncedBlock) for i in range(1, numProducers + 1)])
 def stepVote():
     stepTitle()
     vote(0, 0 + args.num_voters)
-    sleep(1)
+    waitForBlocks()
     listProducers()
-    sleep(5)
 def stepProxyVotes():
     stepTitle()
     proxyVotes(0, 0 + args.num_voters)
@@ -806,7 +1024,12 @@ def stepResign():
 def stepTransfer():
     stepTitle()
     randomTransfer(0, args.num_senders, 5)
-    sleep(1)
+def stepLoad():
+    stepTitle()
+    generateLoad()
+def stepStress():
+    stepTitle()
+    generateStress()
 def stepLog():
     stepTitle()
     run('tail -n 60 ' + args.nodes_dir + '00-eosio/stderr')
@@ -815,31 +1038,94 @@ def stepKillall():
     run('killall nodeos keosd || true')
     sleep(1)
     
+def selectSteps():
+    byName = {step[1]: step for step in commands}
+    selected = set(command for (flag, command, function, inAll, deps, after, help) in commands if getattr(args, command) or inAll and args.all)
+    if not args.no_deps:
+        pending = list(selected)
+        while pending:
+            for dep in byName[pending.pop()][4]:
+                if dep not in selected:
+                    selected.add(dep)
+                    pending.append(dep)
+    return [step for step in commands if step[1] in selected and step[2]]
+
+def writeMetrics():
+    if args.metrics_path:
+        metrics.write(args.metrics_path)
+        print('boot.py: wrote metrics to', args.metrics_path)
+
+def exitNow(code):
+    # Other steps may still be retrying in their threads, don't wait for them
+    writeMetrics()
+    sys.stdout.flush()
+    logFile.flush()
+    closeLogging()
+    os._exit(code)
+
+def timedStep(command, function):
+    with metrics.timed('step.' + command):
+        return function()
+
+def runSteps(steps):
+    # Starts every step as soon as the steps it waits for are done
+    names = [step[1] for step in steps]
+    waitsFor = {}
+    for i, (flag, command, function, inAll, deps, after, help) in enumerate(steps):
+        before = names[:i] if after == '*' else after
+        waitsFor[command] = set(deps + tuple(before)) & set(names)
+    done = set()
+    running = {}
+    with ThreadPoolExecutor(len(steps)) as executor:
+        while len(done) < len(steps):
+            for (flag, command, function, inAll, deps, after, help) in steps:
+                if command not in done and command not in running.values() and waitsFor[command] <= done:
+                    print('boot.py step:', command)
+                    running[executor.submit(timedStep, command, function)] = command
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                command = running.pop(future)
+                try:
+                    future.result()
+                except BaseException as e:
+                    if not isinstance(e, SystemExit):
+                        traceback.print_exception(e)
+                    print('boot.py: exiting because step %s failed' % command)
+                    exitNow(1)
+                done.add(command)
+
 # Command Line Arguments
 
 parser = argparse.ArgumentParser()
 
+# deps: steps that have to run first and are pulled in automatically when this
+# one is selected. after: steps that, when also selected, have to finish
+# first; '*' means every selected step listed above.
 commands = [
-    ('w', 'wallet',             stepStartWallet,            True,    "Start keosd, create wallet, fill with keys"),
-    ('b', 'boot',               stepStartBoot,              True,    "Start boot node"),
-    ('d', 'dm',                 stepStartDM,                True,    "Start deep-mind node"),
-    ('s', 'sys',                createSystemAccounts,       True,    "Create system accounts (eosio.*)"),
-    ('c', 'contracts',          stepInstallSystemContracts, True,    "Install system contracts (token, msig)"),
-    ('t', 'tokens',             stepCreateTokens,           True,    "Create tokens"),
-    ('S', 'sys-contract',       stepSetSystemContract,      True,    "Set system contract"),
-    ('I', 'init-sys-contract',  stepInitSystemContract,     True,    "Initialiaze system contract"),
-    ('T', 'stake',              stepCreateStakedAccounts,   True,    "Create staked accounts"),
-    ('p', 'reg-prod',           stepRegProducers,           True,    "Register producers"),
-    ('P', 'start-prod',         stepStartProducers,         True,    "Start producers"),
-    ('v', 'vote',               stepVote,                   True,    "Vote for producers"),
-    ('R', 'claim',              claimRewards,               True,    "Claim rewards"),
-    ('x', 'proxy',              stepProxyVotes,             True,    "Proxy votes"),
-    ('q', 'resign',             stepResign,                 True,    "Resign eosio"),
-    ('f', 'battlefield',        stepBattlefield,            True,    "Run battlefield tests"),
-    ('m', 'msg-replace',        msigReplaceSystem,          False,   "Replace system contract using msig"),
-    ('X', 'xfer',               stepTransfer,               True,    "Random transfer tokens"),
-    ('l', 'log',                stepLog,                    True,    "Show tail of node's log"),
-    ('k', 'killall',            stepKillall,                False,    "Killall in the end"),
+    ('w', 'wallet',             stepStartWallet,            True,    (),                                 (),                  "Start keosd, create wallet, fill with keys"),
+    ('b', 'boot',               stepStartBoot,              True,    (),                                 (),                  "Start boot node"),
+    ('d', 'dm',                 stepStartDM,                True,    ('boot',),                          (),                  "Start deep-mind node"),
+    ('s', 'sys',                createSystemAccounts,       True,    ('wallet', 'boot'),                 (),                  "Create system accounts (eosio.*)"),
+    ('c', 'contracts',          stepInstallSystemContracts, True,    ('sys',),                           (),                  "Install system contracts (token, msig)"),
+    ('t', 'tokens',             stepCreateTokens,           True,    ('contracts',),                     (),                  "Create tokens"),
+    ('S', 'sys-contract',       stepSetSystemContract,      True,    ('tokens',),                        (),                  "Set system contract"),
+    ('I', 'init-sys-contract',  stepInitSystemContract,     True,    ('sys-contract',),                  (),                  "Initialiaze system contract"),
+    ('T', 'stake',              stepCreateStakedAccounts,   True,    ('init-sys-contract',),             (),                  "Create staked accounts"),
+    ('p', 'reg-prod',           stepRegProducers,           True,    ('stake',),                         (),                  "Register producers"),
+    ('P', 'start-prod',         stepStartProducers,         True,    ('boot',),                          (),                  "Start producers"),
+    ('v', 'vote',               stepVote,                   True,    ('reg-prod', 'start-prod'),         (),                  "Vote for producers"),
+    ('R', 'claim',              claimRewards,               True,    ('vote',),                          (),                  "Claim rewards"),
+    ('x', 'proxy',              stepProxyVotes,             True,    ('vote',),                          (),                  "Proxy votes"),
+    ('q', 'resign',             stepResign,                 True,    ('claim', 'proxy'),                 (),                  "Resign eosio"),
+    ('f', 'battlefield',        stepBattlefield,            True,    ('stake',),                         ('resign',),         "Run battlefield tests"),
+    ('m', 'msg-replace',        msigReplaceSystem,          False,   ('resign',),                        (),                  "Replace system contract using msig"),
+    # the expected log has to follow chain order, so transfers never interleave with battlefield
+    ('X', 'xfer',               stepTransfer,               True,    ('stake',),                         ('battlefield',),    "Random transfer tokens"),
+    ('',  'load',               stepLoad,                   False,   ('battlefield',),                   ('xfer',),           "Send transfers and battlefield actions at --load-tps for --load-duration seconds"),
+    ('',  'stress',             stepStress,                 False,   ('battlefield',),                   ('xfer', 'load'),    "Push --stress-trxs transactions heavy in producerows and sktest dbops, measuring the deep-mind log"),
+    ('l', 'log',                stepLog,                    True,    (),                                 '*',                 "Show tail of node's log"),
+    ('',  'new-accounts',       produceNewAccounts,         False,   (),                                 (),                  "Generate keys for new test accounts into --new-accounts-path"),
+    ('k', 'killall',            stepKillall,                False,   (),                                 '*',                 "Killall in the end"),
 ]
 
 parser.add_argument('--public-key', metavar='', help="EOSIO Public Key", default='EOS8Znrtgwt8TfpmbVpTKvA2oB8Nqey625CLN8bCN3TEbgx86Dsvr', dest="public_key")
@@ -855,7 +1141,10 @@ parser.add_argument('--accounts-path', metavar='', help="Path to accounts.json",
 parser.add_argument('--wallet-dir', metavar='', help="Path to wallet directory", default='./wallet/')
 parser.add_argument('--log-path', metavar='', help="Path to log file", default='./output.log')
 parser.add_argument('--actionlog-path', metavar='', help="Path to action log file", default='./expected.jsonl')
+parser.add_argument('--actionlog-format', metavar='', help="Format of the action log file: jsonl or binary (smaller and faster for validate.py to load)", choices=['jsonl', 'binary'], default='jsonl')
+parser.add_argument('--metrics-path', metavar='', help="Path to write a JSON report of step, call and wait timings to at the end of the run")
 parser.add_argument('--dmlog-path', metavar='', help="Path to deepmind log file", default='./dm.log')
+parser.add_argument('--new-accounts-path', metavar='', help="Path to the accounts file written by --new-accounts", default='./newusers.json')
 parser.add_argument('--symbol', metavar='', help="The eosio.system symbol", default='SYS')
 parser.add_argument('--user-limit', metavar='', help="Max number of users. (0 = no limit)", type=int, default=3000)
 parser.add_argument('--max-user-keys', metavar='', help="Maximum user keys to import into wallet", type=int, default=100)
@@ -867,11 +1156,27 @@ parser.add_argument('--min-producer-funds', metavar='', help="Minimum producer f
 parser.add_argument('--num-producers-vote', metavar='', help="Number of producers for which each user votes", type=int, default=20)
 parser.add_argument('--num-voters', metavar='', help="Number of voters", type=int, default=10)
 parser.add_argument('--num-senders', metavar='', help="Number of users to transfer funds randomly", type=int, default=10)
-parser.add_argument('--producer-sync-delay', metavar='', help="Time (s) to sleep to allow producers to sync", type=int, default=80)
+parser.add_argument('--load-tps', metavar='', help="Transactions per second sent by --load", type=float, default=100)
+parser.add_argument('--load-duration', metavar='', help="Seconds --load sends transactions for", type=float, default=30)
+parser.add_argument('--load-senders', metavar='', help="Number of users --load transfers between", type=int, default=100)
+parser.add_argument('--load-battlefield', metavar='', help="Fraction of --load transactions that are battlefield actions instead of transfers", type=float, default=0.1)
+parser.add_argument('--stress-trxs', metavar='', help="Number of transactions pushed by --stress", type=int, default=200)
+parser.add_argument('--stress-rows', metavar='', help="Variant rows emplaced by each producerows of --stress", type=int, default=200)
+parser.add_argument('--stress-sk-cycles', metavar='', help="sktest insert/update/remove cycles in each sktest transaction of --stress", type=int, default=10)
+parser.add_argument('--node-timeout', metavar='', help="Time (s) to wait for each started node or keosd to become ready", type=float, default=120)
 parser.add_argument('-a', '--all', action='store_true', help="Do everything marked with (*)")
+parser.add_argument('--fast-boot', action='store_true', help="Start the nodes from a cached snapshot taken after init-sys-contract, taking one if there is none yet")
+parser.add_argument('--snapshot-dir', metavar='', help="Path to the snapshot cache directory", default='./snapshots/')
+parser.add_argument('--no-deps', action='store_true', help="Only run the selected steps, without pulling in the steps they depend on")
 parser.add_argument('-H', '--http-port', type=int, default=8000, metavar='', help='HTTP port for cleos')
-
-for (flag, command, function, inAll, help) in commands:
+parser.add_argument('--http', action='store_true', help="Push actions through persistent HTTP connections to nodeos and keosd instead of cleos")
+parser.add_argument('--max-inflight', metavar='', help="Maximum number of transactions pushed concurrently by bulk steps", type=int, default=32)
+parser.add_argument('--batch-size', metavar='', help="Maximum number of actions packed into one transaction by bulk steps", type=int, default=24)
+parser.add_argument('--wait-timeout', metavar='', help="Time (s) to wait for a transaction or block before giving up", type=float, default=30)
+# Replaced by waiting for the producers to reach the boot node's head block, kept so old command lines still parse
+parser.add_argument('--producer-sync-delay', type=int, help=argparse.SUPPRESS)
+
+for (flag, command, function, inAll, deps, after, help) in commands:
     prefix = ''
     if inAll: prefix += '*'
     if prefix: help = '(' + prefix + ') ' + help
@@ -881,8 +1186,13 @@ for (flag, command, function, inAll, help) in commands:
         parser.add_argument('--' + command, action='store_true', help=help, dest=command)
 
 args = parser.parse_args()
+if args.producer_sync_delay != None:
+    print('boot.py: --producer-sync-delay is deprecated and ignored, boot.py waits for each producer to sync instead (see --node-timeout)')
+
+initLogging(args.actionlog_path, args.actionlog_format)
 
-initLogging(args.actionlog_path)
+# Used for waits and chain queries; with --http it also pushes the transactions
+client = ChainClient('http://127.0.0.1:%d' % args.http_port, 'http://127.0.0.1:%d' % walletPort)
 
 # Leave a space in front of --url in case the user types cleos alone
 # args.cleos += ' --url http://127.0.0.1:%d ' % args.http_port
@@ -891,7 +1201,14 @@ logFile = open(args.log_path, 'a')
 
 logFile.write('\n\n' + '*' * 80 + '\n\n\n')
 
-background('killall nodeos keosd > /dev/null 2>&1')
+if args.fast_boot:
+    restoredSnapshot = findSnapshot()
+    if restoredSnapshot:
+        print('boot.py: restoring %s, the deep-mind log starts at the snapshot block and leaves out the bootstrap (feature activations, system contract setcode)' % restoredSnapshot)
+
+# Nodes left over from an earlier run hold the ports and directories this one
+# uses, so wait until they are gone before any step starts
+background('killall -w nodeos keosd > /dev/null 2>&1').wait()
 
 with open(args.accounts_path) as f:
     a = json.load(f)
@@ -905,12 +1222,10 @@ with open(args.accounts_path) as f:
 
 maxClients = numProducers + 10
 
-haveCommand = False
-for (flag, command, function, inAll, help) in commands:
-    if getattr(args, command) or inAll and args.all:
-        if function:
-            haveCommand = True
-            function()
-if not haveCommand:
+steps = selectSteps()
+if steps:
+    runSteps(steps)
+    writeMetrics()
+else:
     print('boot.py: Tell me what to do. -a does almost everything. -h shows options.')
 
@@ -0,0 +1,87 @@
+import argparse
+import json
+
+import dmlog
+import validate
+
+# Cross-checks the built-in deep-mind reader (dmlog.py) against the firehose
+# decoder (decode.sh) on the same capture. Both are reduced to the records
+# validate.py compares, and every difference is reported with its path, e.g.
+#
+#   trx 3f2a... action 2 data.d64: dmlog.py '3.10000000000000009', decode.go 3.1
+#
+# The places where the two are most likely to disagree are float rendering,
+# which 64-bit integers get quoted, and which transaction the DB_OPs of a
+# failed transaction end up in. Run this on a capture of each Leap version
+# before validating its raw dmlog directly.
+
+
+def slim_action(action):
+    return_value = action['jsonReturnValue']
+    return {
+        'receiver': action['receiver'],
+        'account': action['account'],
+        'name': action['name'],
+        'data': validate.record_data(action, 'jsonData'),
+        'return_value': json.loads(return_value) if return_value else None,
+    }
+
+def slim_dbop(dbop):
+    return {
+        'code': dbop['code'],
+        'scope': dbop['scope'],
+        'table': dbop['tableName'],
+        'pkey': dbop['primaryKey'],
+        'data': validate.record_data(dbop, 'newDataJson'),
+    }
+
+def transactions_by_id(transactions):
+    # A trx id can show up more than once (e.g. a failed push then the real one)
+    by_id = {}
+    for transaction in transactions:
+        by_id.setdefault(transaction['trx_id'], []).append({
+            'block_num': transaction['block_num'],
+            'actions': [slim_action(action) for action in transaction['actions']],
+            'dbops': [slim_dbop(dbop) for dbop in transaction['dbops']],
+        })
+    return by_id
+
+def differences(raw, decoded, path=''):
+    # Yields (path, raw value, decoded value) for every leaf that differs, types included
+    if isinstance(raw, dict) and isinstance(decoded, dict):
+        for key in sorted(set(raw) | set(decoded), key=str):
+            yield from differences(raw.get(key), decoded.get(key), '%s.%s' % (path, key) if path else str(key))
+    elif isinstance(raw, list) and isinstance(decoded, list) and len(raw) == len(decoded):
+        for i, (a, b) in enumerate(zip(raw, decoded)):
+            yield from differences(a, b, '%s[%d]' % (path, i))
+    elif raw != decoded or type(raw) != type(decoded):
+        yield path, raw, decoded
+
+def compare(raw_dmlog, json_dmlog):
+    raw = transactions_by_id(dmlog.iter_transactions(raw_dmlog))
+    decoded = transactions_by_id(validate.iter_json_transactions(validate.iter_dmlog_blocks(json_dmlog)))
+    for trx_id in sorted(set(raw) | set(decoded)):
+        for path, a, b in differences(raw.get(trx_id, []), decoded.get(trx_id, [])):
+            yield trx_id, path, a, b
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the records dmlog.py reads from a raw deep-mind log with the decode.sh output of the same log')
+    parser.add_argument('dmlog_file', type=str, help='Raw .dmlog file')
+    parser.add_argument('json_file', type=str, help='The same log decoded to JSON by decode.sh')
+    parser.add_argument('--limit', type=int, default=50, help='Differences to print')
+    args = parser.parse_args()
+
+    count = 0
+    for trx_id, path, raw, decoded in compare(args.dmlog_file, args.json_file):
+        if count < args.limit:
+            print('trx %s %s: dmlog.py %r, decode.go %r' % (trx_id, path or '(transactions)', raw, decoded))
+        count += 1
+
+    if count:
+        print("🛑 %d differences between dmlog.py and decode.go" % count)
+        exit(1)
+    print("✅ dmlog.py and decode.go agree")
+
+
+if __name__ == "__main__":
+    main()
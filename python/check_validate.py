@@ -0,0 +1,81 @@
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+
+import synthetic
+import validate
+
+# Checks that every validate.py mode reports the same misses as the indexed
+# mode, on a small synthetic dataset with wildcards and ordering noise (see
+# synthetic.py) or on given files. The parallel mode runs both on plain record
+# lists and on the columns loaded from the cache, since the two are stored
+# differently. Run it after changing how records are loaded, stored or matched.
+
+
+def run(expected_file, dmlog_file, **kwargs):
+    # Returns (counts, printed output) of one validate() run
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        counts = validate.validate(expected_file, dmlog_file, **kwargs)
+    return counts, output.getvalue()
+
+def modes(jobs, cache_dir):
+    # (name, validate() keyword arguments), the cache is filled by the first cached run
+    return (
+        ('stream', {'stream': True}),
+        ('parallel', {'jobs': jobs}),
+        ('cached cold', {'cache_dir': cache_dir}),
+        ('cached warm', {'cache_dir': cache_dir}),
+        ('parallel cached', {'jobs': jobs, 'cache_dir': cache_dir}),
+    )
+
+def check(expected_file, dmlog_file, jobs, cache_dir):
+    # Yields (mode, problem) for every mode that disagrees with the indexed one
+    reference_counts, reference_output = run(expected_file, dmlog_file)
+    for name, kwargs in modes(jobs, cache_dir):
+        counts, output = run(expected_file, dmlog_file, **kwargs)
+        if counts != reference_counts:
+            yield name, 'counted %r, indexed %r' % (counts, reference_counts)
+        elif output != reference_output:
+            yield name, 'same counts, different output'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check that every validate.py mode gives the same result as the indexed mode')
+    parser.add_argument('expected_file', type=str, nargs='?', help='Expected records to validate (generated when omitted)')
+    parser.add_argument('dmlog_file', type=str, nargs='?', help='dmlog JSON or raw .dmlog to validate against (generated when omitted)')
+    parser.add_argument('-j', '--jobs', type=int, default=2, help='Worker processes for the parallel mode')
+    synthetic.add_arguments(parser)
+    parser.set_defaults(actions=20000, accounts=500, wildcard_density=0.05, noise=0.01)
+    args = parser.parse_args()
+
+    if bool(args.expected_file) != bool(args.dmlog_file):
+        parser.error('give both expected_file and dmlog_file, or neither')
+    if args.jobs < 2:
+        parser.error('--jobs must be at least 2 to run the parallel mode')
+
+    work_dir = tempfile.mkdtemp(prefix='check-validate-')
+    try:
+        if args.expected_file:
+            expected_file, dmlog_file = args.expected_file, args.dmlog_file
+        else:
+            dmlog_file = os.path.join(work_dir, 'synthetic.dmlog.json')
+            expected_file = os.path.join(work_dir, 'synthetic.expected.' + ('bin' if args.binary else 'jsonl'))
+            synthetic.write_dataset(dmlog_file, expected_file, synthetic.generator_from_args(args), args.binary)
+        problems = list(check(expected_file, dmlog_file, args.jobs, os.path.join(work_dir, 'cache')))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    for name, problem in problems:
+        print('%s: %s' % (name, problem))
+    if problems:
+        print("🛑 %d modes disagree with the indexed mode" % len(problems))
+        exit(1)
+    print("✅ All validate.py modes agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import http.client
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+from abi import Abi, BinaryWriter
+
+TRX_EXPIRATION_SEC = 30
+
+
+class ChainError(Exception):
+    def __init__(self, path, status, body):
+        self.path = path
+        self.status = status
+        self.body = body
+        super().__init__('%s returned HTTP %d: %s' % (path, status, self.message()))
+
+    def message(self):
+        # nodeos/keosd errors look like {"code": 500, "error": {"what": ..., "details": [{"message": ...}]}}
+        error = self.body.get('error', {}) if isinstance(self.body, dict) else {}
+        details = '; '.join(d.get('message', '') for d in error.get('details', []))
+        return ' '.join(filter(None, [error.get('what'), details])) or str(self.body)
+
+
+class HttpEndpoint:
+    """JSON POST over one keep-alive connection per thread."""
+
+    def __init__(self, url, timeout=30):
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def connection(self):
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self.local.connection
+
+    def post(self, path, payload=None):
+        body = json.dumps(payload) if payload is not None else ''
+        for attempt in range(2):
+            connection = self.connection()
+            try:
+                connection.request('POST', path, body=body, headers={'Content-Type': 'application/json', 'Connection': 'keep-alive'})
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection, reconnect once
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+        result = json.loads(data) if data else None
+        if response.status >= 300:
+            raise ChainError(path, response.status, result)
+        return result
+
+
+class ChainClient:
+    """Talks to nodeos (chain_api_plugin) and keosd directly instead of going through cleos.
+
+    Transactions are built and serialized locally using the contract ABIs,
+    signed by keosd and pushed to nodeos, all over persistent HTTP connections.
+    """
+
+    def __init__(self, nodeUrl, walletUrl, walletName='default'):
+        self.node = HttpEndpoint(nodeUrl)
+        self.wallet = HttpEndpoint(walletUrl)
+        self.walletName = walletName
+        self.abis = {}
+        self.requiredKeys = {}
+        self.lastNonce = 0
+        self.lock = threading.Lock()
+
+    def getInfo(self):
+        return self.node.post('/v1/chain/get_info')
+
+    def getAbi(self, account):
+        with self.lock:
+            abi = self.abis.get(account)
+        if abi is None:
+            abi = Abi(self.node.post('/v1/chain/get_abi', {'account_name': account})['abi'] or {})
+            with self.lock:
+                self.abis[account] = abi
+        return abi
+
+    def forgetAbi(self, account):
+        with self.lock:
+            self.abis.pop(account, None)
+
+    def getTableRows(self, code, scope, table, limit=100):
+        return self.node.post('/v1/chain/get_table_rows', {'json': True, 'code': code, 'scope': scope, 'table': table, 'limit': limit})
+
+    def createWallet(self):
+        return self.wallet.post('/v1/wallet/create', self.walletName)
+
+    def importKey(self, privateKey):
+        self.wallet.post('/v1/wallet/import_key', [self.walletName, privateKey])
+
+    def getPublicKeys(self):
+        return self.wallet.post('/v1/wallet/get_public_keys')
+
+    def getRequiredKeys(self, trx):
+        # Required keys only depend on the authorizations, so they are resolved once per set
+        authorizations = tuple(sorted((a['actor'], a['permission']) for action in trx['actions'] for a in action['authorization']))
+        with self.lock:
+            keys = self.requiredKeys.get(authorizations)
+        if keys is None:
+            keys = self.node.post('/v1/chain/get_required_keys', {'transaction': trx, 'available_keys': self.getPublicKeys()})['required_keys']
+            with self.lock:
+                self.requiredKeys[authorizations] = keys
+        return keys
+
+    def encodeAction(self, action):
+        abi = self.getAbi(action['account'])
+        if action['name'] not in abi.actions:
+            # The contract may have been replaced by cleos since the ABI was cached
+            self.forgetAbi(action['account'])
+            abi = self.getAbi(action['account'])
+        return abi.encode_action(action['name'], action['data'])
+
+    def serializeActions(self, actions):
+        return [{
+            'account': action['account'],
+            'name': action['name'],
+            'authorization': action['authorization'],
+            'data': action['data'] if isinstance(action['data'], str) else self.encodeAction(action).hex(),
+        } for action in actions]
+
+    def packTransaction(self, trx):
+        w = BinaryWriter()
+        expiration = datetime.strptime(trx['expiration'], '%Y-%m-%dT%H:%M:%S').replace(tzinfo=timezone.utc)
+        w.uint32(expiration.timestamp())
+        w.uint16(trx['ref_block_num'])
+        w.uint32(trx['ref_block_prefix'])
+        w.varuint32(trx['max_net_usage_words'])
+        w.uint8(trx['max_cpu_usage_ms'])
+        w.varuint32(trx['delay_sec'])
+        for actions in (trx['context_free_actions'], trx['actions']):
+            w.varuint32(len(actions))
+            for action in actions:
+                w.name(action['account'])
+                w.name(action['name'])
+                w.array(action['authorization'], lambda a: (w.name(a['actor']), w.name(a['permission'])))
+                w.bytes(bytes.fromhex(action['data']))
+        w.varuint32(0)
+        return w.getvalue()
+
+    def nonceAction(self):
+        # Same as cleos -f: a context-free eosio.null::nonce holding the current time
+        # in microseconds, so pushing the same actions twice gives two transactions.
+        with self.lock:
+            self.lastNonce = max(self.lastNonce + 1, time.time_ns() // 1000)
+            nonce = self.lastNonce
+        return {'account': 'eosio.null', 'name': 'nonce', 'authorization': [], 'data': nonce.to_bytes(8, 'little').hex()}
+
+    def buildTransaction(self, actions, info):
+        headTime = datetime.strptime(info['head_block_time'].partition('.')[0], '%Y-%m-%dT%H:%M:%S')
+        return {
+            'expiration': (headTime + timedelta(seconds=TRX_EXPIRATION_SEC)).strftime('%Y-%m-%dT%H:%M:%S'),
+            'ref_block_num': info['last_irreversible_block_num'] & 0xffff,
+            'ref_block_prefix': int.from_bytes(bytes.fromhex(info['last_irreversible_block_id'])[8:12], 'little'),
+            'max_net_usage_words': 0,
+            'max_cpu_usage_ms': 0,
+            'delay_sec': 0,
+            'context_free_actions': [self.nonceAction()],
+            'actions': self.serializeActions(actions),
+            'transaction_extensions': [],
+        }
+
+    def pushActions(self, actions):
+        """Signs and pushes one transaction holding `actions`.
+
+        Each action is {'account', 'name', 'authorization': [{'actor', 'permission'}], 'data'},
+        where data is either an object to serialize with the contract ABI or a hex string.
+        Returns the push_transaction result: {'transaction_id': ..., 'processed': <trace>}.
+        """
+        info = self.getInfo()
+        trx = self.buildTransaction(actions, info)
+        signed = self.wallet.post('/v1/wallet/sign_transaction', [trx, self.getRequiredKeys(trx), info['chain_id']])
+        result = self.node.post('/v1/chain/push_transaction', {
+            'signatures': signed['signatures'],
+            'compression': 'none',
+            'packed_context_free_data': '',
+            'packed_trx': self.packTransaction(trx).hex(),
+        })
+        for action in actions:
+            if action['account'] == 'eosio' and action['name'] in ('setabi', 'setcode') and isinstance(action['data'], dict):
+                self.forgetAbi(action['data'].get('account'))
+        return result
+
+    def post(self, path, payload=None):
+        return self.node.post(path, payload)
+
+
+def authorization(actor, permission='active'):
+    return [{'actor': actor, 'permission': permission}]
+
+def action(account, name, data, actor, permission='active'):
+    return {'account': account, 'name': name, 'authorization': authorization(actor, permission), 'data': data}
@@ -0,0 +1,209 @@
+import base64
+import json
+
+from abi import BLOCK_TIMESTAMP_EPOCH_MS, Abi, BinaryReader
+
+# Reader for the raw deep-mind log written by `nodeos --deep-mind` (deep-mind
+# protocol 13, Leap 3.x+). Only the records validate.py needs are decoded:
+# ABIDUMP, APPLIED_TRANSACTION and DB_OP. Action data and table rows are decoded
+# with the contract ABIs in the same JSON shape the firehose decoder produces.
+
+DMLOG_PREFIX = 'DMLOG '
+
+
+def read_variant(r):
+    # fc::variant: type tag followed by the value
+    variant_type = r.uint8()
+    if variant_type == 0:
+        return None
+    if variant_type == 1:
+        return r.int64()
+    if variant_type == 2:
+        return r.uint64()
+    if variant_type == 3:
+        return r.float64()
+    if variant_type == 4:
+        return r.bool()
+    if variant_type == 5:
+        return r.string()
+    if variant_type == 6:
+        return r.array(lambda: read_variant(r))
+    if variant_type == 7:
+        return dict(r.array(lambda: (r.string(), read_variant(r))))
+    if variant_type == 8:
+        return bytes(r.bytes()).hex()
+    raise ValueError('unknown fc::variant type: %d' % variant_type)
+
+def read_exception(r):
+    return {
+        'code': r.int64(),
+        'name': r.string(),
+        'message': r.string(),
+        'stack': r.array(lambda: read_variant(r)),
+    }
+
+def read_account_delta(r):
+    return {'account': r.name(), 'delta': r.int64()}
+
+def read_action_receipt(r):
+    return {
+        'receiver': r.name(),
+        'act_digest': r.checksum(32),
+        'global_sequence': r.uint64(),
+        'recv_sequence': r.uint64(),
+        'auth_sequence': r.array(lambda: (r.name(), r.uint64())),
+        'code_sequence': r.varuint32(),
+        'abi_sequence': r.varuint32(),
+    }
+
+def read_action(r):
+    return {
+        'account': r.name(),
+        'name': r.name(),
+        'authorization': r.array(lambda: {'actor': r.name(), 'permission': r.name()}),
+        'data': bytes(r.bytes()),
+    }
+
+def read_action_trace(r):
+    return {
+        'action_ordinal': r.varuint32(),
+        'creator_action_ordinal': r.varuint32(),
+        'closest_unnotified_ancestor_action_ordinal': r.varuint32(),
+        'receipt': r.optional(lambda: read_action_receipt(r)),
+        'receiver': r.name(),
+        'act': read_action(r),
+        'context_free': r.bool(),
+        'elapsed': r.int64(),
+        'console': r.string(),
+        'trx_id': r.checksum(32),
+        'block_num': r.uint32(),
+        'block_time': r.uint32(),
+        'producer_block_id': r.optional(lambda: r.checksum(32)),
+        'account_ram_deltas': r.array(lambda: read_account_delta(r)),
+        'except': r.optional(lambda: read_exception(r)),
+        'error_code': r.optional(r.uint64),
+        'return_value': bytes(r.bytes()),
+    }
+
+def read_transaction_trace(r):
+    return {
+        'id': r.checksum(32),
+        'block_num': r.uint32(),
+        'block_time': r.uint32(),
+        'producer_block_id': r.optional(lambda: r.checksum(32)),
+        'receipt': r.optional(lambda: {'status': r.uint8(), 'cpu_usage_us': r.uint32(), 'net_usage_words': r.varuint32()}),
+        'elapsed': r.int64(),
+        'net_usage': r.uint64(),
+        'scheduled': r.bool(),
+        'action_traces': r.array(lambda: read_action_trace(r)),
+        'account_ram_delta': r.optional(lambda: read_account_delta(r)),
+        'failed_dtrx_trace': r.optional(lambda: read_transaction_trace(r)),
+        'except': r.optional(lambda: read_exception(r)),
+        'error_code': r.optional(r.uint64),
+    }
+
+
+class DeepMindReader:
+    """Turns DMLOG lines into transactions with slim action and dbop records.
+
+    DB_OP lines are emitted while a transaction executes, before its
+    APPLIED_TRANSACTION line, so they are buffered and attached to the next
+    applied transaction. Contract ABIs are tracked from the ABIDUMP at startup
+    and from successful `eosio::setabi` actions.
+    """
+
+    def __init__(self):
+        self.abis = {}
+        self.dbops = []
+
+    def transactions(self, lines):
+        for line in lines:
+            if not line.startswith(DMLOG_PREFIX):
+                continue
+            kind, _, rest = line[len(DMLOG_PREFIX):].rstrip('\n').partition(' ')
+            if kind == 'APPLIED_TRANSACTION':
+                yield self.applied_transaction(rest)
+            elif kind == 'DB_OP':
+                self.dbops.append(rest.split(' '))
+            elif kind == 'ABIDUMP':
+                self.abi_dump(rest)
+            elif kind == 'START_BLOCK':
+                self.dbops = []
+
+    def abi_dump(self, rest):
+        parts = rest.split(' ')
+        if parts[0] == 'ABI' and len(parts) >= 3:
+            self.set_abi(parts[1], base64.b64decode(parts[2]))
+
+    def set_abi(self, account, data):
+        if not data:
+            self.abis.pop(account, None)
+            return
+        try:
+            self.abis[account] = Abi.from_binary(data)
+        except (ValueError, IndexError, UnicodeDecodeError) as e:
+            print('Unable to decode ABI of %s: %s' % (account, e))
+            self.abis.pop(account, None)
+
+    def decode(self, account, decode):
+        abi = self.abis.get(account)
+        if not abi:
+            return None
+        try:
+            return decode(abi)
+        except (ValueError, IndexError, KeyError):
+            return None
+
+    def applied_transaction(self, rest):
+        block_num, _, packed_trace = rest.partition(' ')
+        trace = read_transaction_trace(BinaryReader(bytes.fromhex(packed_trace)))
+        trx_id = trace['id']
+        succeeded = trace['receipt'] != None and trace['receipt']['status'] == 0 and trace['except'] == None
+
+        actions = []
+        for action_trace in trace['action_traces']:
+            act = action_trace['act']
+            return_value = self.decode(act['account'], lambda abi: abi.decode_action_result(act['name'], action_trace['return_value'])) if action_trace['return_value'] else None
+            actions.append({
+                'trx_id': trx_id,
+                'receiver': action_trace['receiver'],
+                'account': act['account'],
+                'name': act['name'],
+                'data': self.decode(act['account'], lambda abi: abi.decode_action(act['name'], act['data'])),
+                'jsonReturnValue': json.dumps(return_value) if return_value != None else '',
+            })
+            if succeeded and act['account'] == 'eosio' and act['name'] == 'setabi' and action_trace['receiver'] == 'eosio':
+                setabi = BinaryReader(act['data'])
+                self.set_abi(setabi.name(), bytes(setabi.bytes()))
+
+        dbops = []
+        for op in self.dbops:
+            # <op> <action_id> <payer> <code> <scope> <table> <primkey> <data>
+            operation, code, scope, table_name, primary_key = op[0], op[3], op[4], op[5], op[6]
+            data = op[7] if len(op) > 7 else ''
+            if operation == 'UPD':
+                data = data.partition(':')[2]
+            elif operation == 'REM':
+                data = ''
+            dbops.append({
+                'trx_id': trx_id,
+                'code': code,
+                'scope': scope,
+                'tableName': table_name,
+                'primaryKey': primary_key,
+                'data': self.decode(code, lambda abi: abi.decode_table_row(table_name, bytes.fromhex(data))) if data else None,
+            })
+        self.dbops = []
+
+        block_time = (trace['block_time'] * 500 + BLOCK_TIMESTAMP_EPOCH_MS) / 1000
+        return {'trx_id': trx_id, 'block_num': int(block_num), 'block_time': block_time, 'actions': actions, 'dbops': dbops}
+
+
+def is_deep_mind_log(path):
+    with open(path, 'rb') as f:
+        head = f.read(64).lstrip()
+    return not head.startswith(b'[')
+
+def iter_transactions(path):
+    with open(path, 'r', errors='replace') as dmlog_file:
+        yield from DeepMindReader().transactions(dmlog_file)
@@ -0,0 +1,234 @@
+import hashlib
+import secrets
+
+BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+
+def base58Encode(data):
+    n = int.from_bytes(data, 'big')
+    encoded = ''
+    while n:
+        n, r = divmod(n, 58)
+        encoded = BASE58_ALPHABET[r] + encoded
+    pad = len(data) - len(data.lstrip(b'\0'))
+    return BASE58_ALPHABET[0] * pad + encoded
+
+def base58Decode(text):
+    n = 0
+    for c in text:
+        n = n * 58 + BASE58_ALPHABET.index(c)
+    pad = len(text) - len(text.lstrip(BASE58_ALPHABET[0]))
+    body = n.to_bytes((n.bit_length() + 7) // 8, 'big') if n else b''
+    return b'\0' * pad + body
+
+
+# Some OpenSSL 3 builds only ship ripemd160 in the legacy provider, so keep a
+# pure Python fallback around for key checksums.
+_RMD_R1 = [
+    0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, 14, 15,
+    7, 4, 13, 1, 10, 6, 15, 3, 12, 0, 9, 5, 2, 14, 11, 8,
+    3, 10, 14, 4, 9, 15, 8, 1, 2, 7, 0, 6, 13, 11, 5, 12,
+    1, 9, 11, 10, 0, 8, 12, 4, 13, 3, 7, 15, 14, 5, 6, 2,
+    4, 0, 5, 9, 7, 12, 2, 10, 14, 1, 3, 8, 11, 6, 15, 13,
+]
+_RMD_R2 = [
+    5, 14, 7, 0, 9, 2, 11, 4, 13, 6, 15, 8, 1, 10, 3, 12,
+    6, 11, 3, 7, 0, 13, 5, 10, 14, 15, 8, 12, 4, 9, 1, 2,
+    15, 5, 1, 3, 7, 14, 6, 9, 11, 8, 12, 2, 10, 0, 4, 13,
+    8, 6, 4, 1, 3, 11, 15, 0, 5, 12, 2, 13, 9, 7, 10, 14,
+    12, 15, 10, 4, 1, 5, 8, 7, 6, 2, 13, 14, 0, 3, 9, 11,
+]
+_RMD_S1 = [
+    11, 14, 15, 12, 5, 8, 7, 9, 11, 13, 14, 15, 6, 7, 9, 8,
+    7, 6, 8, 13, 11, 9, 7, 15, 7, 12, 15, 9, 11, 7, 13, 12,
+    11, 13, 6, 7, 14, 9, 13, 15, 14, 8, 13, 6, 5, 12, 7, 5,
+    11, 12, 14, 15, 14, 15, 9, 8, 9, 14, 5, 6, 8, 6, 5, 12,
+    9, 15, 5, 11, 6, 8, 13, 12, 5, 12, 13, 14, 11, 8, 5, 6,
+]
+_RMD_S2 = [
+    8, 9, 9, 11, 13, 15, 15, 5, 7, 7, 8, 11, 14, 14, 12, 6,
+    9, 13, 15, 7, 12, 8, 9, 11, 7, 7, 12, 7, 6, 15, 13, 11,
+    9, 7, 15, 11, 8, 6, 6, 14, 12, 13, 5, 14, 13, 13, 7, 5,
+    15, 5, 8, 11, 14, 14, 6, 14, 6, 9, 12, 9, 12, 5, 15, 8,
+    8, 5, 12, 9, 12, 5, 14, 6, 8, 13, 6, 5, 15, 13, 11, 11,
+]
+_RMD_K1 = [0x00000000, 0x5A827999, 0x6ED9EBA1, 0x8F1BBCDC, 0xA953FD4E]
+_RMD_K2 = [0x50A28BE6, 0x5C4DD124, 0x6D703EF3, 0x7A6D76E9, 0x00000000]
+
+def _rmdF(j, x, y, z):
+    if j < 16:
+        return x ^ y ^ z
+    if j < 32:
+        return (x & y) | (~x & z)
+    if j < 48:
+        return (x | ~y) ^ z
+    if j < 64:
+        return (x & z) | (y & ~z)
+    return x ^ (y | ~z)
+
+def _rmdRol(x, n):
+    x &= 0xffffffff
+    return ((x << n) | (x >> (32 - n))) & 0xffffffff
+
+def _ripemd160(data):
+    h = [0x67452301, 0xEFCDAB89, 0x98BADCFE, 0x10325476, 0xC3D2E1F0]
+    message = data + b'\x80' + b'\0' * ((55 - len(data)) % 64) + (len(data) * 8).to_bytes(8, 'little')
+    for offset in range(0, len(message), 64):
+        x = [int.from_bytes(message[offset + i:offset + i + 4], 'little') for i in range(0, 64, 4)]
+        al, bl, cl, dl, el = h
+        ar, br, cr, dr, er = h
+        for j in range(80):
+            t = _rmdRol(al + _rmdF(j, bl, cl, dl) + x[_RMD_R1[j]] + _RMD_K1[j // 16], _RMD_S1[j]) + el
+            al, el, dl, cl, bl = el, dl, _rmdRol(cl, 10), bl, t & 0xffffffff
+            t = _rmdRol(ar + _rmdF(79 - j, br, cr, dr) + x[_RMD_R2[j]] + _RMD_K2[j // 16], _RMD_S2[j]) + er
+            ar, er, dr, cr, br = er, dr, _rmdRol(cr, 10), br, t & 0xffffffff
+        t = (h[1] + cl + dr) & 0xffffffff
+        h[1] = (h[2] + dl + er) & 0xffffffff
+        h[2] = (h[3] + el + ar) & 0xffffffff
+        h[3] = (h[4] + al + br) & 0xffffffff
+        h[4] = (h[0] + bl + cr) & 0xffffffff
+        h[0] = t
+    return b''.join(v.to_bytes(4, 'little') for v in h)
+
+def ripemd160(data):
+    try:
+        return hashlib.new('ripemd160', data).digest()
+    except ValueError:
+        return _ripemd160(data)
+
+
+KEY_TYPES = ['K1', 'R1', 'WA']
+
+def keyToString(data, keyType, prefix):
+    # Same layout as fc: base58(data + ripemd160(data + key type)[:4])
+    suffix = keyType.encode() if keyType else b''
+    return prefix + base58Encode(data + ripemd160(data + suffix)[:4])
+
+def publicKeyToString(keyType, data):
+    if keyType == 'K1':
+        return keyToString(data, '', 'EOS')
+    return keyToString(data, keyType, 'PUB_' + keyType + '_')
+
+def signatureToString(keyType, data):
+    return keyToString(data, keyType, 'SIG_' + keyType + '_')
+
+def stringToKey(text, prefix):
+    # Parses "<prefix>_<type>_<base58>" (and legacy "EOS..." public keys) into (key type, data)
+    if prefix == 'PUB' and text.startswith('EOS'):
+        keyType, suffix, encoded = 'K1', b'', text[3:]
+    else:
+        parts = text.split('_', 2)
+        if len(parts) != 3 or parts[0] != prefix or parts[1] not in KEY_TYPES:
+            raise ValueError('invalid %s key: %s' % (prefix, text))
+        keyType, suffix, encoded = parts[1], parts[1].encode(), parts[2]
+    raw = base58Decode(encoded)
+    data, checksum = raw[:-4], raw[-4:]
+    if ripemd160(data + suffix)[:4] != checksum:
+        raise ValueError('invalid checksum for key: %s' % text)
+    return keyType, data
+
+
+# secp256k1, enough of it to derive K1 public keys from private keys
+SECP256K1_P = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEFFFFFC2F
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+SECP256K1_G = (
+    0x79BE667EF9DCBBAC55A06295CE870B07029BFCDB2DCE28D959F2815B16F81798,
+    0x483ADA7726A3C4655DA4FBFC0E1108A8FD17B448A68554199C47D08FFB10D4B8,
+)
+
+def _ecAdd(a, b):
+    # Affine addition, None is the point at infinity
+    if a == None:
+        return b
+    if b == None:
+        return a
+    p = SECP256K1_P
+    if a[0] == b[0]:
+        if (a[1] + b[1]) % p == 0:
+            return None
+        slope = 3 * a[0] * a[0] * pow(2 * a[1], -1, p) % p
+    else:
+        slope = (b[1] - a[1]) * pow(b[0] - a[0], -1, p) % p
+    x = (slope * slope - a[0] - b[0]) % p
+    return x, (slope * (a[0] - x) - a[1]) % p
+
+def _ecAddMixed(a, b):
+    # Jacobian a + affine b, so the additions of a multiplication need no inversion
+    if a == None:
+        return b[0], b[1], 1
+    p = SECP256K1_P
+    x1, y1, z1 = a
+    z1z1 = z1 * z1 % p
+    h = (b[0] * z1z1 - x1) % p
+    r = (b[1] * z1 * z1z1 - y1) % p
+    if h == 0:
+        affine = _ecToAffine(a)
+        return _ecToJacobian(_ecAdd(affine, affine) if r == 0 else None)
+    hh = h * h % p
+    hhh = h * hh % p
+    v = x1 * hh % p
+    x3 = (r * r - hhh - 2 * v) % p
+    return x3, (r * (v - x3) - y1 * hhh) % p, z1 * h % p
+
+def _ecToJacobian(point):
+    return None if point == None else (point[0], point[1], 1)
+
+def _ecToAffine(point):
+    if point == None:
+        return None
+    p = SECP256K1_P
+    zinv = pow(point[2], -1, p)
+    zinv2 = zinv * zinv % p
+    return point[0] * zinv2 % p, point[1] * zinv2 * zinv % p
+
+EC_WINDOW_BITS = 8
+_EC_WINDOWS = None
+
+def _ecWindows():
+    # windows[i][d] = d * 256^i * G, so k * G takes one table lookup and one
+    # addition per byte of k. Building the table takes a fraction of a second.
+    global _EC_WINDOWS
+    if _EC_WINDOWS == None:
+        windows = []
+        base = SECP256K1_G
+        for i in range(256 // EC_WINDOW_BITS):
+            row = [None, base]
+            for d in range(2, 1 << EC_WINDOW_BITS):
+                row.append(_ecAdd(row[-1], base))
+            windows.append(row)
+            base = _ecAdd(row[-1], base)
+        _EC_WINDOWS = windows
+    return _EC_WINDOWS
+
+def k1PublicKey(privateKey):
+    # Compressed public key (33 bytes) of a 32-byte K1 private key
+    k = int.from_bytes(privateKey, 'big')
+    if not 0 < k < SECP256K1_N:
+        raise ValueError('invalid K1 private key')
+    acc = None
+    mask = (1 << EC_WINDOW_BITS) - 1
+    for i, row in enumerate(_ecWindows()):
+        digit = (k >> (EC_WINDOW_BITS * i)) & mask
+        if digit:
+            acc = _ecAddMixed(acc, row[digit])
+    x, y = _ecToAffine(acc)
+    return bytes([2 + (y & 1)]) + x.to_bytes(32, 'big')
+
+def privateKeyToWif(privateKey):
+    data = b'\x80' + privateKey
+    return base58Encode(data + hashlib.sha256(hashlib.sha256(data).digest()).digest()[:4])
+
+def wifToPrivateKey(wif):
+    raw = base58Decode(wif)
+    data, checksum = raw[:-4], raw[-4:]
+    if len(data) != 33 or data[0] != 0x80 or hashlib.sha256(hashlib.sha256(data).digest()).digest()[:4] != checksum:
+        raise ValueError('invalid WIF private key: %s' % wif)
+    return data[1:]
+
+def generateK1Key():
+    # Returns (WIF private key, legacy EOS... public key), like `cleos create key`
+    privateKey = (secrets.randbelow(SECP256K1_N - 1) + 1).to_bytes(32, 'big')
+    return privateKeyToWif(privateKey), publicKeyToString('K1', k1PublicKey(privateKey))
+
+def generateK1Keys(count):
+    return [generateK1Key() for _ in range(count)]
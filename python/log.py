@@ -1,47 +1,124 @@
-import logging
+import atexit
 import json
+import os
+import threading
+import time
 
+import records
 
-class JsonFormatter(logging.Formatter):
-    def format(self, record):
-
-        json_record = {
-            # "level": record.levelname,
-            "timestamp": self.formatTime(record, self.datefmt),
-            "type": record.msg,
-        }
-        dict = record.__dict__
-        if record.msg == "action":
-            json_record["trx_id"] = dict.get("trx_id")
-            json_record["action_name"] = dict.get("action_name")
-            json_record["account"] = dict.get("account")
-            json_record["receiver"] = dict.get("receiver")
-            json_record["params"] = dict.get("params")
-            json_record["retvalue"] = dict.get("retvalue")
-            
-        if record.msg == "dbop":
-            json_record["trx_id"] = dict.get("trx_id")
-            json_record["table_name"] = dict.get("table_name")
-            json_record["code"] = dict.get("code")
-            json_record["scope"] = dict.get("scope")
-            json_record["pkey"] = dict.get("pkey")
-            json_record["op"] = dict.get("op")
-            json_record["fields"] = dict.get("fields")
-    
-        return json.dumps(json_record)
-    
-def initLogging(filename):
-    handler = logging.FileHandler(filename, mode='w')
-    handler.setFormatter(JsonFormatter())
-    logging.getLogger().addHandler(handler)
-    logging.getLogger().setLevel(logging.INFO)
+
+class RecordWriter:
+    """Buffered writer for the expected records log.
+
+    The log is either one JSON object per line or, with format='binary', the
+    compact encoding from records.py.
+
+    logAction/logDbop only append to an in-memory buffer. A background thread
+    serializes and writes the buffer every `interval` seconds, or as soon as
+    `maxBuffered` records are waiting. close() writes what is left and fsyncs.
+    Records are serialized on that thread, so callers must not modify the
+    params/fields they passed in afterwards. If a write fails (e.g. the disk is
+    full) the thread stops, and the next add() or close() raises its error.
+    """
+
+    def __init__(self, filename, format='jsonl', interval=0.2, maxBuffered=10000):
+        self.binary = format == 'binary'
+        self.file = open(filename, 'wb' if self.binary else 'w')
+        if self.binary:
+            self.file.write(records.MAGIC)
+        self.interval = interval
+        self.maxBuffered = maxBuffered
+        self.buffer = []
+        self.closed = False
+        self.error = None
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.thread = threading.Thread(target=self.run, name='expected-log-writer', daemon=True)
+        self.thread.start()
+
+    def add(self, record):
+        with self.lock:
+            if self.error:
+                raise self.error
+            self.buffer.append(record)
+            if len(self.buffer) >= self.maxBuffered:
+                self.ready.notify()
+
+    def run(self):
+        while True:
+            with self.lock:
+                if not self.closed and len(self.buffer) < self.maxBuffered:
+                    self.ready.wait(self.interval)
+                if self.closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                with self.lock:
+                    self.error = e
+                return
+
+    def flush(self):
+        # Only called by the writer thread, and by close() once it has joined it
+        with self.lock:
+            batch, self.buffer = self.buffer, []
+        if batch and self.binary:
+            self.file.write(records.encode_block([recordDict(r) for r in batch]))
+        elif batch:
+            self.file.write(''.join(json.dumps(recordDict(r)) + '\n' for r in batch))
+        self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.ready.notify()
+        self.thread.join()
+        if self.error:
+            self.file.close()
+            raise self.error
+        self.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+
+def formatTime(t):
+    # Same as logging.Formatter.formatTime, which the log used to go through
+    return '%s,%03d' % (time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t)), (t - int(t)) * 1000)
+
+def parseTime(text):
+    # Inverse of formatTime
+    whole, _, ms = text.partition(',')
+    return time.mktime(time.strptime(whole, '%Y-%m-%d %H:%M:%S')) + int(ms or 0) / 1000
+
+def recordDict(record):
+    # Field order matches the original JsonFormatter output
+    kind, t, fields = record
+    json_record = {
+        "timestamp": formatTime(t),
+        "type": kind,
+    }
+    json_record.update(fields)
+    return json_record
+
+
+writer = None
+
+def initLogging(filename, format='jsonl'):
+    global writer
+    writer = RecordWriter(filename, format)
+    atexit.register(closeLogging)
+
+def closeLogging():
+    if writer:
+        writer.close()
 
 
 def logAction(trx_id, account, receiver, action_name, params, retvalue=""):
-    logging.info("action", extra={"trx_id": trx_id, "action_name": action_name, "account": account, "receiver": receiver, "params": params, "retvalue": retvalue})
-    
+    writer.add(("action", time.time(), {"trx_id": trx_id, "action_name": action_name, "account": account, "receiver": receiver, "params": params, "retvalue": retvalue}))
+
 def logDbop(trx_id, code, scope, table_name, pkey, op, fields):
     if op not in ['INS', 'UPD', 'REM']:
         raise ValueError(f"Invalid operation: {op}. Operation must be one of 'INS', 'UPD', or 'REM'")
-    logging.info("dbop", extra={"trx_id": trx_id, "code": code, "scope": scope, "table_name": table_name, "pkey": pkey, "op": op, "fields": fields})
-
+    writer.add(("dbop", time.time(), {"trx_id": trx_id, "table_name": table_name, "code": code, "scope": scope, "pkey": pkey, "op": op, "fields": fields}))
@@ -0,0 +1,114 @@
+import re
+
+# Compiles the expected `params`/`fields` of an expected record into a predicate
+# over the decoded dmlog JSON, so a candidate check is one call instead of a
+# walk over the expected dict.
+#
+#   '*'     matches any value, or a missing key, at any depth
+#   'null'  matches null (and the string 'null')
+#   numbers match the same number printed as a string and the other way around,
+#           since fc prints 64-bit integers above 0xffffffff as strings
+#
+# The top-level object only checks the keys it lists. Nested objects are
+# matched exactly, as the plain equality compare() used for them was: the data
+# may not have keys the expected object doesn't list, and only keys expected
+# as '*' may be missing. Lists must have the same length.
+#
+# Keys are checked cheapest first: values that only match themselves with a
+# single comparison, then numbers and sentinels, then nested values, so most
+# mismatches are rejected before anything is walked.
+
+WILDCARD = '*'
+NULL = 'null'
+
+_MISSING = object()
+_number = re.compile(r'-?(0|[1-9][0-9]*)(\.[0-9]+)?$')
+
+
+def _as_number(text):
+    if not (text[:1].isdigit() or text[:1] == '-') or _number.match(text) == None:
+        return None
+    return float(text) if '.' in text else int(text)
+
+
+def compile_value(expected):
+    if isinstance(expected, str):
+        if expected == WILDCARD:
+            return lambda value: True
+        if expected == NULL:
+            return lambda value: value == None or value == NULL
+        number = _as_number(expected)
+        if number == None:
+            return lambda value: value == expected
+        return lambda value: value == expected or (
+            isinstance(value, (int, float)) and not isinstance(value, bool) and value == number)
+    if isinstance(expected, bool) or expected == None:
+        return lambda value: value == expected
+    if isinstance(expected, (int, float)):
+        return lambda value: value == expected or (
+            isinstance(value, str) and _as_number(value) == expected)
+    if isinstance(expected, dict):
+        matcher = compile_object(expected, exact=True)
+        # Plain equality settles most nested values without walking them
+        return lambda value: value == expected or match_object(matcher, value)
+    if isinstance(expected, list):
+        checks = compile_list(expected)
+        return lambda value: value == expected or match_list(checks, value)
+    return lambda value: value == expected
+
+
+def compile_object(expected, exact=False):
+    # Returns (plain, checks, keys). Values that only match themselves go in
+    # `plain` as (key, value) pairs and cost one comparison each, with no
+    # closure: they are most of the fields, and expected records are numerous
+    # and mostly checked once or twice. Numbers, sentinels and nested values
+    # get a closure from compile_value in `checks`, nested ones last. `keys`
+    # is the set of allowed keys for a nested object, None at the top level.
+    plain = []
+    scalars = []
+    nested = []
+    for key, value in expected.items():
+        if isinstance(value, str):
+            if value == WILDCARD:
+                continue
+            if value != NULL and _as_number(value) == None:
+                plain.append((key, value))
+                continue
+        elif value == None or isinstance(value, bool):
+            plain.append((key, value))
+            continue
+        (nested if isinstance(value, (dict, list)) else scalars).append((key, compile_value(value)))
+    return tuple(plain), tuple(scalars + nested), frozenset(expected) if exact else None
+
+
+def match_object(matcher, data):
+    plain, checks, keys = matcher
+    if not isinstance(data, dict):
+        return False
+    for key, value in plain:
+        if data.get(key, _MISSING) != value:
+            return False
+    for key, check in checks:
+        value = data.get(key, _MISSING)
+        if value is _MISSING or not check(value):
+            return False
+    return keys == None or keys.issuperset(data)
+
+
+def compile_list(expected):
+    return tuple(compile_value(value) for value in expected)
+
+
+def match_list(checks, data):
+    return (isinstance(data, list) and len(data) == len(checks)
+            and all(check(value) for check, value in zip(checks, data)))
+
+
+def compile_fields(expected):
+    # An empty expectation matches anything, even a record without data
+    return compile_object(expected) if expected else None
+
+
+def matches(matcher, data):
+    """Matches the decoded JSON of a dmlog record against a matcher returned by compile_fields."""
+    return matcher == None or match_object(matcher, data)
@@ -0,0 +1,81 @@
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Timing and counters for boot.py runs. Timers keep every sample so the report
+# can give exact percentiles; a boot run records at most a few hundred
+# thousand of them.
+
+HISTOGRAM_BOUNDS = [0.001, 0.01, 0.1, 1, 10, 100]
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timers = defaultdict(list)
+        self.counters = defaultdict(int)
+        self.started = time.time()
+
+    def record(self, name, seconds):
+        with self.lock:
+            self.timers[name].append(seconds)
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] += n
+
+    @contextmanager
+    def timed(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self):
+        with self.lock:
+            timers = {name: summarize(samples) for name, samples in sorted(self.timers.items())}
+            counters = dict(sorted(self.counters.items()))
+        return {
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'wall_time': time.time() - self.started,
+            'timers': timers,
+            'counters': counters,
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+            f.write('\n')
+
+
+def percentile(ordered, q):
+    # Nearest-rank percentile of an already sorted list
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+def summarize(samples):
+    ordered = sorted(samples)
+    histogram = {}
+    for bound in HISTOGRAM_BOUNDS:
+        histogram['<=%gs' % bound] = 0
+    histogram['>%gs' % HISTOGRAM_BOUNDS[-1]] = 0
+    for sample in ordered:
+        bucket = next((b for b in HISTOGRAM_BOUNDS if sample <= b), None)
+        histogram['<=%gs' % bucket if bucket != None else '>%gs' % HISTOGRAM_BOUNDS[-1]] += 1
+    return {
+        'count': len(ordered),
+        'total': sum(ordered),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'mean': sum(ordered) / len(ordered),
+        'p50': percentile(ordered, 50),
+        'p90': percentile(ordered, 90),
+        'p99': percentile(ordered, 99),
+        'histogram': histogram,
+    }
+
+
+metrics = Metrics()
@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from abi import Abi, BinaryReader
+from keys import k1PublicKey, publicKeyToString, wifToPrivateKey
+
+# Stand-in for nodeos and keosd, to run boot.py without a blockchain, e.g.
+#
+#   boot.py --nodeos='python3 ./python/mocknode.py --latency-ms 2 --failure-rate 0.05' \
+#           --keosd='python3 ./python/mocknode.py' --cleos='python3 ./python/mocknode.py cleos' --http ...
+#
+# It accepts (and ignores) the nodeos/keosd command line options boot.py uses
+# and serves the chain_api, producer_api, trace_api and wallet endpoints boot.py
+# touches. Blocks are "produced" every --block-interval-ms: a pushed transaction
+# goes into the pending block and shows up in trace_api once that block is the
+# head. Transactions are not executed; action data is only decoded, with the
+# ABIs of contracts deployed through the mock, to build the traces.
+#
+# `mocknode.py cleos ...` stands in for cleos: commands that push transactions
+# go through the mock's /v1/mock/push_actions, read commands print empty results.
+
+BLOCK_INTERVAL_MS = 500
+CHAIN_ID = hashlib.sha256(b'mocknode').hexdigest()
+
+PUSH_ERRORS = [
+    ('tx_cpu_usage_exceeded', 'Transaction exceeded the current CPU usage limit imposed on the transaction'),
+    ('expired_tx_exception', 'Expired Transaction'),
+    ('deadline_exception', 'Transaction took too long'),
+]
+
+
+# cleos options boot.py passes that take a value; all others are flags
+CLEOS_VALUE_OPTIONS = {'-p', '--permission', '--delay-sec', '-l', '--limit', '--json-file', '-x', '--expiration'}
+
+
+class MockError(Exception):
+    def __init__(self, status, name, message):
+        self.status = status
+        self.body = {'code': status, 'message': message, 'error': {'code': 3000000, 'name': name, 'what': message, 'details': [{'message': message}]}}
+        super().__init__(message)
+
+
+def blockId(blockNum):
+    # Like real block ids, the first 4 bytes are the block number
+    return '%08x' % blockNum + hashlib.sha256(b'%s %d' % (CHAIN_ID.encode(), blockNum)).hexdigest()[8:]
+
+def readPackedTrx(data):
+    r = BinaryReader(data)
+    trx = {
+        'expiration': r.uint32(),
+        'ref_block_num': r.uint16(),
+        'ref_block_prefix': r.uint32(),
+        'max_net_usage_words': r.varuint32(),
+        'max_cpu_usage_ms': r.uint8(),
+        'delay_sec': r.varuint32(),
+    }
+    for field in ('context_free_actions', 'actions'):
+        trx[field] = r.array(lambda: {
+            'account': r.name(),
+            'name': r.name(),
+            'authorization': r.array(lambda: {'actor': r.name(), 'permission': r.name()}),
+            'data': bytes(r.bytes()),
+        })
+    return trx
+
+
+class MockChain:
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.abis = {}
+        self.trxs = {}
+        self.blocks = {}
+        self.keys = {}
+        self.firstBlock = 1
+        if args.snapshot:
+            with open(args.snapshot) as f:
+                state = json.load(f)
+            self.firstBlock = state['head_block_num']
+            self.abis = {account: Abi(abi) for account, abi in state['abis'].items()}
+        self.start = time.time()
+
+    def headBlockNum(self):
+        return self.firstBlock + int((time.time() - self.start) * 1000 / self.args.block_interval_ms)
+
+    def blockTime(self, blockNum):
+        t = self.start + (blockNum - self.firstBlock) * self.args.block_interval_ms / 1000
+        return datetime.fromtimestamp(t, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+
+    def delay(self, ms):
+        if ms:
+            time.sleep(max(0, self.random.gauss(ms, ms * self.args.jitter)) / 1000)
+
+    def maybeFail(self, rate):
+        if self.random.random() < rate:
+            raise MockError(500, *self.random.choice(PUSH_ERRORS))
+
+    # chain_api
+
+    def getInfo(self, body):
+        head = self.headBlockNum()
+        return {
+            'server_version': 'mocknode',
+            'chain_id': CHAIN_ID,
+            'head_block_num': head,
+            'last_irreversible_block_num': head - 1,
+            'last_irreversible_block_id': blockId(head - 1),
+            'head_block_id': blockId(head),
+            'head_block_time': self.blockTime(head),
+            'head_block_producer': 'eosio',
+            'server_version_string': 'mocknode',
+        }
+
+    def getAbi(self, body):
+        with self.lock:
+            abi = self.abis.get(body['account_name'])
+        return {'account_name': body['account_name'], 'abi': abi.abi_def if abi else None}
+
+    def getAccount(self, body):
+        return {'account_name': body['account_name'], 'head_block_num': self.headBlockNum(), 'permissions': []}
+
+    def getTableRows(self, body):
+        return {'rows': [], 'more': False, 'next_key': ''}
+
+    def getBlock(self, body):
+        blockNum = int(body['block_num_or_id'])
+        if blockNum > self.headBlockNum():
+            raise MockError(400, 'unknown_block_exception', 'Could not find block: %d' % blockNum)
+        with self.lock:
+            trxIds = list(self.blocks.get(blockNum, []))
+        return {
+            'timestamp': self.blockTime(blockNum),
+            'producer': 'eosio',
+            'id': blockId(blockNum),
+            'block_num': blockNum,
+            'previous': blockId(blockNum - 1),
+            'transactions': [{'status': 'executed', 'cpu_usage_us': 100, 'net_usage_words': 16, 'trx': {'id': trxId}} for trxId in trxIds],
+        }
+
+    def getRequiredKeys(self, body):
+        return {'required_keys': body['available_keys'][:1]}
+
+    def pushTransaction(self, body):
+        packed = bytes.fromhex(body['packed_trx'])
+        trxId = hashlib.sha256(packed).hexdigest()
+        with self.lock:
+            if trxId in self.trxs:
+                raise MockError(500, 'tx_duplicate', 'Duplicate transaction %s' % trxId)
+        trx = readPackedTrx(packed)
+        actions = []
+        for action in trx['context_free_actions'] + trx['actions']:
+            abi = self.abis.get(action['account'])
+            data = abi.decode_action(action['name'], action['data']) if abi else None
+            if action['account'] == 'eosio' and action['name'] == 'setabi' and data:
+                self.setAbi(data['account'], Abi.from_binary(bytes.fromhex(data['abi'])) if data['abi'] else None)
+            actions.append(dict(action, data=data if data != None else action['data'].hex(), hex_data=action['data'].hex()))
+        return self.applyActions(trxId, actions, self.args.failure_rate)
+
+    # mocknode cleos
+
+    def pushActions(self, body):
+        actions = body['actions']
+        for action in actions:
+            if action['account'] == 'eosio' and action['name'] == 'setabi' and isinstance(action['data'], dict):
+                self.setAbi(action['data']['account'], Abi(action['data']['abi']))
+        trxId = hashlib.sha256(json.dumps([actions, time.time(), self.random.random()]).encode()).hexdigest()
+        return self.applyActions(trxId, actions, self.args.cleos_failure_rate)
+
+    def setAbi(self, account, abi):
+        with self.lock:
+            if abi:
+                self.abis[account] = abi
+            else:
+                self.abis.pop(account, None)
+
+    def applyActions(self, trxId, actions, failureRate):
+        self.delay(self.args.push_latency_ms)
+        self.maybeFail(failureRate)
+        blockNum = self.headBlockNum() + 1
+        trace = {
+            'id': trxId,
+            'block_num': blockNum,
+            'block_time': self.blockTime(blockNum),
+            'producer_block_id': None,
+            'receipt': {'status': 'executed', 'cpu_usage_us': 100, 'net_usage_words': 16},
+            'elapsed': int(self.args.push_latency_ms * 1000),
+            'scheduled': False,
+            'action_traces': [{
+                'action_ordinal': i + 1,
+                'receiver': action['account'],
+                'act': action,
+                'block_num': blockNum,
+                'trx_id': trxId,
+            } for i, action in enumerate(actions)],
+            'except': None,
+        }
+        with self.lock:
+            self.trxs[trxId] = trace
+            self.blocks.setdefault(blockNum, []).append(trxId)
+        return {'transaction_id': trxId, 'processed': trace}
+
+    # trace_api
+
+    def getTransactionTrace(self, body):
+        with self.lock:
+            trace = self.trxs.get(body['id'])
+        if trace == None or trace['block_num'] > self.headBlockNum():
+            raise MockError(404, 'trace_api_exception', 'Trace API: transaction id missing in the transaction id log files')
+        return {
+            'id': trace['id'],
+            'block_num': trace['block_num'],
+            'block_time': trace['block_time'],
+            'producer_block_id': blockId(trace['block_num']),
+            'status': 'executed',
+            'actions': [{
+                'global_sequence': 0,
+                'receiver': a['receiver'],
+                'account': a['act']['account'],
+                'action': a['act']['name'],
+                'authorization': a['act']['authorization'],
+                'data': a['act']['data'],
+            } for a in trace['action_traces']],
+        }
+
+    # producer_api
+
+    def createSnapshot(self, body):
+        head = self.headBlockNum()
+        path = os.path.join(os.path.abspath(self.args.data_dir), 'snapshots', 'snapshot-%s.bin' % blockId(head))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock:
+            state = {'head_block_num': head, 'abis': {account: abi.abi_def for account, abi in self.abis.items()}}
+        with open(path, 'w') as f:
+            json.dump(state, f)
+        return {'head_block_id': blockId(head), 'head_block_num': head, 'head_block_time': self.blockTime(head), 'version': 6, 'snapshot_name': path}
+
+    def scheduleActivations(self, body):
+        return {'result': 'ok'}
+
+    # wallet
+
+    def createWallet(self, body):
+        return 'PW5' + hashlib.sha256(str(body).encode()).hexdigest()[:48]
+
+    def listWallets(self, body):
+        return ['default *']
+
+    def importKey(self, body):
+        publicKey = publicKeyToString('K1', k1PublicKey(wifToPrivateKey(body[1])))
+        with self.lock:
+            self.keys[publicKey] = body[1]
+        return {}
+
+    def getPublicKeys(self, body):
+        with self.lock:
+            return list(self.keys)
+
+    def signTransaction(self, body):
+        trx, keys, chainId = body
+        digest = hashlib.sha256(json.dumps(trx, sort_keys=True).encode()).hexdigest()
+        return dict(trx, signatures=['SIG_K1_' + hashlib.sha256((digest + key).encode()).hexdigest() for key in keys])
+
+    def ok(self, body):
+        return {}
+
+    def endpoints(self):
+        return {
+            '/v1/chain/get_info': self.getInfo,
+            '/v1/chain/get_abi': self.getAbi,
+            '/v1/chain/get_account': self.getAccount,
+            '/v1/chain/get_table_rows': self.getTableRows,
+            '/v1/chain/get_block': self.getBlock,
+            '/v1/chain/get_required_keys': self.getRequiredKeys,
+            '/v1/chain/push_transaction': self.pushTransaction,
+            '/v1/chain/send_transaction': self.pushTransaction,
+            '/v1/trace_api/get_transaction_trace': self.getTransactionTrace,
+            '/v1/producer/create_snapshot': self.createSnapshot,
+            '/v1/producer/schedule_protocol_feature_activations': self.scheduleActivations,
+            '/v1/wallet/create': self.createWallet,
+            '/v1/wallet/list_wallets': self.listWallets,
+            '/v1/wallet/import_key': self.importKey,
+            '/v1/wallet/get_public_keys': self.getPublicKeys,
+            '/v1/wallet/sign_transaction': self.signTransaction,
+            '/v1/wallet/open': self.ok,
+            '/v1/wallet/unlock': self.ok,
+            '/v1/wallet/lock_all': self.ok,
+            '/v1/mock/push_actions': self.pushActions,
+        }
+
+
+def makeHandler(chain):
+    endpoints = chain.endpoints()
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, like nodeos and keosd
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            data = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            chain.delay(chain.args.latency_ms)
+            endpoint = endpoints.get(self.path.partition('?')[0])
+            try:
+                if endpoint == None:
+                    raise MockError(404, 'unknown_endpoint', 'Unknown Endpoint')
+                status, result = 200, endpoint(json.loads(data) if data else None)
+            except MockError as e:
+                status, result = e.status, e.body
+            except (ValueError, KeyError, TypeError, IndexError) as e:
+                status, result = 500, MockError(500, 'parse_error_exception', 'Parse Error: %r' % e).body
+            body = json.dumps(result).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def exitWithParent():
+    # boot.py starts us in the background and `killall nodeos keosd` does not
+    # match a python process, so go away once boot.py is gone
+    parent = os.getppid()
+    while os.getppid() == parent:
+        time.sleep(1)
+    os._exit(0)
+
+def serve(argv):
+    parser = argparse.ArgumentParser(description='Mock nodeos/keosd for boot.py', allow_abbrev=False)
+    parser.add_argument('--http-server-address', default='127.0.0.1:8888', help='Address to listen on (nodeos and keosd option)')
+    parser.add_argument('--data-dir', default='.', help='Where create_snapshot writes snapshots (nodeos option)')
+    parser.add_argument('--snapshot', help='Start from a snapshot written by this mock (nodeos option)')
+    parser.add_argument('--deep-mind', action='store_true', help='Act as the deep-mind node: write a DMLOG header and empty blocks to stdout, no HTTP (nodeos option)')
+    parser.add_argument('--block-interval-ms', type=float, default=BLOCK_INTERVAL_MS, help='Block interval')
+    parser.add_argument('--latency-ms', type=float, default=0, help='Mean latency added to every request')
+    parser.add_argument('--push-latency-ms', type=float, default=0, help='Mean extra latency of pushed transactions')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Standard deviation of the latencies, relative to their mean')
+    parser.add_argument('--failure-rate', type=float, default=0, help='Fraction of pushed transactions rejected with a nodeos error')
+    parser.add_argument('--cleos-failure-rate', type=float, default=0, help='Same for transactions pushed by `mocknode.py cleos`; run() does not retry, so these stop boot.py')
+    parser.add_argument('--startup-delay', type=float, default=0, help='Seconds before the mock starts serving, like a starting node')
+    parser.add_argument('--seed', type=int, help='Random seed for latencies and failures')
+    parser.add_argument('--version', action='store_true', help='Print the version and exit (nodeos option)')
+    args, _ = parser.parse_known_args(argv)
+    if args.version:
+        print('mocknode')
+        return
+
+    threading.Thread(target=exitWithParent, daemon=True).start()
+    time.sleep(args.startup_delay)
+    if args.deep_mind:
+        print('DMLOG DEEP_MIND_VERSION leap 13 0', flush=True)
+        # Follow the chain with empty blocks, so tools waiting on the log see it move
+        blockNum = 1
+        while True:
+            time.sleep(args.block_interval_ms / 1000)
+            blockNum += 1
+            print('DMLOG ACCEPTED_BLOCK %d %s' % (blockNum, '00' * 64), flush=True)
+
+    host, _, port = args.http_server_address.rpartition(':')
+    server = ThreadingHTTPServer((host or '0.0.0.0', int(port)), makeHandler(MockChain(args)))
+    server.daemon_threads = True
+    print('mocknode: listening on %s' % args.http_server_address, file=sys.stderr, flush=True)
+    server.serve_forever()
+
+
+def cleosActions(words):
+    # Maps the cleos commands boot.py runs to the actions they push
+    options = {}
+    positional = []
+    i = 0
+    while i < len(words):
+        if words[i] in CLEOS_VALUE_OPTIONS:
+            options.setdefault(words[i], []).append(words[i + 1])
+            i += 2
+        elif words[i].startswith('-'):
+            i += 1
+        else:
+            positional.append(words[i])
+            i += 1
+    authorization = [dict(zip(('actor', 'permission'), (p + '@active').split('@')[:2])) for p in options.get('-p', [])]
+    command = positional[:2]
+    if command == ['push', 'action']:
+        account, name, data = positional[2:5]
+        try:
+            data = json.loads(data)
+        except ValueError:
+            # cleos also takes relaxed JSON such as [name]
+            pass
+        return [{'account': account, 'name': name, 'authorization': authorization, 'data': data}]
+    if command == ['push', 'transaction']:
+        return json.loads(positional[2])['actions']
+    if command == ['set', 'contract']:
+        account, path = positional[2:4]
+        files = positional[4:6] or [os.path.basename(os.path.normpath(path)) + '.wasm', os.path.basename(os.path.normpath(path)) + '.abi']
+        with open(os.path.join(path, files[1])) as f:
+            abi = json.load(f)
+        authorization = authorization or [{'actor': account, 'permission': 'active'}]
+        return [
+            {'account': 'eosio', 'name': 'setcode', 'authorization': authorization, 'data': {'account': account, 'vmtype': 0, 'vmversion': 0, 'code': '*'}},
+            {'account': 'eosio', 'name': 'setabi', 'authorization': authorization, 'data': {'account': account, 'abi': abi}},
+        ]
+    # Everything else (create account, system ..., set account/action permission,
+    # multisig ...) is recorded as one opaque action
+    actor = authorization or [{'actor': positional[2] if len(positional) > 2 else 'eosio', 'permission': 'active'}]
+    return [{'account': 'eosio', 'name': '.'.join(command), 'authorization': actor, 'data': {'args': positional[2:]}}]
+
+def cleos(argv):
+    url = 'http://127.0.0.1:8888'
+    words = []
+    i = 0
+    while i < len(argv):
+        if argv[i] in ('--url', '-u', '--wallet-url'):
+            if argv[i] != '--wallet-url':
+                url = argv[i + 1]
+            i += 2
+        else:
+            words.append(argv[i])
+            i += 1
+    positional = [w for w in words if not w.startswith('-')]
+    if positional[:2] == ['get', 'table'] or positional[:2] == ['system', 'listproducers']:
+        print(json.dumps({'rows': [], 'more': False}))
+        return 0
+    if positional[:1] == ['get']:
+        print(json.dumps({'account_name': positional[2] if len(positional) > 2 else ''}))
+        return 0
+
+    request = urllib.request.Request(url.rstrip('/') + '/v1/mock/push_actions', data=json.dumps({'actions': cleosActions(words)}).encode(), method='POST')
+    try:
+        with urllib.request.urlopen(request) as response:
+            result = json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        error = json.loads(e.read())['error']
+        print('Error %d: %s' % (error['code'], error['what']), file=sys.stderr)
+        return 1
+    except OSError as e:
+        print('Failed to connect to nodeos at %s: %s' % (url, e), file=sys.stderr)
+        return 1
+    if '-j' in words or '--json' in words:
+        print(json.dumps(result))
+    else:
+        # Like cleos, the summary goes to stderr
+        print('executed transaction: %s  %d bytes  %d us' % (result['transaction_id'], 128, result['processed']['elapsed']), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['cleos']:
+        sys.exit(cleos(sys.argv[2:]))
+    serve(sys.argv[1:])
@@ -0,0 +1,81 @@
+import io
+import pickle
+import struct
+
+# Compact binary encoding of the expected records written by log.py.
+#
+# The file starts with MAGIC, followed by length-prefixed blocks:
+#
+#   uint32 length (little endian), pickled list of records
+#
+# Records only hold JSON values. Before a block is pickled, equal strings are
+# replaced by one shared object, so the pickle memo turns the block into an
+# interned string table: trx ids, names, table names and field keys are
+# written once per block and referenced by index afterwards. Blocks are
+# decoded by the C unpickler, which is much faster than parsing JSON lines.
+
+MAGIC = b'EXPREC\x00\x01'
+
+_length = struct.Struct('<I')
+
+
+def _intern(value, strings):
+    if isinstance(value, str):
+        return strings.setdefault(value, value)
+    if isinstance(value, dict):
+        return {_intern(str(k), strings): _intern(v, strings) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_intern(v, strings) for v in value]
+    return value
+
+def encode_block(records):
+    data = pickle.dumps([_intern(record, {}) for record in records], protocol=4)
+    return _length.pack(len(data)) + data
+
+
+class _RecordUnpickler(pickle.Unpickler):
+    # Blocks only ever contain plain values, never load anything that imports code
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError('unexpected global %s.%s in a records file' % (module, name))
+
+
+def load_plain(f):
+    """Unpickles a file made of plain values only (dicts, lists, strings, numbers).
+
+    Anything referring to a class or function is rejected instead of imported.
+    """
+    return _RecordUnpickler(f).load()
+
+
+def is_binary_records(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+def decode_blocks(data):
+    # Decodes the whole blocks at the start of data, which follows MAGIC.
+    # Returns (records, bytes used); a block still being written is left over.
+    records = []
+    used = 0
+    while len(data) - used >= _length.size:
+        length = _length.unpack_from(data, used)[0]
+        if len(data) - used - _length.size < length:
+            break
+        records += _RecordUnpickler(io.BytesIO(data[used + _length.size:used + _length.size + length])).load()
+        used += _length.size + length
+    return records, used
+
+def iter_records(path):
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError('%s is not a binary expected records file' % path)
+        while True:
+            header = f.read(_length.size)
+            if not header:
+                return
+            if len(header) < _length.size:
+                raise ValueError('truncated expected records file: %s' % path)
+            length = _length.unpack(header)[0]
+            data = f.read(length)
+            if len(data) < length:
+                raise ValueError('truncated expected records file: %s' % path)
+            yield from _RecordUnpickler(io.BytesIO(data)).load()
@@ -0,0 +1,199 @@
+import argparse
+import json
+import random
+import time
+
+import records
+from log import formatTime
+
+# Generates a decoded deep-mind log (the JSON array decode.sh writes) and the
+# matching expected records, shaped like a boot run that does token transfers:
+#
+#   - every block starts with eosio::onblock and its producer table update,
+#     which boot.py never logs
+#   - every transaction is an eosio.token::transfer notifying both parties,
+#     with an UPD of each party's balance row
+#
+# Expected records are written in chain order, except where ordering noise
+# swaps a record with the next one of the same type. validate.py reports those
+# as misses, so noise exercises its miss path.
+
+TRANSFERS_PER_BLOCK = 50
+ACTIONS_PER_TRANSFER = 3
+
+
+def account_name(i):
+    # Valid eosio names made of a-z only
+    name = ''
+    while True:
+        name = chr(ord('a') + i % 26) + name
+        i //= 26
+        if not i:
+            return 'user' + name
+
+
+class Generator:
+    def __init__(self, actions, accounts=10000, wildcard_density=0.0, noise=0.0, seed=0):
+        self.transfers = max(1, actions // ACTIONS_PER_TRANSFER)
+        self.accounts = accounts
+        self.wildcard_density = wildcard_density
+        self.noise = noise
+        self.random = random.Random(seed)
+        self.balances = {}
+        self.trx_count = 0
+
+    def trx_id(self):
+        self.trx_count += 1
+        return '%064x' % self.random.getrandbits(256)
+
+    def wildcard(self):
+        return self.wildcard_density and self.random.random() < self.wildcard_density
+
+    def onblock(self, block_num):
+        producer = account_name(block_num % 21)
+        return {
+            'id': self.trx_id(),
+            'actionTraces': [{
+                'receiver': 'eosio',
+                'action': {'account': 'eosio', 'name': 'onblock', 'jsonData': json.dumps({'h': {'producer': producer, 'timestamp': block_num}})},
+                'jsonReturnValue': '',
+            }],
+            'dbOps': [{
+                'operation': 'OPERATION_UPDATE',
+                'code': 'eosio',
+                'scope': 'eosio',
+                'tableName': 'producers',
+                'primaryKey': producer,
+                'newDataJson': json.dumps({'owner': producer, 'unpaid_blocks': block_num}),
+            }],
+        }
+
+    def transfer(self):
+        sender, receiver = (account_name(i) for i in self.random.sample(range(self.accounts), 2))
+        amount = self.random.randint(1, 10000)
+        quantity = '%d.%04d SYS' % (amount // 10000, amount % 10000)
+        params = {'from': sender, 'to': receiver, 'quantity': quantity, 'memo': 'transfer %d' % self.trx_count}
+        trx_id = self.trx_id()
+
+        actions = [(r, params) for r in ('eosio.token', sender, receiver)]
+        dbops = []
+        for owner, delta in ((sender, -amount), (receiver, amount)):
+            balance = self.balances.get(owner, 10 ** 9) + delta
+            self.balances[owner] = balance
+            dbops.append((owner, {'balance': '%d.%04d SYS' % (balance // 10000, balance % 10000)}))
+
+        trace = {
+            'id': trx_id,
+            'actionTraces': [{
+                'receiver': r,
+                'action': {'account': 'eosio.token', 'name': 'transfer', 'jsonData': json.dumps(p)},
+                'jsonReturnValue': '',
+            } for r, p in actions],
+            'dbOps': [{
+                'operation': 'OPERATION_UPDATE',
+                'code': 'eosio.token',
+                'scope': owner,
+                'tableName': 'accounts',
+                'primaryKey': 'SYS',
+                'newDataJson': json.dumps(fields),
+            } for owner, fields in dbops],
+        }
+        expected = [{
+            'type': 'action',
+            'trx_id': '*' if self.wildcard() else trx_id,
+            'account': 'eosio.token',
+            'receiver': r,
+            'action_name': 'transfer',
+            'params': {k: '*' if self.wildcard() else v for k, v in p.items()},
+            'retvalue': '',
+        } for r, p in actions]
+        expected += [{
+            'type': 'dbop',
+            'trx_id': trx_id,
+            'code': 'eosio.token',
+            'scope': owner,
+            'table_name': 'accounts',
+            'pkey': 'SYS',
+            'op': 'UPD',
+            'fields': {k: '*' if self.wildcard() else v for k, v in fields.items()},
+        } for owner, fields in dbops]
+        return trace, expected
+
+    def blocks(self):
+        # Yields (block, expected records of the block)
+        block_num = 2
+        remaining = self.transfers
+        while remaining:
+            count = min(remaining, TRANSFERS_PER_BLOCK)
+            remaining -= count
+            traces = [self.onblock(block_num)]
+            expected = []
+            for _ in range(count):
+                trace, trace_expected = self.transfer()
+                traces.append(trace)
+                expected += trace_expected
+            yield {'number': block_num, 'unfilteredTransactionTraces': traces}, expected
+            block_num += 1
+
+    def add_noise(self, expected):
+        pending = {}
+        for record in expected:
+            kind = record['type']
+            if kind in pending:
+                yield record
+                yield pending.pop(kind)
+            elif self.noise and self.random.random() < self.noise:
+                pending[kind] = record
+            else:
+                yield record
+        yield from pending.values()
+
+
+def write_dataset(dmlog_path, expected_path, generator, binary=False):
+    # Both files are written block by block, so any scale fits in memory.
+    # Returns (action traces, dbops, expected records).
+    counts = [0, 0, 0]
+    timestamp = formatTime(time.time())
+    with open(dmlog_path, 'w') as dmlog_file, open(expected_path, 'wb' if binary else 'w') as expected_file:
+        if binary:
+            expected_file.write(records.MAGIC)
+        dmlog_file.write('[')
+        for i, (block, expected) in enumerate(generator.blocks()):
+            dmlog_file.write((',\n' if i else '\n') + json.dumps(block))
+            for trace in block['unfilteredTransactionTraces']:
+                counts[0] += len(trace['actionTraces'])
+                counts[1] += len(trace['dbOps'])
+            expected = [dict({'timestamp': timestamp}, **record) for record in generator.add_noise(expected)]
+            counts[2] += len(expected)
+            if binary:
+                expected_file.write(records.encode_block(expected))
+            else:
+                expected_file.write(''.join(json.dumps(record) + '\n' for record in expected))
+        dmlog_file.write('\n]\n')
+    return tuple(counts)
+
+
+def add_arguments(parser):
+    parser.add_argument('--actions', type=int, default=100000, help='Approximate number of action traces to generate')
+    parser.add_argument('--accounts', type=int, default=10000, help='Number of distinct accounts transferring to each other')
+    parser.add_argument('--wildcard-density', type=float, default=0.0, help="Probability of each expected trx_id/field being '*'")
+    parser.add_argument('--noise', type=float, default=0.0, help='Probability of an expected record being swapped with the next one of its type')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--binary', action='store_true', help='Write the expected records in the binary format of records.py')
+
+def generator_from_args(args):
+    return Generator(args.actions, args.accounts, args.wildcard_density, args.noise, args.seed)
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic dmlog JSON and matching expected records for validate.py')
+    parser.add_argument('dmlog_file', type=str, nargs='?', default='synthetic.dmlog.json', help='Path of the dmlog JSON to write')
+    parser.add_argument('expected_file', type=str, nargs='?', default='synthetic.expected.jsonl', help='Path of the expected records to write')
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    actions, dbops, expected = write_dataset(args.dmlog_file, args.expected_file, generator_from_args(args), args.binary)
+    print('Wrote %d action traces and %d dbops to %s, %d expected records to %s' % (actions, dbops, args.dmlog_file, expected, args.expected_file))
+
+
+if __name__ == "__main__":
+    main()
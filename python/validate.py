@@ -1,128 +1,671 @@
 import json
 import argparse
+import hashlib
+import multiprocessing
+import os
+import pickle
+import time
+import zlib
+from bisect import bisect_left
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 
-def compare(trx_id, obj, str):
-    if not obj and not str:
-        return True
-    obj_from_str = json.loads(str)
-
-    # Iterate through the keys in obj
-    for key, value in obj.items():
-        if value == "*":
-            continue
-        if key not in obj_from_str:
-            # print("\nTrx_id %s key not found: '%s'" % (trx_id, key))
-            return False
-        if obj_from_str[key] != value and not (value == 'null' and obj_from_str[key] == None):
-            # print("\nTrx_id %s found: '%s: %s', expected: '%s: %s'" % (trx_id, key, obj_from_str[key], key, value))
-            return False
-
-    return True
-
-def find_action(expected_action, actions, start_index):
-    for i in range(start_index, len(actions)):
-        action = actions[i]['action']
-        if (
-            (actions[i]['trx_id'] == expected_action['trx_id'] or expected_action['trx_id'] == '*')
-            and actions[i]['receiver'] == expected_action['receiver']
-            and action['account'] == expected_action['account']
-            and action['name'] == expected_action['action_name']
-            and actions[i]['jsonReturnValue'] == expected_action['retvalue']
-            and compare(actions[i]['trx_id'], expected_action['params'], action['jsonData'])
-        ):
-            return i
+import dmlog
+import matchers
+import records
+from log import parseTime
 
-    return None
+def record_data(record, field):
+    # The JSON payload is decoded on first use and memoized on the record, so a
+    # candidate scanned by many expected records is only parsed once.
+    if 'data' not in record:
+        payload = record[field]
+        record['data'] = json.loads(payload) if payload else None
+    return record['data']
 
-def find_dbop(expected_dbop, dbops, start_index):
-    for i in range(start_index, len(dbops)):
-        dbop = dbops[i]
-        if dbop.get('trx_id') != expected_dbop.get('trx_id'): 
-            continue
-        if (
-            dbop.get('code') == expected_dbop.get('code')
-            and dbop.get('scope') == expected_dbop.get('scope')
-            and dbop.get('tableName') == expected_dbop.get('table_name')
-            and dbop.get('primaryKey') == expected_dbop.get('pkey')
-            and compare(dbop.get('trx_id'), expected_dbop.get('fields'), dbop.get('newDataJson'))
-        ):
-            return i
+def expected_matcher(record, field):
+    # Compiled on first use and memoized on the expected record. In --jobs mode
+    # this happens in the worker that received the record.
+    if 'matcher' not in record:
+        record['matcher'] = matchers.compile_fields(record.get(field))
+    return record['matcher']
+
+def action_key_matches(expected_action, action):
+    return (
+        (action['trx_id'] == expected_action['trx_id'] or expected_action['trx_id'] == '*')
+        and action['receiver'] == expected_action['receiver']
+        and action['account'] == expected_action['account']
+        and action['name'] == expected_action['action_name']
+    )
+
+def action_matches(expected_action, action):
+    return (
+        action['jsonReturnValue'] == expected_action['retvalue']
+        and matchers.matches(expected_matcher(expected_action, 'params'), record_data(action, 'jsonData'))
+    )
+
+def dbop_key_matches(expected_dbop, dbop):
+    return (
+        dbop['trx_id'] == expected_dbop.get('trx_id')
+        and dbop['code'] == expected_dbop.get('code')
+        and dbop['scope'] == expected_dbop.get('scope')
+        and dbop['tableName'] == expected_dbop.get('table_name')
+        and dbop['primaryKey'] == expected_dbop.get('pkey')
+    )
+
+def dbop_matches(expected_dbop, dbop):
+    return matchers.matches(expected_matcher(expected_dbop, 'fields'), record_data(dbop, 'newDataJson'))
 
+ACTION_KEY = ('trx_id', 'receiver', 'account', 'name')
+DBOP_KEY = ('trx_id', 'code', 'scope', 'tableName', 'primaryKey')
+
+def record_keys(records, fields):
+    # Tuples of the given fields of every record, read straight from the columns of cached records
+    if isinstance(records, ColumnRecords):
+        return zip(*(records.table[field] for field in fields))
+    if len(fields) == 1:
+        # itemgetter with one field returns the bare value, not a 1-tuple
+        return zip(map(itemgetter(fields[0]), records))
+    return map(itemgetter(*fields), records)
+
+def index_actions(actions, index=None, offset=0):
+    # Positions are appended in order, so every list is sorted and can be bisected.
+    # The second index ignores trx_id and serves expected records with the '*' wildcard.
+    # Pass an existing index and the position of actions[0] to extend it.
+    by_trx, any_trx = index or (defaultdict(list), defaultdict(list))
+    for i, key in enumerate(record_keys(actions, ACTION_KEY), offset):
+        by_trx[key].append(i)
+        any_trx[key[1:]].append(i)
+    return by_trx, any_trx
+
+def index_dbops(dbops, index=None, offset=0):
+    by_key = defaultdict(list) if index == None else index
+    for i, key in enumerate(record_keys(dbops, DBOP_KEY), offset):
+        by_key[key].append(i)
+    return by_key
+
+def first_match(positions, start_index, matches):
+    for i in positions[bisect_left(positions, start_index):]:
+        if matches(i):
+            return i
     return None
 
-def extract_dmlog_records(dmlog_data):
-    dmlog_actions = []
-    dmlog_dbops = []
+def action_positions(expected_action, index):
+    by_trx, any_trx = index
+    if expected_action['trx_id'] == '*':
+        return any_trx.get((expected_action['receiver'], expected_action['account'], expected_action['action_name']), [])
+    return by_trx.get((expected_action['trx_id'], expected_action['receiver'], expected_action['account'], expected_action['action_name']), [])
+
+def dbop_positions(expected_dbop, index):
+    return index.get((expected_dbop.get('trx_id'), expected_dbop.get('code'), expected_dbop.get('scope'), expected_dbop.get('table_name'), expected_dbop.get('pkey')), [])
+
+def find_action(expected_action, actions, index, start_index):
+    return first_match(action_positions(expected_action, index), start_index, lambda i: action_matches(expected_action, actions[i]))
 
-    for block_record in dmlog_data:
+def find_dbop(expected_dbop, dbops, index, start_index):
+    return first_match(dbop_positions(expected_dbop, index), start_index, lambda i: dbop_matches(expected_dbop, dbops[i]))
+
+def iter_dmlog_blocks(path, chunk_size=1 << 20):
+    # Decodes the top-level array written by decode.go one block object at a time,
+    # so only the block being parsed and one read chunk are held in memory.
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as dmlog_file:
+        buffer = ''
+        pos = 0
+        started = False
+        eof = False
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buffer):
+                if not started:
+                    if buffer[pos] != '[':
+                        raise ValueError("%s: expected a JSON array of blocks" % path)
+                    started = True
+                    pos += 1
+                    continue
+                if buffer[pos] == ']':
+                    return
+                try:
+                    block, pos = decoder.raw_decode(buffer, pos)
+                    yield block
+                    continue
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+            elif eof:
+                if started:
+                    raise ValueError("%s: unterminated JSON array" % path)
+                return
+            chunk = dmlog_file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[pos:] + chunk
+            pos = 0
+
+def iter_json_transactions(blocks):
+    for block_record in blocks:
+        block_num = block_record.get('number')
         for transaction_trace in block_record.get('unfilteredTransactionTraces', []):
             trx_id = transaction_trace.get('id', 'n/a')
-            for action_trace in transaction_trace.get('actionTraces', []):
-                action_trace['trx_id'] = trx_id
-                dmlog_actions.append(action_trace)
-            for dbop in transaction_trace.get('dbOps', []):
-                dbop['trx_id'] = trx_id
-                dmlog_dbops.append(dbop)
+            yield {
+                'trx_id': trx_id,
+                'block_num': block_num,
+                'actions': [{
+                    'trx_id': trx_id,
+                    'receiver': action_trace['receiver'],
+                    'account': action_trace['action']['account'],
+                    'name': action_trace['action']['name'],
+                    'jsonData': action_trace['action']['jsonData'],
+                    'jsonReturnValue': action_trace['jsonReturnValue'],
+                } for action_trace in transaction_trace.get('actionTraces', [])],
+                'dbops': [{
+                    'trx_id': trx_id,
+                    'code': dbop.get('code'),
+                    'scope': dbop.get('scope'),
+                    'tableName': dbop.get('tableName'),
+                    'primaryKey': dbop.get('primaryKey'),
+                    'newDataJson': dbop.get('newDataJson'),
+                } for dbop in transaction_trace.get('dbOps', [])],
+            }
+
+def iter_dmlog_transactions(dmlog_file):
+    # Accepts either the JSON array written by decode.sh or the raw .dmlog itself
+    if dmlog.is_deep_mind_log(dmlog_file):
+        return dmlog.iter_transactions(dmlog_file)
+    return iter_json_transactions(iter_dmlog_blocks(dmlog_file))
+
+def iter_dmlog_actions(transactions):
+    for transaction in transactions:
+        yield from transaction['actions']
+
+def iter_dmlog_dbops(transactions):
+    for transaction in transactions:
+        yield from transaction['dbops']
+
+def extract_dmlog_records(dmlog_file):
+    dmlog_actions = []
+    dmlog_dbops = []
+
+    for transaction in iter_dmlog_transactions(dmlog_file):
+        dmlog_actions.extend(transaction['actions'])
+        dmlog_dbops.extend(transaction['dbops'])
 
     return dmlog_actions, dmlog_dbops
 
+# Bump when the layout of cached records changes
+CACHE_VERSION = 1
+ACTION_COLUMNS = ('trx_id', 'receiver', 'account', 'name', 'jsonReturnValue')
+DBOP_COLUMNS = ('trx_id', 'code', 'scope', 'tableName', 'primaryKey')
 
-def bail(msg):
-    print(msg)
-    exit(1)
+def dmlog_digest(dmlog_file):
+    digest = hashlib.blake2b(b'records-v%d' % CACHE_VERSION, digest_size=20)
+    with open(dmlog_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-def main():
-    parser = argparse.ArgumentParser(description='Compare firehose deep-mind JSON with expected JSONL log')
-    parser.add_argument('expected_file', type=str, nargs='?', default='expected.jsonl', help='Path to expected.jsonl file')
-    parser.add_argument('dmlog_file', type=str, nargs='?', default='dm.log.json', help='Path to dm.log.json file')
-    args = parser.parse_args()
+def payload_json(record, field):
+    if 'data' in record:
+        return json.dumps(record['data']) if record['data'] != None else ''
+    return record[field]
+
+def to_columns(records, columns, field):
+    table = {column: [record[column] for record in records] for column in columns}
+    table[field] = [payload_json(record, field) for record in records]
+    return table
+
+
+class ColumnRecords:
+    """Dmlog records kept column by column, as they are stored in the cache.
+
+    Indexes are built from the key columns directly. The dict of a record is
+    only built when the record is looked at, and kept, so its decoded payload
+    is memoized like that of an extracted record.
+    """
+
+    def __init__(self, table, columns, field):
+        self.table = table
+        self.names = columns + (field,)
+        self.records = [None] * len(table[columns[0]])
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        record = self.records[i]
+        if record == None:
+            record = self.records[i] = {name: self.table[name][i] for name in self.names}
+        return record
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self.records)))
+
+
+def load_dmlog_records(dmlog_file, cache_dir=None):
+    # Extracted records are cached column by column under the hash of the dmlog
+    # contents, so re-validating the same log skips reading and decoding it.
+    if not cache_dir:
+        return extract_dmlog_records(dmlog_file)
+
+    cache_file = os.path.join(cache_dir, dmlog_digest(dmlog_file) + '.records')
+    if os.path.exists(cache_file):
+        # The cache directory may be shared, only plain values are unpickled
+        try:
+            with open(cache_file, 'rb') as f:
+                cached = records.load_plain(f)
+            return ColumnRecords(cached['actions'], ACTION_COLUMNS, 'jsonData'), ColumnRecords(cached['dbops'], DBOP_COLUMNS, 'newDataJson')
+        except (pickle.UnpicklingError, EOFError, KeyError, TypeError, IndexError) as e:
+            print('Ignoring unreadable cache file %s: %s' % (cache_file, e))
+
+    dmlog_actions, dmlog_dbops = extract_dmlog_records(dmlog_file)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_file + '.tmp', 'wb') as f:
+        pickle.dump({
+            'actions': to_columns(dmlog_actions, ACTION_COLUMNS, 'jsonData'),
+            'dbops': to_columns(dmlog_dbops, DBOP_COLUMNS, 'newDataJson'),
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(cache_file + '.tmp', cache_file)
+    return dmlog_actions, dmlog_dbops
+
+def iter_expected_records(expected_file):
+    # Either JSON lines or the binary format from records.py (boot.py --actionlog-format binary)
+    if records.is_binary_records(expected_file):
+        yield from records.iter_records(expected_file)
+        return
+    with open(expected_file, 'r') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+class RecordStream:
+    """Forward-only cursor over a record generator.
+
+    Records read past the cursor are kept in a lookahead buffer of at most
+    `window` records, and a search never looks further ahead than that. A miss
+    then costs one window, the generator is never reopened and memory stays
+    bounded, at the price of requiring each expected record to appear within
+    `window` dmlog records of the previous match.
+    """
+
+    def __init__(self, records, window):
+        self.records = records
+        self.window = window
+        self.buffer = deque()
+        self.position = 0
+
+    def find(self, matches):
+        for i, record in enumerate(self.buffer):
+            if matches(record):
+                return self.advance(i)
+        for record in self.records:
+            self.buffer.append(record)
+            if matches(record):
+                return self.advance(len(self.buffer) - 1)
+            if len(self.buffer) >= self.window:
+                break
+        return None
 
-    expected_records = []
-    with open(args.expected_file, 'r') as expected_file:
-        for line in expected_file:
-            expected_records.append(json.loads(line))
+    def advance(self, i):
+        # Drops the match and everything skipped before it
+        position = self.position + i
+        for _ in range(i + 1):
+            self.buffer.popleft()
+        self.position = position + 1
+        return position
 
-    with open(args.dmlog_file, 'r') as dmlog_file:
-        dmlog_data = json.load(dmlog_file)
 
-    dmlog_actions, dmlog_dbops = extract_dmlog_records(dmlog_data)
+def indexed_finder(find, records, index):
+    start_index = 0
+    def finder(expected):
+        nonlocal start_index
+        found = find(expected, records, index, start_index)
+        if found != None:
+            start_index = found + 1
+        return found
+    return finder
 
+def streaming_finder(records, key_matches, matches, window):
+    stream = RecordStream(records, window)
+    return lambda expected: stream.find(lambda record: key_matches(expected, record) and matches(expected, record))
+
+def shard_of(trx_id, jobs):
+    return zlib.crc32(trx_id.encode()) % jobs
+
+# Records shared with the workers of match_in_parallel. The pool forks after
+# this is set, so workers inherit the records instead of receiving them pickled.
+_shared = None
+
+def shard_candidates(shard):
+    # Runs in a worker: returns, for every expected record of the shard, the sorted
+    # global positions of all dmlog records it matches. The ordering check is left
+    # to the parent, which sees every shard.
+    expected_records, dmlog_actions, dmlog_dbops, shards = _shared
+    expected, actions, dbops = shards[shard]
+    action_records = [dmlog_actions[j] for j in actions]
+    dbop_records = [dmlog_dbops[j] for j in dbops]
+    actions_index = index_actions(action_records)
+    dbops_index = index_dbops(dbop_records)
+
+    candidates = {}
+    for i in expected:
+        record = expected_records[i]
+        if record['type'] == 'action':
+            candidates[i] = [actions[j] for j in action_positions(record, actions_index) if action_matches(record, action_records[j])]
+        else:
+            candidates[i] = [dbops[j] for j in dbop_positions(record, dbops_index) if dbop_matches(record, dbop_records[j])]
+    return candidates
+
+def shard_records(expected_records, dmlog_actions, dmlog_dbops, jobs):
+    # Splits record positions by the shard of their trx_id. Expected actions with
+    # the '*' trx_id are left out, they can match in any shard.
+    shards = [([], [], []) for _ in range(jobs)]
+    for i, record in enumerate(expected_records):
+        if record['type'] in ('action', 'dbop') and not is_wildcard(record):
+            shards[shard_of(record['trx_id'], jobs)][0].append(i)
+    for position, (trx_id,) in enumerate(record_keys(dmlog_actions, ('trx_id',))):
+        shards[shard_of(trx_id, jobs)][1].append(position)
+    for position, (trx_id,) in enumerate(record_keys(dmlog_dbops, ('trx_id',))):
+        shards[shard_of(trx_id, jobs)][2].append(position)
+    return shards
+
+def is_wildcard(record):
+    return record['type'] == 'action' and record['trx_id'] == '*'
+
+def index_wildcard_actions(expected_records, dmlog_actions):
+    # The trx_id-less index of index_actions, limited to the keys wildcard records look up
+    keys = {(record['receiver'], record['account'], record['action_name']) for record in expected_records if is_wildcard(record)}
+    any_trx = defaultdict(list)
+    if keys:
+        for i, key in enumerate(record_keys(dmlog_actions, ACTION_KEY[1:])):
+            if key in keys:
+                any_trx[key].append(i)
+    return {}, any_trx
+
+def match_in_parallel(expected_records, dmlog_actions, dmlog_dbops, jobs):
+    # Sets the candidate positions of every expected record but the wildcard actions,
+    # which the parent looks up in order, stopping at the first match like the
+    # indexed mode does.
+    global _shared
+    _shared = (expected_records, dmlog_actions, dmlog_dbops, shard_records(expected_records, dmlog_actions, dmlog_dbops, jobs))
+    candidates = defaultdict(list)
+    try:
+        with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context('fork')) as pool:
+            for shard_result in pool.map(shard_candidates, range(jobs)):
+                for i, positions in shard_result.items():
+                    candidates[i].extend(positions)
+    finally:
+        _shared = None
+    for i, record in enumerate(expected_records):
+        if not is_wildcard(record):
+            record['candidates'] = sorted(candidates.get(i, []))
+
+def candidate_finder(records=None, wildcard_index=None):
+    start_index = 0
+    def finder(expected):
+        nonlocal start_index
+        if 'candidates' in expected:
+            found = first_match(expected['candidates'], start_index, lambda i: True)
+        else:
+            found = find_action(expected, records, wildcard_index, start_index)
+        if found != None:
+            start_index = found + 1
+        return found
+    return finder
+
+def validate_actions(expected_records, find):
     failed = 0
-    index = -1
     actions = 0
     for record in expected_records:
         trx_id = record['trx_id']
         if record['type'] == 'action':
             # print("Looking for action %s::%s in %s ... " % (record['account'], record['action_name'], trx_id), end='')
-            found = find_action(record, dmlog_actions, index)
-            if found == None:
+            if find(record) == None:
                 print("No action found for %s:%s @ trx %s" % (record.get('account'), record.get('action_name'), trx_id))
                 failed += 1
-            else: 
-                index = found + 1
+            else:
                 actions += 1
         elif record['type'] != 'dbop':
             print("Invalid record type: %s for trx_id %s", record['type'], trx_id)
+    return failed, actions
 
-    index = -1
+def validate_dbops(expected_records, find):
+    failed = 0
     db_ops = 0
     for record in expected_records:
         trx_id = record['trx_id']
         if record['type'] == 'dbop':
-            found = find_dbop(record, dmlog_dbops, index)
-            if found == None:
+            if find(record) == None:
                 print("No matching dbop found for table update %s:%s @ trx %s" % (record.get('code'), record.get('table_name'), trx_id))
                 failed += 1
-            else: 
-                index = found + 1
+            else:
                 db_ops += 1
+    return failed, db_ops
+
+
+# Dmlog records --stream looks ahead of the last match before giving up on a record
+STREAM_WINDOW = 200000
+
+def validate(expected_file, dmlog_file, stream=False, cache_dir=None, jobs=1, stream_window=STREAM_WINDOW):
+    # Returns (failed_actions, actions, failed_dbops, db_ops), printing every miss
+    if stream:
+        action_finder = streaming_finder(iter_dmlog_actions(iter_dmlog_transactions(dmlog_file)), action_key_matches, action_matches, stream_window)
+        dbop_finder = streaming_finder(iter_dmlog_dbops(iter_dmlog_transactions(dmlog_file)), dbop_key_matches, dbop_matches, stream_window)
+        failed_actions, actions = validate_actions(iter_expected_records(expected_file), action_finder)
+        failed_dbops, db_ops = validate_dbops(iter_expected_records(expected_file), dbop_finder)
+    elif jobs > 1:
+        expected_records = list(iter_expected_records(expected_file))
+        dmlog_actions, dmlog_dbops = load_dmlog_records(dmlog_file, cache_dir)
+        match_in_parallel(expected_records, dmlog_actions, dmlog_dbops, jobs)
+        failed_actions, actions = validate_actions(expected_records, candidate_finder(dmlog_actions, index_wildcard_actions(expected_records, dmlog_actions)))
+        failed_dbops, db_ops = validate_dbops(expected_records, candidate_finder())
+    else:
+        expected_records = list(iter_expected_records(expected_file))
+        dmlog_actions, dmlog_dbops = load_dmlog_records(dmlog_file, cache_dir)
+        failed_actions, actions = validate_actions(expected_records, indexed_finder(find_action, dmlog_actions, index_actions(dmlog_actions)))
+        failed_dbops, db_ops = validate_dbops(expected_records, indexed_finder(find_dbop, dmlog_dbops, index_dbops(dmlog_dbops)))
+    return failed_actions, actions, failed_dbops, db_ops
+
+
+BLOCK_INTERVAL_SEC = 0.5
+
+
+class FileTail:
+    """Returns what was appended to a file since the last read.
+
+    The file does not need to exist yet. Only whole units (lines, or blocks of
+    the binary records format) are consumed, a unit still being written stays
+    buffered until the next read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.buffer = b''
+
+    def read(self):
+        if self.file == None:
+            if not os.path.exists(self.path):
+                return False
+            self.file = open(self.path, 'rb')
+        chunk = self.file.read()
+        self.buffer += chunk
+        return bool(chunk)
+
+    def lines(self):
+        self.read()
+        end = self.buffer.rfind(b'\n') + 1
+        lines, self.buffer = self.buffer[:end], self.buffer[end:]
+        return lines.decode('utf-8', errors='replace').splitlines(keepends=True)
+
+    def expected_records(self):
+        # JSON lines or binary records, told apart once the first bytes are in
+        self.read()
+        if self.buffer.startswith(records.MAGIC) or records.MAGIC.startswith(self.buffer):
+            if len(self.buffer) < len(records.MAGIC):
+                return []
+            expected, used = records.decode_blocks(self.buffer[len(records.MAGIC):])
+            self.buffer = self.buffer[:len(records.MAGIC)] + self.buffer[len(records.MAGIC) + used:]
+            return expected
+        return [json.loads(line) for line in self.lines() if line.strip()]
+
 
+class FollowValidator:
+    """Matches expected records against a raw dmlog while both are still written.
+
+    Each record type keeps a queue of expected records waiting for their match.
+    The head of a queue is looked up from the last matched position, like the
+    indexed mode does, every time the dmlog grows. A record counts as missing
+    once the dmlog holds blocks produced `lag_blocks` blocks after the record
+    was logged, so a missing record is reported within that window instead of
+    at the end of the run.
+    """
+
+    def __init__(self, expected_file, dmlog_file, lag_blocks=20):
+        self.expected = FileTail(expected_file)
+        self.dmlog = FileTail(dmlog_file)
+        self.reader = dmlog.DeepMindReader()
+        self.lag = lag_blocks * BLOCK_INTERVAL_SEC
+        self.actions = []
+        self.dbops = []
+        self.actions_index = index_actions([])
+        self.dbops_index = index_dbops([])
+        self.pending = {'action': deque(), 'dbop': deque()}
+        self.start_index = {'action': 0, 'dbop': 0}
+        self.matched = {'action': 0, 'dbop': 0}
+        self.block_num = 0
+        self.block_time = 0
+
+    def read_dmlog(self):
+        count = 0
+        for transaction in self.reader.transactions(self.dmlog.lines()):
+            index_actions(transaction['actions'], self.actions_index, len(self.actions))
+            index_dbops(transaction['dbops'], self.dbops_index, len(self.dbops))
+            self.actions += transaction['actions']
+            self.dbops += transaction['dbops']
+            self.block_num = transaction['block_num']
+            self.block_time = max(self.block_time, transaction['block_time'])
+            count += 1
+        return count
+
+    def read_expected(self):
+        count = 0
+        for record in self.expected.expected_records():
+            if record['type'] not in self.pending:
+                print("Invalid record type: %s for trx_id %s" % (record['type'], record.get('trx_id')))
+                continue
+            record['deadline'] = parseTime(record['timestamp']) + self.lag if 'timestamp' in record else None
+            self.pending[record['type']].append(record)
+            count += 1
+        return count
+
+    def find(self, record):
+        if record['type'] == 'action':
+            return find_action(record, self.actions, self.actions_index, self.start_index['action'])
+        return find_dbop(record, self.dbops, self.dbops_index, self.start_index['dbop'])
+
+    def match(self):
+        # Returns the first record past its deadline without a match, or None
+        for kind, pending in self.pending.items():
+            while pending:
+                record = pending[0]
+                found = self.find(record)
+                if found == None:
+                    if record['deadline'] != None and self.block_time > record['deadline']:
+                        return record
+                    break
+                pending.popleft()
+                self.start_index[kind] = found + 1
+                self.matched[kind] += 1
+        return None
+
+    def waiting(self):
+        return sum(len(pending) for pending in self.pending.values())
+
+    def progress(self):
+        print('block %d: matched %d actions and %d dbops, %d expected records waiting for the dmlog' % (
+            self.block_num, self.matched['action'], self.matched['dbop'], self.waiting()), flush=True)
+
+def report_missing(record):
+    if record['type'] == 'action':
+        print("No action found for %s:%s @ trx %s" % (record.get('account'), record.get('action_name'), record['trx_id']))
+    else:
+        print("No matching dbop found for table update %s:%s @ trx %s" % (record.get('code'), record.get('table_name'), record['trx_id']))
+
+def follow(expected_file, dmlog_file, lag_blocks=20, idle_timeout=120, progress_interval=10, poll_interval=0.2):
+    # Validates while boot.py and the deep-mind node are running. Stops at the
+    # first missing record, or once the expected file has not grown for
+    # idle_timeout seconds. Returns (failed_actions, actions, failed_dbops, db_ops).
+    validator = FollowValidator(expected_file, dmlog_file, lag_blocks)
+    last_expected = last_dmlog = last_progress = time.time()
+    while True:
+        now = time.time()
+        if validator.read_dmlog():
+            last_dmlog = now
+        if validator.read_expected():
+            last_expected = now
+        missing = validator.match()
+        if missing == None and now - last_expected >= idle_timeout and now - last_dmlog >= idle_timeout:
+            # Both files stopped growing, whatever still waits will never match
+            missing = next(iter(pending[0] for pending in validator.pending.values() if pending), None)
+        if missing != None:
+            validator.progress()
+            report_missing(missing)
+            failed = {'action': 0, 'dbop': 0}
+            failed[missing['type']] = 1
+            return failed['action'], validator.matched['action'], failed['dbop'], validator.matched['dbop']
+        if not validator.waiting() and now - last_expected >= idle_timeout:
+            validator.progress()
+            return 0, validator.matched['action'], 0, validator.matched['dbop']
+        if now - last_progress >= progress_interval:
+            validator.progress()
+            last_progress = now
+        time.sleep(poll_interval)
+
+
+def bail(msg):
+    print(msg)
+    exit(1)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare deep-mind log (raw or decoded to JSON) with expected JSONL log')
+    parser.add_argument('expected_file', type=str, nargs='?', default='expected.jsonl', help='Path to expected.jsonl file (or its binary form)')
+    parser.add_argument('dmlog_file', type=str, nargs='?', default='dm.log.json', help='Path to dm.log.json file or raw .dmlog file')
+    parser.add_argument('--stream', action='store_true', help='Stream the dmlog one block at a time instead of loading it into memory')
+    parser.add_argument('--stream-window', type=int, default=STREAM_WINDOW, help='With --stream, how many dmlog records past the last match a record may appear before it counts as missing')
+    parser.add_argument('--cache-dir', type=str, help='Cache extracted dmlog records in this directory, keyed by the dmlog hash')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Number of worker processes matching records, sharded by trx_id (0 = one per CPU). Loading the dmlog stays serial, so this only helps on large logs')
+    parser.add_argument('--follow', action='store_true', help='Validate the raw dmlog while the deep-mind node and boot.py are still writing, stopping at the first missing record')
+    parser.add_argument('--lag-blocks', type=int, default=20, help='With --follow, blocks the dmlog may run past a record before the record counts as missing')
+    parser.add_argument('--idle-timeout', type=float, default=120, help='With --follow, stop once the expected file has not grown for this many seconds')
+    parser.add_argument('--progress-interval', type=float, default=10, help='With --follow, seconds between progress reports')
+    args = parser.parse_args()
+
+    jobs = args.jobs or os.cpu_count()
+    if args.stream and jobs > 1:
+        parser.error('--stream cannot be combined with --jobs')
+    if args.stream and args.cache_dir:
+        parser.error('--stream cannot be combined with --cache-dir')
+    if args.follow and (args.stream or jobs > 1 or args.cache_dir):
+        parser.error('--follow cannot be combined with --stream, --jobs or --cache-dir')
+    if args.follow and os.path.exists(args.dmlog_file) and os.path.getsize(args.dmlog_file) and not dmlog.is_deep_mind_log(args.dmlog_file):
+        parser.error('--follow needs the raw deep-mind log, not its JSON decoding')
+
+    if not args.follow and os.path.exists(args.dmlog_file) and dmlog.is_deep_mind_log(args.dmlog_file):
+        print("Reading the raw deep-mind log with dmlog.py, the decode.sh output remains the reference (see check_dmlog.py)")
+
+    if args.follow:
+        failed_actions, actions, failed_dbops, db_ops = follow(args.expected_file, args.dmlog_file, args.lag_blocks, args.idle_timeout, args.progress_interval)
+    else:
+        failed_actions, actions, failed_dbops, db_ops = validate(args.expected_file, args.dmlog_file, args.stream, args.cache_dir, jobs, args.stream_window)
+
+    failed = failed_actions + failed_dbops
     if failed > 0:
         bail("🛑 Failed %d out of %d actions and db_ops - see above" % (failed, actions + db_ops))
-    
+
     print("✅ Validated all actions and db_ops successfully")
 
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -9,5 +9,5 @@ fi
 echo "Validating deep-mind-${nodeos_version}.dmlog.json against deep-mind-${nodeos_version}.expected.jsonl ..."
 sleep 1
 
-python3 ./python/compare.py ./run/deep-mind-${nodeos_version}.expected.jsonl ./run/deep-mind-${nodeos_version}.dmlog.json
+python3 ./python/validate.py --cache-dir ./run/.validate-cache ./run/deep-mind-${nodeos_version}.expected.jsonl ./run/deep-mind-${nodeos_version}.dmlog.json
 